@@ -65,6 +65,11 @@ class AgentDeviceDriver(object):
         # Not all drivers will support this
         raise NotImplementedError()
 
+    def refresh_tls_material(self):
+        """Rotates TLS session ticket keys and refreshes OCSP responses."""
+        # Not all drivers will support this
+        raise NotImplementedError()
+
 
 @six.add_metaclass(abc.ABCMeta)
 class BaseManager(object):
@@ -101,7 +106,10 @@ class BasePoolManager(BaseManager):
 
 
 class BaseMemberManager(BaseManager):
-    pass
+
+    def create_many(self, members):
+        for member in members:
+            self.create(member)
 
 
 class BaseHealthMonitorManager(BaseManager):
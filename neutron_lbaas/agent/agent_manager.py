@@ -42,6 +42,13 @@ OPTS = [
                  'namespace_driver.HaproxyNSDriver'],
         help=_('Drivers used to manage loadbalancing devices'),
     ),
+    cfg.IntOpt(
+        'loadbalancer_capacity',
+        default=0,
+        help=_('Relative number of load balancers this agent can host, '
+               'reported to LeastLoadedScheduler. 0 means the agent '
+               'does not report a capacity.'),
+    ),
 ]
 
 
@@ -53,7 +60,8 @@ class LbaasAgentManager(periodic_task.PeriodicTasks):
 
     # history
     #   1.0 Initial version
-    target = oslo_messaging.Target(version='1.0')
+    #   1.1 create_members
+    target = oslo_messaging.Target(version='1.1')
 
     def __init__(self, conf):
         super(LbaasAgentManager, self).__init__(conf)
@@ -74,6 +82,9 @@ class LbaasAgentManager(periodic_task.PeriodicTasks):
             'configurations': {'device_drivers': self.device_drivers.keys()},
             'agent_type': lb_const.AGENT_TYPE_LOADBALANCERV2,
             'start_flag': True}
+        if self.conf.loadbalancer_capacity:
+            self.agent_state['configurations']['loadbalancer_capacity'] = (
+                self.conf.loadbalancer_capacity)
         self.admin_state_up = True
 
         self._setup_state_rpc()
@@ -145,6 +156,17 @@ class LbaasAgentManager(periodic_task.PeriodicTasks):
                               loadbalancer_id)
                 self.needs_resync = True
 
+    @periodic_task.periodic_task(spacing=60)
+    def refresh_tls_material(self, context):
+        for driver_name, driver in self.device_drivers.items():
+            try:
+                driver.refresh_tls_material()
+            except NotImplementedError:
+                pass  # Not all drivers will support this
+            except Exception:
+                LOG.exception(_LE('Unable to refresh TLS material on device '
+                                  'driver %s'), driver_name)
+
     def sync_state(self):
         known_instances = set(self.instance_mapping.keys())
         try:
@@ -358,6 +380,20 @@ class LbaasAgentManager(periodic_task.PeriodicTasks):
         else:
             self._update_statuses(member)
 
+    def create_members(self, context, members):
+        members = [data_models.Member.from_dict(member)
+                   for member in members]
+        driver = self._get_driver(members[0].pool.listener.loadbalancer.id)
+        try:
+            driver.member.create_many(members)
+        except Exception:
+            for member in members:
+                self._handle_failed_driver_call('create', member,
+                                                driver.get_name())
+        else:
+            for member in members:
+                self._update_statuses(member)
+
     def update_member(self, context, old_member, member):
         member = data_models.Member.from_dict(member)
         old_member = data_models.Member.from_dict(old_member)
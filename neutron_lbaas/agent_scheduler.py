@@ -14,22 +14,58 @@
 #    under the License.
 
 import random
+import time
 
 from neutron.db import agents_db
 from neutron.db import agentschedulers_db
 from neutron.db import model_base
 from neutron.i18n import _LW
+from oslo_config import cfg
 from oslo_log import log as logging
 import six
 import sqlalchemy as sa
 from sqlalchemy import orm
 from sqlalchemy.orm import joinedload
 
+from neutron_lbaas.db.loadbalancer import models
 from neutron_lbaas.extensions import lbaas_agentschedulerv2
 from neutron_lbaas.services.loadbalancer import constants as lb_const
 
 LOG = logging.getLogger(__name__)
 
+LOAD_LOADBALANCERS = 'loadbalancers'
+LOAD_CONNECTIONS = 'connections'
+LOAD_BYTES = 'bytes'
+
+OPTS = [
+    cfg.StrOpt('loadbalancer_scheduler_load',
+               default=LOAD_LOADBALANCERS,
+               choices=[LOAD_LOADBALANCERS, LOAD_CONNECTIONS, LOAD_BYTES],
+               help=_('Load measured by LeastLoadedScheduler and the agent '
+                      'rebalancer on every agent: the number of load '
+                      'balancers it hosts, or the active connections or '
+                      'bytes in and out reported in their statistics. '
+                      'The load is divided by the loadbalancer_capacity '
+                      'reported by the agent, if any.')),
+    cfg.IntOpt('loadbalancer_agent_index_ttl',
+               default=30,
+               help=_('Seconds the lbaas agents, with their device drivers, '
+                      'capacities, admin state and last heartbeat, are '
+                      'cached for scheduling. Agents starting or '
+                      'resyncing are picked up right away. Keep it below '
+                      'agent_down_time minus the agent report_interval, '
+                      'or live agents are taken for dead.')),
+]
+
+cfg.CONF.register_opts(OPTS)
+
+
+def _stats_load_column(load):
+    stats = models.LoadBalancerStatistics
+    if load == LOAD_BYTES:
+        return stats.bytes_in + stats.bytes_out
+    return stats.active_connections
+
 
 class LoadbalancerAgentBinding(model_base.BASEV2):
     """Represents binding between neutron loadbalancer and agents."""
@@ -53,6 +89,67 @@ class LbaasAgentSchedulerDbMixin(agentschedulers_db.AgentSchedulerDbMixin,
 
     agent_notifiers = {}
 
+    # device driver -> agents supporting it and agent id -> reported
+    # capacity, parsed from the agent configurations
+    _agent_index = None
+    _agent_capacities = None
+    _agent_index_expiry = 0
+
+    def _get_agent_index(self, context):
+        now = time.time()
+        if self._agent_index is None or now >= self._agent_index_expiry:
+            index = {}
+            capacities = {}
+            query = context.session.query(
+                agents_db.Agent.id, agents_db.Agent.agent_type,
+                agents_db.Agent.host, agents_db.Agent.admin_state_up,
+                agents_db.Agent.heartbeat_timestamp,
+                agents_db.Agent.configurations)
+            query = query.filter_by(
+                agent_type=lb_const.AGENT_TYPE_LOADBALANCERV2)
+            for agent in query:
+                agent_conf = self.get_configuration_dict(agent)
+                agent_dict = {
+                    'id': agent.id,
+                    'host': agent.host,
+                    'admin_state_up': agent.admin_state_up,
+                    'heartbeat_timestamp': agent.heartbeat_timestamp}
+                for device_driver in agent_conf.get('device_drivers', []):
+                    index.setdefault(device_driver, []).append(agent_dict)
+                if agent_conf.get('loadbalancer_capacity'):
+                    capacities[agent.id] = agent_conf['loadbalancer_capacity']
+            self._agent_index = index
+            self._agent_capacities = capacities
+            self._agent_index_expiry = (
+                now + cfg.CONF.loadbalancer_agent_index_ttl)
+        return self._agent_index
+
+    def invalidate_lbaas_agent_index(self):
+        """Reloads the agents on the next lookup of the agent index."""
+        self._agent_index = None
+
+    def get_lbaas_agent_ids_for_device_driver(self, context, device_driver):
+        """Returns the ids of the agents supporting device_driver."""
+        return [agent['id'] for agent in
+                self._get_agent_index(context).get(device_driver, [])]
+
+    def get_active_lbaas_agents_for_device_driver(self, context,
+                                                  device_driver):
+        """Returns the active agents supporting device_driver.
+
+        The agents come from the agent index as dictionaries, they are
+        told alive by the heartbeat cached with it.
+        """
+        return [agent for agent in
+                self._get_agent_index(context).get(device_driver, [])
+                if agent['admin_state_up'] and
+                self.is_eligible_agent(True, agent)]
+
+    def get_lbaas_agent_capacities(self, context):
+        """Returns the loadbalancer_capacity reported by the agents."""
+        self._get_agent_index(context)
+        return self._agent_capacities
+
     def get_agent_hosting_loadbalancer(self, context,
                                        loadbalancer_id, active=None):
         query = context.session.query(LoadbalancerAgentBinding)
@@ -89,17 +186,93 @@ class LbaasAgentSchedulerDbMixin(agentschedulers_db.AgentSchedulerDbMixin,
             return lbs
         return []
 
-    def get_lbaas_agent_candidates(self, device_driver, active_agents):
-        candidates = []
-        for agent in active_agents:
-            agent_conf = self.get_configuration_dict(agent)
-            if device_driver in agent_conf['device_drivers']:
-                candidates.append(agent)
-        return candidates
+    def get_loadbalancer_count_on_lbaas_agents(self, context, agent_ids):
+        """Returns the number of load balancers hosted by each agent."""
+        if not agent_ids:
+            return {}
+        query = context.session.query(
+            LoadbalancerAgentBinding.agent_id,
+            sa.func.count(LoadbalancerAgentBinding.loadbalancer_id))
+        query = query.filter(
+            LoadbalancerAgentBinding.agent_id.in_(agent_ids))
+        query = query.group_by(LoadbalancerAgentBinding.agent_id)
+        return dict((agent_id, count) for agent_id, count in query)
+
+    def get_stats_load_on_lbaas_agents(self, context, agent_ids, load):
+        """Returns the load of each agent, summed from the statistics of
+        the load balancers it hosts.
+        """
+        if not agent_ids:
+            return {}
+        query = context.session.query(
+            LoadbalancerAgentBinding.agent_id,
+            sa.func.sum(_stats_load_column(load)))
+        query = query.join(
+            models.LoadBalancerStatistics,
+            models.LoadBalancerStatistics.loadbalancer_id ==
+            LoadbalancerAgentBinding.loadbalancer_id)
+        query = query.filter(
+            LoadbalancerAgentBinding.agent_id.in_(agent_ids))
+        query = query.group_by(LoadbalancerAgentBinding.agent_id)
+        return dict((agent_id, int(agent_load or 0))
+                    for agent_id, agent_load in query)
+
+    def get_loadbalancer_loads_on_lbaas_agents(self, context, agent_ids,
+                                               load):
+        """Returns (loadbalancer id, agent id, provisioning status, load)
+        for every load balancer hosted by the agents.
+        """
+        if not agent_ids:
+            return []
+        columns = [LoadbalancerAgentBinding.loadbalancer_id,
+                   LoadbalancerAgentBinding.agent_id,
+                   models.LoadBalancer.provisioning_status]
+        if load != LOAD_LOADBALANCERS:
+            columns.append(_stats_load_column(load))
+        query = context.session.query(*columns)
+        query = query.join(
+            models.LoadBalancer,
+            models.LoadBalancer.id == LoadbalancerAgentBinding.loadbalancer_id)
+        if load != LOAD_LOADBALANCERS:
+            query = query.outerjoin(
+                models.LoadBalancerStatistics,
+                models.LoadBalancerStatistics.loadbalancer_id ==
+                LoadbalancerAgentBinding.loadbalancer_id)
+        query = query.filter(
+            LoadbalancerAgentBinding.agent_id.in_(agent_ids))
+        if load == LOAD_LOADBALANCERS:
+            return [(lb_id, agent_id, status, 1)
+                    for lb_id, agent_id, status in query]
+        return [(lb_id, agent_id, status, int(lb_load or 0))
+                for lb_id, agent_id, status, lb_load in query]
+
+    def rebind_loadbalancer(self, context, loadbalancer_id, old_agent_id,
+                            new_agent_id):
+        """Moves the binding of a load balancer to another agent.
 
+        :return: False if the load balancer is no longer bound to
+                 old_agent_id
+        """
+        with context.session.begin(subtransactions=True):
+            query = context.session.query(LoadbalancerAgentBinding)
+            query = query.filter_by(loadbalancer_id=loadbalancer_id,
+                                    agent_id=old_agent_id)
+            return bool(query.update({'agent_id': new_agent_id},
+                                     synchronize_session=False))
+
+    def unbind_loadbalancer(self, context, loadbalancer_id, agent_id):
+        """Removes the binding of a load balancer to an agent.
+
+        :return: False if the load balancer is no longer bound to agent_id
+        """
+        with context.session.begin(subtransactions=True):
+            query = context.session.query(LoadbalancerAgentBinding)
+            query = query.filter_by(loadbalancer_id=loadbalancer_id,
+                                    agent_id=agent_id)
+            return bool(query.delete(synchronize_session=False))
 
-class ChanceScheduler(object):
-    """Allocate a loadbalancer agent for a vip in a random way."""
+
+class SchedulerBase(object):
 
     def schedule(self, plugin, context, loadbalancer, device_driver):
         """Schedule the load balancer to an active loadbalancer agent if there
@@ -116,23 +289,28 @@ class ChanceScheduler(object):
                            'agent_id': lbaas_agent['id']})
                 return
 
-            active_agents = plugin.db.get_lbaas_agents(context, active=True)
-            if not active_agents:
+            candidates = plugin.db.get_active_lbaas_agents_for_device_driver(
+                context, device_driver)
+            if not candidates:
+                # the cached heartbeats may be outdated
+                plugin.db.invalidate_lbaas_agent_index()
+                candidates = (
+                    plugin.db.get_active_lbaas_agents_for_device_driver(
+                        context, device_driver))
+            if not candidates:
+                if not plugin.db.get_lbaas_agent_ids_for_device_driver(
+                        context, device_driver):
+                    LOG.warn(_LW('No lbaas agent supporting device driver '
+                                 '%s'), device_driver)
+                    return
                 LOG.warn(
                     _LW('No active lbaas agents for load balancer %s'),
                     loadbalancer.id)
                 return
 
-            candidates = plugin.db.get_lbaas_agent_candidates(device_driver,
-                                                              active_agents)
-            if not candidates:
-                LOG.warn(_LW('No lbaas agent supporting device driver %s'),
-                         device_driver)
-                return
-
-            chosen_agent = random.choice(candidates)
+            chosen_agent = self._schedule(candidates, plugin, context)
             binding = LoadbalancerAgentBinding()
-            binding.agent = chosen_agent
+            binding.agent_id = chosen_agent['id']
             binding.loadbalancer_id = loadbalancer.id
             context.session.add(binding)
             LOG.debug(
@@ -142,3 +320,39 @@ class ChanceScheduler(object):
                     'agent_id': chosen_agent['id']}
             )
             return chosen_agent
+
+
+class ChanceScheduler(SchedulerBase):
+
+    def _schedule(self, candidates, plugin, context):
+        """Allocate a loadbalancer agent for a vip in a random way."""
+        return random.choice(candidates)
+
+
+class LeastLoadedScheduler(SchedulerBase):
+
+    def _schedule(self, candidates, plugin, context):
+        """Pick the agent with the least load relative to its capacity.
+
+        The load balancers of all candidates are counted in a single
+        query. Agents reporting a loadbalancer_capacity get a share of
+        the load balancers proportional to it.
+        """
+        agent_ids = [agent['id'] for agent in candidates]
+        lb_counts = plugin.db.get_loadbalancer_count_on_lbaas_agents(
+            context, agent_ids)
+        load = cfg.CONF.loadbalancer_scheduler_load
+        if load == LOAD_LOADBALANCERS:
+            loads = lb_counts
+        else:
+            loads = plugin.db.get_stats_load_on_lbaas_agents(
+                context, agent_ids, load)
+        capacities = plugin.db.get_lbaas_agent_capacities(context)
+
+        def agent_load(agent):
+            capacity = float(capacities.get(agent['id']) or 1)
+            # agents with equal load are told apart by the load balancers
+            # they host
+            return (loads.get(agent['id'], 0) / capacity,
+                    lb_counts.get(agent['id'], 0) / capacity)
+        return min(candidates, key=agent_load)
@@ -12,6 +12,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import threading
+import time
+
 from barbicanclient import client as barbican_client
 from neutron.i18n import _LI, _LW, _LE
 from oslo_config import cfg
@@ -25,6 +29,22 @@ LOG = logging.getLogger(__name__)
 
 CONF = cfg.CONF
 
+barbican_cert_manager_opts = [
+    cfg.IntOpt('barbican_cache_ttl',
+               default=300,
+               help='Seconds a certificate container fetched from Barbican '
+                    'is cached. 0 disables the cache.'),
+    cfg.IntOpt('barbican_cache_negative_ttl',
+               default=30,
+               help='Seconds a certificate container missing from Barbican '
+                    'is remembered as missing.'),
+    cfg.IntOpt('barbican_cache_size',
+               default=1000,
+               help='Maximum number of certificate containers cached.')
+]
+
+CONF.register_opts(barbican_cert_manager_opts, group='certificates')
+
 
 class Cert(cert_manager.Cert):
     """Representation of a Cert based on the Barbican CertificateContainer."""
@@ -83,6 +103,77 @@ class BarbicanKeystoneAuth(object):
         return cls._barbican_client
 
 
+class _CacheEntry(object):
+
+    def __init__(self, cert, error, expires, consumers):
+        self.cert = cert
+        self.error = error
+        self.expires = expires
+        self.consumers = consumers
+
+
+class _CertCache(object):
+    """LRU cache of the certificate containers fetched from Barbican.
+
+    The consumers registered for a container are remembered along with it,
+    a consumer is registered once for as long as the container is cached.
+    """
+
+    def __init__(self):
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cert_ref):
+        with self._lock:
+            entry = self._entries.pop(cert_ref, None)
+            if not entry or entry.expires <= time.time():
+                return None
+            # most recently used last
+            self._entries[cert_ref] = entry
+            return entry
+
+    def put(self, cert_ref, cert, consumer=None):
+        ttl = CONF.certificates.barbican_cache_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            now = time.time()
+            entry = self._entries.pop(cert_ref, None)
+            consumers = set()
+            if entry and not entry.error and entry.expires > now:
+                consumers = entry.consumers
+            if consumer:
+                consumers.add(consumer)
+            self._store(cert_ref, _CacheEntry(cert, None, now + ttl,
+                                              consumers))
+
+    def put_error(self, cert_ref, error):
+        ttl = CONF.certificates.barbican_cache_negative_ttl
+        if CONF.certificates.barbican_cache_ttl <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries.pop(cert_ref, None)
+            self._store(cert_ref, _CacheEntry(None, error, time.time() + ttl,
+                                              set()))
+
+    def _store(self, cert_ref, entry):
+        self._entries[cert_ref] = entry
+        while len(self._entries) > max(CONF.certificates.barbican_cache_size,
+                                       1):
+            self._entries.popitem(last=False)
+
+    def invalidate(self, cert_ref):
+        with self._lock:
+            self._entries.pop(cert_ref, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cert_cache = _CertCache()
+
+
 class CertManager(cert_manager.CertManager):
     """Certificate Manager that wraps the Barbican client API."""
     @staticmethod
@@ -182,6 +273,14 @@ class CertManager(cert_manager.CertManager):
                  certificate data
         :raises Exception: if certificate retrieval fails
         """
+        consumer = None if check_only else (service_name, resource_ref)
+        entry = _cert_cache.get(cert_ref)
+        if entry:
+            if entry.error:
+                raise entry.error
+            if not consumer or consumer in entry.consumers:
+                return entry.cert
+
         connection = BarbicanKeystoneAuth.get_barbican_client()
 
         LOG.info(_LI(
@@ -198,10 +297,14 @@ class CertManager(cert_manager.CertManager):
                     name=service_name,
                     url=resource_ref
                 )
-            return Cert(cert_container)
-        except Exception:
+            cert = Cert(cert_container)
+        except Exception as e:
             with excutils.save_and_reraise_exception():
                 LOG.exception(_LE("Error getting {0}").format(cert_ref))
+                if getattr(e, 'status_code', None) == 404:
+                    _cert_cache.put_error(cert_ref, e)
+        _cert_cache.put(cert_ref, cert, consumer)
+        return cert
 
     @staticmethod
     def delete_cert(cert_ref, resource_ref, service_name='lbaas', **kwargs):
@@ -213,6 +316,7 @@ class CertManager(cert_manager.CertManager):
 
         :raises Exception: if deregistration fails
         """
+        _cert_cache.invalidate(cert_ref)
         connection = BarbicanKeystoneAuth.get_barbican_client()
 
         LOG.info(_LI(
@@ -237,6 +341,7 @@ class CertManager(cert_manager.CertManager):
         :param cert_ref: the UUID of the cert to delete
         :raises Exception: if certificate deletion fails
         """
+        _cert_cache.invalidate(cert_ref)
         connection = BarbicanKeystoneAuth.get_barbican_client()
 
         LOG.info(_LI(
@@ -13,11 +13,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import copy
+import hashlib
+import threading
+
 from cryptography.hazmat import backends
 from cryptography.hazmat.primitives import serialization
 import neutron_lbaas.common.exceptions as exceptions
 from OpenSSL import crypto
 from OpenSSL import SSL
+from oslo_utils import encodeutils
 import pyasn1.codec.der.decoder as decoder
 import pyasn1_modules.rfc2459 as rfc2459
 import six
@@ -25,6 +31,56 @@ import six
 X509_BEG = "-----BEGIN CERTIFICATE-----"
 X509_END = "-----END CERTIFICATE-----"
 
+# number of parse results kept, certificates are parsed again once evicted
+PARSE_CACHE_SIZE = 1000
+
+
+class _ParseCache(object):
+    """Least recently used results of certificate parsing
+
+    Results are keyed by a digest of the PEM data they were parsed from,
+    the PEM data itself is not kept. Failed parses are not cached, neither
+    are decrypted private keys.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._results = collections.OrderedDict()
+
+    def get(self, key, parse):
+        with self._lock:
+            if key in self._results:
+                result = self._results.pop(key)
+                self._results[key] = result
+                return result
+        result = parse()
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+_parse_cache = _ParseCache(PARSE_CACHE_SIZE)
+
+
+def _get_digest(*data):
+    digest = hashlib.sha256()
+    for item in data:
+        # tell None from an empty string and keep the items apart
+        if item is None:
+            digest.update(b'\x00')
+        else:
+            item = encodeutils.safe_encode(item)
+            digest.update(encodeutils.safe_encode('\x01%d:' % len(item)))
+            digest.update(item)
+    return digest.hexdigest()
+
 
 def validate_cert(certificate, private_key=None,
                   private_key_passphrase=None, intermediates=None):
@@ -40,6 +96,15 @@ def validate_cert(certificate, private_key=None,
     :param intermediates: PEM encoded intermediate certificates
     :returns: boolean
     """
+    return _parse_cache.get(
+        ('validate_cert', _get_digest(certificate, private_key,
+                                      private_key_passphrase, intermediates)),
+        lambda: _validate_cert(certificate, private_key,
+                               private_key_passphrase, intermediates))
+
+
+def _validate_cert(certificate, private_key, private_key_passphrase,
+                   intermediates):
     x509 = _get_x509_from_pem_bytes(certificate)
     if intermediates:
         for x509Pem in _split_x509s(intermediates):
@@ -138,7 +203,13 @@ def get_host_names(certificate):
     'dns_names' is a list of dNSNames (possibly empty) from
     the SubjectAltNames of the certificate.
     """
+    # callers get their own copy of the cached names
+    return copy.deepcopy(_parse_cache.get(
+        ('get_host_names', _get_digest(certificate)),
+        lambda: _get_host_names(certificate)))
+
 
+def _get_host_names(certificate):
     x509 = _get_x509_from_pem_bytes(certificate)
     hostNames = {}
     if hasattr(x509.get_subject(), 'CN'):
@@ -47,6 +47,9 @@ class LoadBalancerPluginDbv2(base_db.CommonDbMixin,
     plugin database access interface using SQLAlchemy models.
     """
 
+    # providers allowing changes to a load balancer pending an update
+    coalescing_providers = ()
+
     @property
     def _core_plugin(self):
         return manager.NeutronManager.get_plugin()
@@ -140,15 +143,31 @@ class LoadBalancerPluginDbv2(base_db.CommonDbMixin,
                     id=loadbalancer_id)
             context.session.delete(stats)
 
+    def _update_tuning(self, model_db, tuning_model, info):
+        # The tuning profile is replaced as a whole, values left out are
+        # reset so that the driver falls back to its defaults for them
+        if not info:
+            model_db.tuning = None
+            return
+        values = dict((column.name, info.get(column.name))
+                      for column in tuning_model.__table__.columns
+                      if not column.primary_key)
+        if model_db.tuning:
+            model_db.tuning.update(values)
+        else:
+            model_db.tuning = tuning_model(**values)
+
     def _load_id_and_tenant_id(self, context, model_dict):
         model_dict['id'] = uuidutils.generate_uuid()
         model_dict['tenant_id'] = self._get_tenant_id_for_create(
             context, model_dict)
 
-    def assert_modification_allowed(self, obj):
+    def assert_modification_allowed(self, obj, allow_pending_update=False):
         status = getattr(obj, 'provisioning_status', None)
-        if status in [constants.PENDING_DELETE, constants.PENDING_UPDATE,
-                      constants.PENDING_CREATE]:
+        pending_statuses = [constants.PENDING_DELETE, constants.PENDING_CREATE]
+        if not allow_pending_update:
+            pending_statuses.append(constants.PENDING_UPDATE)
+        if status in pending_statuses:
             id = getattr(obj, 'id', None)
             raise loadbalancerv2.StateInvalid(id=id, state=status)
 
@@ -161,9 +180,16 @@ class LoadBalancerPluginDbv2(base_db.CommonDbMixin,
                 db_lb_child = self._get_resource(context, model, id)
                 db_lb = self._get_resource(context, models.LoadBalancer,
                                            db_lb_child.root_loadbalancer.id)
+            # Changes are coalesced into the pending update of the load
+            # balancer for coalescing providers, except its deletion
+            allow_pending_update = (
+                (db_lb_child or status != constants.PENDING_DELETE) and
+                db_lb.provider and
+                db_lb.provider.provider_name in self.coalescing_providers)
             # This method will raise an exception if modification is not
             # allowed.
-            self.assert_modification_allowed(db_lb)
+            self.assert_modification_allowed(
+                db_lb, allow_pending_update=allow_pending_update)
 
             # if the model passed in is not a load balancer then we will
             # set its root load balancer's provisioning status to
@@ -204,16 +230,28 @@ class LoadBalancerPluginDbv2(base_db.CommonDbMixin,
 
     def create_loadbalancer(self, context, loadbalancer, allocate_vip=True):
         with context.session.begin(subtransactions=True):
+            # the plugin picks the id of a load balancer created with its
+            # listeners
+            lb_id = loadbalancer.pop('id', None)
             self._load_id_and_tenant_id(context, loadbalancer)
+            if lb_id:
+                loadbalancer['id'] = lb_id
             vip_address = loadbalancer.pop('vip_address')
+            listeners = loadbalancer.pop('listeners', None) or []
             loadbalancer['provisioning_status'] = constants.PENDING_CREATE
             loadbalancer['operating_status'] = lb_const.OFFLINE
+            tuning_info = loadbalancer.pop('tuning', None)
             lb_db = models.LoadBalancer(**loadbalancer)
+            if tuning_info:
+                self._update_tuning(lb_db, models.LoadBalancerTuning,
+                                    tuning_info)
             context.session.add(lb_db)
             context.session.flush()
             lb_db.stats = self._create_loadbalancer_stats(
                 context, lb_db.id)
             context.session.add(lb_db)
+            for listener in listeners:
+                self._create_listener_graph(context, lb_db, listener)
 
         # create port outside of lb create transaction since it can sometimes
         # cause lock wait timeouts
@@ -224,13 +262,87 @@ class LoadBalancerPluginDbv2(base_db.CommonDbMixin,
                                                     vip_address)
             except Exception:
                 with excutils.save_and_reraise_exception():
+                    for listener_db in lb_db.listeners:
+                        self._delete_listener_graph(context, listener_db)
                     context.session.delete(lb_db)
                     context.session.flush()
         return data_models.LoadBalancer.from_sqlalchemy_model(lb_db)
 
+    def _create_listener_graph(self, context, lb_db, listener):
+        pool = listener.pop('default_pool', None)
+        listener['tenant_id'] = lb_db.tenant_id
+        listener['loadbalancer_id'] = lb_db.id
+        listener['default_pool_id'] = None
+        listener_db = self._create_listener_db(context, listener)
+        if pool:
+            pool['tenant_id'] = lb_db.tenant_id
+            listener_db.default_pool = self._create_pool_graph(context, pool)
+        lb_db.listeners.append(listener_db)
+
+    def _create_pool_graph(self, context, pool):
+        members = pool.pop('members', None) or []
+        healthmonitor = pool.pop('healthmonitor', None)
+        pool_db = self._create_pool_db(context, pool)
+        addresses = set()
+        for member in members:
+            key = (member['address'], member['protocol_port'])
+            if key in addresses:
+                raise loadbalancerv2.MemberExists(
+                    address=member['address'], port=member['protocol_port'],
+                    pool=pool_db.name or pool_db.id)
+            addresses.add(key)
+            member['tenant_id'] = pool_db.tenant_id
+            self._load_id_and_tenant_id(context, member)
+            member['provisioning_status'] = constants.PENDING_CREATE
+            member['operating_status'] = lb_const.OFFLINE
+            pool_db.members.append(models.MemberV2(**member))
+        if healthmonitor:
+            healthmonitor['tenant_id'] = pool_db.tenant_id
+            self._load_id_and_tenant_id(context, healthmonitor)
+            healthmonitor['provisioning_status'] = constants.PENDING_CREATE
+            pool_db.healthmonitor = models.HealthMonitorV2(**healthmonitor)
+        return pool_db
+
+    def _delete_listener_graph(self, context, listener_db):
+        pool_db = listener_db.default_pool
+        context.session.delete(listener_db)
+        if pool_db:
+            if pool_db.healthmonitor:
+                context.session.delete(pool_db.healthmonitor)
+            context.session.delete(pool_db)
+
+    def update_loadbalancer_graph_status(self, context, lb_id,
+                                         provisioning_status,
+                                         operating_status):
+        """Sets the status of the entities created with a load balancer.
+
+        Only the listeners, pools, members and health monitors still
+        PENDING_CREATE are updated.
+        """
+        with context.session.begin(subtransactions=True):
+            lb_db = self._get_resource(context, models.LoadBalancer, lb_id)
+            for listener_db in lb_db.listeners:
+                entities = [listener_db]
+                pool_db = listener_db.default_pool
+                if pool_db:
+                    entities.append(pool_db)
+                    entities.extend(pool_db.members)
+                    if pool_db.healthmonitor:
+                        entities.append(pool_db.healthmonitor)
+                for entity in entities:
+                    if entity.provisioning_status != constants.PENDING_CREATE:
+                        continue
+                    entity.provisioning_status = provisioning_status
+                    # health monitors have no operating status
+                    if not isinstance(entity, models.HealthMonitorV2):
+                        entity.operating_status = operating_status
+
     def update_loadbalancer(self, context, id, loadbalancer):
         with context.session.begin(subtransactions=True):
             lb_db = self._get_resource(context, models.LoadBalancer, id)
+            if 'tuning' in loadbalancer:
+                self._update_tuning(lb_db, models.LoadBalancerTuning,
+                                    loadbalancer.pop('tuning'))
             lb_db.update(loadbalancer)
         return data_models.LoadBalancer.from_sqlalchemy_model(lb_db)
 
@@ -305,13 +417,28 @@ class LoadBalancerPluginDbv2(base_db.CommonDbMixin,
             del listener['sni_container_refs']
             listener['sni_container_ids'] = sni_crefs
 
-    def create_listener(self, context, listener):
+    def _create_listener_db(self, context, listener):
         self._convert_api_to_db(listener)
+        self._load_id_and_tenant_id(context, listener)
+        listener['provisioning_status'] = constants.PENDING_CREATE
+        listener['operating_status'] = lb_const.OFFLINE
+        sni_container_ids = []
+        if 'sni_container_ids' in listener:
+            sni_container_ids = listener.pop('sni_container_ids')
+        tuning_info = listener.pop('tuning', None)
+        listener_db_entry = models.Listener(**listener)
+        if tuning_info:
+            self._update_tuning(listener_db_entry,
+                                models.ListenerTuning, tuning_info)
+        for container_id in sni_container_ids:
+            sni = models.SNI(listener_id=listener_db_entry.id,
+                             tls_container_id=container_id)
+            listener_db_entry.sni_containers.append(sni)
+        return listener_db_entry
+
+    def create_listener(self, context, listener):
         try:
             with context.session.begin(subtransactions=True):
-                self._load_id_and_tenant_id(context, listener)
-                listener['provisioning_status'] = constants.PENDING_CREATE
-                listener['operating_status'] = lb_const.OFFLINE
                 # Check for unspecified loadbalancer_id and listener_id and
                 # set to None
                 for id in ['loadbalancer_id', 'default_pool_id']:
@@ -319,14 +446,8 @@ class LoadBalancerPluginDbv2(base_db.CommonDbMixin,
                         listener[id] = None
 
                 self._validate_listener_data(context, listener)
-                sni_container_ids = []
-                if 'sni_container_ids' in listener:
-                    sni_container_ids = listener.pop('sni_container_ids')
-                listener_db_entry = models.Listener(**listener)
-                for container_id in sni_container_ids:
-                    sni = models.SNI(listener_id=listener_db_entry.id,
-                                     tls_container_id=container_id)
-                    listener_db_entry.sni_containers.append(sni)
+                listener_db_entry = self._create_listener_db(context,
+                                                             listener)
                 context.session.add(listener_db_entry)
         except exception.DBDuplicateEntry:
             raise loadbalancerv2.LoadBalancerListenerProtocolPortExists(
@@ -354,6 +475,10 @@ class LoadBalancerPluginDbv2(base_db.CommonDbMixin,
                                      tls_container_id=container_id)
                     listener_db.sni_containers.append(sni)
 
+            if 'tuning' in listener:
+                self._update_tuning(listener_db, models.ListenerTuning,
+                                    listener.pop('tuning'))
+
             listener_db.update(listener)
 
         context.session.refresh(listener_db)
@@ -410,20 +535,23 @@ class LoadBalancerPluginDbv2(base_db.CommonDbMixin,
             sess_qry = context.session.query(models.SessionPersistenceV2)
             sess_qry.filter_by(pool_id=pool_id).delete()
 
-    def create_pool(self, context, pool):
-        with context.session.begin(subtransactions=True):
-            self._load_id_and_tenant_id(context, pool)
-            pool['provisioning_status'] = constants.PENDING_CREATE
-            pool['operating_status'] = lb_const.OFFLINE
+    def _create_pool_db(self, context, pool):
+        self._load_id_and_tenant_id(context, pool)
+        pool['provisioning_status'] = constants.PENDING_CREATE
+        pool['operating_status'] = lb_const.OFFLINE
 
-            session_info = pool.pop('session_persistence')
-            pool_db = models.PoolV2(**pool)
+        session_info = pool.pop('session_persistence')
+        pool_db = models.PoolV2(**pool)
 
-            if session_info:
-                s_p = self._create_session_persistence_db(session_info,
-                                                          pool_db.id)
-                pool_db.session_persistence = s_p
+        if session_info:
+            s_p = self._create_session_persistence_db(session_info,
+                                                      pool_db.id)
+            pool_db.session_persistence = s_p
+        return pool_db
 
+    def create_pool(self, context, pool):
+        with context.session.begin(subtransactions=True):
+            pool_db = self._create_pool_db(context, pool)
             context.session.add(pool_db)
         return data_models.Pool.from_sqlalchemy_model(pool_db)
 
@@ -497,6 +625,112 @@ class LoadBalancerPluginDbv2(base_db.CommonDbMixin,
         context.session.refresh(member_db.pool)
         return data_models.Member.from_sqlalchemy_model(member_db)
 
+    def _check_members_unique(self, context, members, pool_id):
+        existing = set(context.session.query(
+            models.MemberV2.address,
+            models.MemberV2.protocol_port).filter_by(pool_id=pool_id))
+        for member in members:
+            key = (member['address'], member['protocol_port'])
+            if key in existing:
+                raise loadbalancerv2.MemberExists(
+                    address=member['address'], port=member['protocol_port'],
+                    pool=pool_id)
+            existing.add(key)
+
+    def create_pool_members(self, context, members, pool_id):
+        """Creates the members of a bulk request in a single transaction.
+
+        Either all the members are created or none is.
+        """
+        self._check_members_unique(context, members, pool_id)
+        member_dbs = []
+        try:
+            with context.session.begin(subtransactions=True):
+                for member in members:
+                    self._load_id_and_tenant_id(context, member)
+                    member['pool_id'] = pool_id
+                    member['provisioning_status'] = constants.PENDING_CREATE
+                    member['operating_status'] = lb_const.OFFLINE
+                    member_db = models.MemberV2(**member)
+                    context.session.add(member_db)
+                    member_dbs.append(member_db)
+        except exception.DBDuplicateEntry:
+            with excutils.save_and_reraise_exception():
+                # a member was added meanwhile, tell which one clashes
+                self._check_members_unique(context, members, pool_id)
+        if member_dbs:
+            context.session.refresh(member_dbs[0].pool)
+        return [data_models.Member.from_sqlalchemy_model(db_member)
+                for db_member in member_dbs]
+
+    def replace_pool_members(self, context, pool_id, members):
+        """Replaces the members of a pool in a single transaction.
+
+        Members are matched on their address and protocol_port. The ones
+        left out are PENDING_DELETE until the driver removed them, new ones
+        are created PENDING_CREATE and the ones whose weight,
+        admin_state_up or subnet changed are PENDING_UPDATE.
+        """
+        with context.session.begin(subtransactions=True):
+            pool_db = self._get_resource(context, models.PoolV2, pool_id)
+            wanted = {}
+            for member in members:
+                key = (member['address'], member['protocol_port'])
+                if key in wanted:
+                    raise loadbalancerv2.MemberExists(
+                        address=member['address'],
+                        port=member['protocol_port'], pool=pool_id)
+                wanted[key] = member
+            existing = {}
+            for member_db in pool_db.members:
+                key = (member_db.address, member_db.protocol_port)
+                if key in wanted:
+                    existing[key] = member_db
+                else:
+                    member_db.provisioning_status = constants.PENDING_DELETE
+            for member in members:
+                key = (member['address'], member['protocol_port'])
+                member_db = existing.get(key)
+                if member_db is None:
+                    member['tenant_id'] = pool_db.tenant_id
+                    self._load_id_and_tenant_id(context, member)
+                    member['provisioning_status'] = constants.PENDING_CREATE
+                    member['operating_status'] = lb_const.OFFLINE
+                    pool_db.members.append(models.MemberV2(**member))
+                    continue
+                changes = dict((name, member[name])
+                               for name in ('weight', 'admin_state_up',
+                                            'subnet_id')
+                               if getattr(member_db, name) != member[name])
+                if changes:
+                    member_db.update(changes)
+                    member_db.provisioning_status = constants.PENDING_UPDATE
+        context.session.refresh(pool_db)
+        return data_models.Pool.from_sqlalchemy_model(pool_db)
+
+    def update_pool_members_status(self, context, pool_id,
+                                   provisioning_status, operating_status):
+        """Sets the status of the members pending on a pool operation.
+
+        The members left out of a replaced member set are deleted once the
+        pool operation succeeded.
+        """
+        with context.session.begin(subtransactions=True):
+            query = context.session.query(models.MemberV2).filter(
+                models.MemberV2.pool_id == pool_id)
+            if provisioning_status == constants.ACTIVE:
+                query.filter(
+                    models.MemberV2.provisioning_status ==
+                    constants.PENDING_DELETE).delete(
+                        synchronize_session=False)
+            values = {'provisioning_status': provisioning_status}
+            if operating_status:
+                values['operating_status'] = operating_status
+            query.filter(models.MemberV2.provisioning_status.in_(
+                [constants.PENDING_CREATE, constants.PENDING_UPDATE,
+                 constants.PENDING_DELETE])).update(
+                     values, synchronize_session=False)
+
     def update_pool_member(self, context, id, member):
         with context.session.begin(subtransactions=True):
             member_db = self._get_resource(context, models.MemberV2, id)
@@ -38,6 +38,48 @@ class SessionPersistenceV2(model_base.BASEV2):
     cookie_name = sa.Column(sa.String(1024), nullable=True)
 
 
+class LoadBalancerTuning(model_base.BASEV2):
+    """Represents the performance tuning profile of a load balancer."""
+
+    NAME = 'loadbalancer_tuning'
+
+    __tablename__ = "lbaas_loadbalancer_tunings"
+
+    loadbalancer_id = sa.Column(sa.String(36),
+                                sa.ForeignKey("lbaas_loadbalancers.id"),
+                                primary_key=True,
+                                nullable=False)
+    maxconn = sa.Column(sa.Integer, nullable=True)
+    tune_bufsize = sa.Column(sa.Integer, nullable=True)
+    tune_ssl_cachesize = sa.Column(sa.Integer, nullable=True)
+    tune_ssl_lifetime = sa.Column(sa.Integer, nullable=True)
+    timeout_connect = sa.Column(sa.Integer, nullable=True)
+    timeout_client = sa.Column(sa.Integer, nullable=True)
+    timeout_server = sa.Column(sa.Integer, nullable=True)
+    retries = sa.Column(sa.Integer, nullable=True)
+
+
+class ListenerTuning(model_base.BASEV2):
+    """Represents the performance tuning profile of a listener."""
+
+    NAME = 'listener_tuning'
+
+    __tablename__ = "lbaas_listener_tunings"
+
+    listener_id = sa.Column(sa.String(36),
+                            sa.ForeignKey("lbaas_listeners.id"),
+                            primary_key=True,
+                            nullable=False)
+    timeout_client = sa.Column(sa.Integer, nullable=True)
+    timeout_server = sa.Column(sa.Integer, nullable=True)
+    http_keepalive = sa.Column(sa.Boolean(), nullable=True)
+    http_reuse = sa.Column(sa.Enum(*lb_const.SUPPORTED_HTTP_REUSE_MODES,
+                                   name="lbaas_listener_tunings_http_reuse"),
+                           nullable=True)
+    tls_session_tickets = sa.Column(sa.Boolean(), nullable=True)
+    tls_ciphers = sa.Column(sa.String(255), nullable=True)
+
+
 class LoadBalancerStatistics(model_base.BASEV2):
     """Represents load balancer statistics."""
 
@@ -180,6 +222,11 @@ class LoadBalancer(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
         backref=orm.backref("loadbalancer", uselist=False),
         cascade="all, delete-orphan",
         lazy='joined')
+    tuning = orm.relationship(
+        LoadBalancerTuning,
+        uselist=False,
+        cascade="all, delete-orphan",
+        lazy='joined')
     provider = orm.relationship(
         st_db.ProviderResourceAssociation,
         uselist=False,
@@ -261,6 +308,11 @@ class Listener(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
     admin_state_up = sa.Column(sa.Boolean(), nullable=False)
     provisioning_status = sa.Column(sa.String(16), nullable=False)
     operating_status = sa.Column(sa.String(16), nullable=False)
+    tuning = orm.relationship(
+        ListenerTuning,
+        uselist=False,
+        cascade="all, delete-orphan",
+        lazy='joined')
     default_pool = orm.relationship(
         PoolV2, backref=orm.backref("listener", uselist=False), lazy='joined')
     loadbalancer = orm.relationship(
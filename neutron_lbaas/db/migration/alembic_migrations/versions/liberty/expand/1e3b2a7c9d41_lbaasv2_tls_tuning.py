@@ -0,0 +1,39 @@
+# Copyright 2015 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""lbaasv2 tls tuning
+
+Revision ID: 1e3b2a7c9d41
+Revises: 5fedddb38caf
+Create Date: 2015-09-08 14:02:17.204361
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '1e3b2a7c9d41'
+down_revision = '5fedddb38caf'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column(u'lbaas_loadbalancer_tunings',
+                  sa.Column(u'tune_ssl_lifetime', sa.Integer(),
+                            nullable=True))
+    op.add_column(u'lbaas_listener_tunings',
+                  sa.Column(u'tls_session_tickets', sa.Boolean(),
+                            nullable=True))
+    op.add_column(u'lbaas_listener_tunings',
+                  sa.Column(u'tls_ciphers', sa.String(255), nullable=True))
@@ -0,0 +1,61 @@
+# Copyright 2015 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""lbaasv2 tuning profiles
+
+Revision ID: 5fedddb38caf
+Revises: 3345facd0452
+Create Date: 2015-09-02 11:20:41.531117
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5fedddb38caf'
+down_revision = '3345facd0452'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+http_reuse_modes = sa.Enum("never", "safe", "aggressive", "always",
+                           name="lbaas_listener_tunings_http_reuse")
+
+
+def upgrade():
+    op.create_table(
+        u'lbaas_loadbalancer_tunings',
+        sa.Column(u'loadbalancer_id', sa.String(36), nullable=False),
+        sa.Column(u'maxconn', sa.Integer(), nullable=True),
+        sa.Column(u'tune_bufsize', sa.Integer(), nullable=True),
+        sa.Column(u'tune_ssl_cachesize', sa.Integer(), nullable=True),
+        sa.Column(u'timeout_connect', sa.Integer(), nullable=True),
+        sa.Column(u'timeout_client', sa.Integer(), nullable=True),
+        sa.Column(u'timeout_server', sa.Integer(), nullable=True),
+        sa.Column(u'retries', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint([u'loadbalancer_id'],
+                                [u'lbaas_loadbalancers.id'], ),
+        sa.PrimaryKeyConstraint(u'loadbalancer_id')
+    )
+
+    op.create_table(
+        u'lbaas_listener_tunings',
+        sa.Column(u'listener_id', sa.String(36), nullable=False),
+        sa.Column(u'timeout_client', sa.Integer(), nullable=True),
+        sa.Column(u'timeout_server', sa.Integer(), nullable=True),
+        sa.Column(u'http_keepalive', sa.Boolean(), nullable=True),
+        sa.Column(u'http_reuse', http_reuse_modes, nullable=True),
+        sa.ForeignKeyConstraint([u'listener_id'],
+                                [u'lbaas_listeners.id'], ),
+        sa.PrimaryKeyConstraint(u'listener_id')
+    )
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from neutron.common import constants as n_constants
 from neutron.common import exceptions as n_exc
 from neutron.extensions import portbindings
 from neutron.i18n import _LW
@@ -37,6 +38,9 @@ class LoadBalancerCallbacks(object):
         self.plugin = plugin
 
     def get_ready_devices(self, context, host=None):
+        # agents ask for their devices when they start or resync, their
+        # configuration may have changed
+        self.plugin.db.invalidate_lbaas_agent_index()
         with context.session.begin(subtransactions=True):
             agents = self.plugin.db.get_lbaas_agents(
                 context, filters={'host': [host]})
@@ -130,10 +134,29 @@ class LoadBalancerCallbacks(object):
         if obj_type not in model_mapping:
             raise n_exc.Invalid(_('Unknown object type: %s') % obj_type)
         try:
+            lb_created = False
+            if obj_type == 'loadbalancer' and provisioning_status:
+                lb_created = (context.session.query(
+                    db_models.LoadBalancer.provisioning_status).filter_by(
+                        id=obj_id).scalar() == constants.PENDING_CREATE)
             self.plugin.db.update_status(
                 context, model_mapping[obj_type], obj_id,
                 provisioning_status=provisioning_status,
                 operating_status=operating_status)
+            if lb_created:
+                # the agent deployed the listeners, pools, members and
+                # health monitors created along with the load balancer
+                self.plugin.db.update_loadbalancer_graph_status(
+                    context, obj_id, provisioning_status, operating_status)
+            if obj_type == 'pool' and provisioning_status:
+                # members of a replaced member set are deployed with the
+                # pool
+                self.plugin.db.update_pool_members_status(
+                    context, obj_id, provisioning_status, operating_status)
+            if provisioning_status in (constants.ACTIVE, constants.ERROR):
+                self.plugin.complete_coalesced_operations(
+                    context, model_mapping[obj_type], obj_id,
+                    succeeded=provisioning_status == constants.ACTIVE)
         except n_exc.NotFound:
             # update_status may come from agent on an object which was
             # already deleted from db with other request
@@ -163,6 +186,13 @@ class LoadBalancerCallbacks(object):
             LOG.debug('Unable to find port %s to plug.', port_id)
             return
 
+        if not port.get('device_id'):
+            # unplugged by the agent the load balancer was moved off
+            lb = (context.session.query(db_models.LoadBalancer.id).
+                  filter_by(vip_port_id=port_id).first())
+            if lb:
+                port['device_owner'] = n_constants.DEVICE_OWNER_LOADBALANCERV2
+                port['device_id'] = lb.id
         port['admin_state_up'] = True
         port[portbindings.HOST_ID] = host
         self.plugin.db._core_plugin.update_port(
@@ -186,6 +216,16 @@ class LoadBalancerCallbacks(object):
                       port_id)
             return
 
+        # the load balancer was moved to another agent, which has plugged
+        # the port already
+        port_host = port.get(portbindings.HOST_ID)
+        if host and port_host and port_host != host:
+            LOG.debug('Port %(port_id)s is plugged on %(port_host)s, not '
+                      'unplugging it for %(host)s.',
+                      {'port_id': port_id, 'port_host': port_host,
+                       'host': host})
+            return
+
         port['admin_state_up'] = False
         port['device_owner'] = ''
         port['device_id'] = ''
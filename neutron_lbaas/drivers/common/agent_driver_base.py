@@ -15,6 +15,7 @@
 from neutron.common import exceptions as n_exc
 from neutron.common import rpc as n_rpc
 from neutron.db import agents_db
+from neutron.i18n import _LE
 from neutron.services import provider_configuration as provconf
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -22,6 +23,8 @@ import oslo_messaging as messaging
 from oslo_utils import importutils
 
 from neutron_lbaas.drivers.common import agent_callbacks
+from neutron_lbaas.drivers.common import agent_failover
+from neutron_lbaas.drivers.common import agent_rebalancer
 from neutron_lbaas.drivers import driver_base
 from neutron_lbaas.extensions import lbaas_agentschedulerv2
 from neutron_lbaas.services.loadbalancer import constants as lb_const
@@ -51,6 +54,8 @@ class DataModelSerializer(object):
     def serialize_entity(self, ctx, entity):
         if isinstance(entity, data_models.BaseDataModel):
             return entity.to_dict(stats=False)
+        elif isinstance(entity, list):
+            return [self.serialize_entity(ctx, item) for item in entity]
         else:
             return entity
 
@@ -60,6 +65,7 @@ class LoadBalancerAgentApi(object):
 
     # history
     #   1.0 Initial version
+    #   1.1 create_members
     #
 
     def __init__(self, topic):
@@ -118,6 +124,10 @@ class LoadBalancerAgentApi(object):
         cctxt = self.client.prepare(server=host)
         cctxt.cast(context, 'create_member', member=member)
 
+    def create_members(self, context, members, host):
+        cctxt = self.client.prepare(server=host, version='1.1')
+        cctxt.cast(context, 'create_members', members=members)
+
     def update_member(self, context, old_member, member, host):
         cctxt = self.client.prepare(server=host)
         cctxt.cast(context, 'update_member', old_member=old_member,
@@ -147,6 +157,16 @@ class LoadBalancerAgentApi(object):
 
 class LoadBalancerManager(driver_base.BaseLoadBalancerManager):
 
+    @property
+    def creates_graph(self):
+        # the agent deploys the load balancer as fetched from the plugin
+        return True
+
+    @property
+    def rebuilds_loadbalancer(self):
+        # the agent renders the whole load balancer on every operation
+        return True
+
     def update(self, context, old_loadbalancer, loadbalancer):
         super(LoadBalancerManager, self).update(context, old_loadbalancer,
                                                 loadbalancer)
@@ -172,6 +192,8 @@ class LoadBalancerManager(driver_base.BaseLoadBalancerManager):
         # wait until the agent actually deletes it.  Doing this now to keep
         # what v1 had.
         self.driver.plugin.db.delete_loadbalancer(context, loadbalancer.id)
+        self.driver.plugin.complete_coalesced_operations(
+            context, self.model_class, loadbalancer.id)
         if agent:
             self.driver.agent_rpc.delete_loadbalancer(context, loadbalancer,
                                                       agent['host'])
@@ -207,6 +229,8 @@ class ListenerManager(driver_base.BaseListenerManager):
         # status here. May want to wait until the agent actually deletes it.
         # Doing this now to keep what v1 had.
         self.driver.plugin.db.delete_listener(context, listener.id)
+        self.driver.plugin.complete_coalesced_operations(
+            context, self.model_class, listener.id)
         self.driver.plugin.db.update_loadbalancer_provisioning_status(
             context, listener.loadbalancer.id)
         self.driver.agent_rpc.delete_listener(context, listener, agent['host'])
@@ -214,6 +238,11 @@ class ListenerManager(driver_base.BaseListenerManager):
 
 class PoolManager(driver_base.BasePoolManager):
 
+    @property
+    def replaces_members(self):
+        # the agent deploys the pool members as fetched from the plugin
+        return True
+
     def update(self, context, old_pool, pool):
         super(PoolManager, self).update(context, old_pool, pool)
         agent = self.driver.get_loadbalancer_agent(
@@ -235,6 +264,8 @@ class PoolManager(driver_base.BasePoolManager):
         # status here. May want to wait until the agent actually deletes it.
         # Doing this now to keep what v1 had.
         self.driver.plugin.db.delete_pool(context, pool.id)
+        self.driver.plugin.complete_coalesced_operations(
+            context, self.model_class, pool.id)
         self.driver.plugin.db.update_loadbalancer_provisioning_status(
             context, pool.listener.loadbalancer.id)
         self.driver.agent_rpc.delete_pool(context, pool, agent['host'])
@@ -255,6 +286,19 @@ class MemberManager(driver_base.BaseMemberManager):
             context, member.pool.listener.loadbalancer.id)
         self.driver.agent_rpc.create_member(context, member, agent['host'])
 
+    def create_many(self, context, members):
+        # the agent deploys them with a single refresh of the load balancer
+        try:
+            agent = self.driver.get_loadbalancer_agent(
+                context, members[0].pool.listener.loadbalancer.id)
+            self.driver.agent_rpc.create_members(context, members,
+                                                 agent['host'])
+        except Exception:
+            LOG.exception(_LE("Unable to send the creation of %d members "
+                              "to the lbaas agent"), len(members))
+            for member in members:
+                self.failed_completion(context, member)
+
     def delete(self, context, member):
         super(MemberManager, self).delete(context, member)
         agent = self.driver.get_loadbalancer_agent(
@@ -263,6 +307,8 @@ class MemberManager(driver_base.BaseMemberManager):
         # status here. May want to wait until the agent actually deletes it.
         # Doing this now to keep what v1 had.
         self.driver.plugin.db.delete_pool_member(context, member.id)
+        self.driver.plugin.complete_coalesced_operations(
+            context, self.model_class, member.id)
         self.driver.plugin.db.update_loadbalancer_provisioning_status(
             context, member.pool.listener.loadbalancer.id)
         self.driver.agent_rpc.delete_member(context, member, agent['host'])
@@ -293,6 +339,8 @@ class HealthMonitorManager(driver_base.BaseHealthMonitorManager):
         # status here. May want to wait until the agent actually deletes it.
         # Doing this now to keep what v1 had.
         self.driver.plugin.db.delete_healthmonitor(context, healthmonitor.id)
+        self.driver.plugin.complete_coalesced_operations(
+            context, self.model_class, healthmonitor.id)
         self.driver.plugin.db.update_loadbalancer_provisioning_status(
             context, healthmonitor.pool.listener.loadbalancer.id)
         self.driver.agent_rpc.delete_healthmonitor(
@@ -329,6 +377,14 @@ class AgentDriverBase(driver_base.LoadBalancerBaseDriver):
         self.loadbalancer_scheduler = importutils.import_object(
             lb_sched_driver)
 
+        if cfg.CONF.loadbalancer_rebalance_interval > 0:
+            self.rebalancer = agent_rebalancer.AgentRebalancer(self)
+            self.rebalancer.start(cfg.CONF.loadbalancer_rebalance_interval)
+        if cfg.CONF.loadbalancer_failover_interval > 0:
+            self.failover_watchdog = agent_failover.AgentFailoverWatchdog(self)
+            self.failover_watchdog.start(
+                cfg.CONF.loadbalancer_failover_interval)
+
     def _set_callbacks_on_plugin(self):
         # other agent based plugin driver might already set callbacks on plugin
         if hasattr(self.plugin, 'agent_callbacks'):
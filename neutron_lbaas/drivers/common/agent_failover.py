@@ -0,0 +1,163 @@
+# Copyright 2015 OpenStack Foundation.  All rights reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+from neutron import context as ncontext
+from neutron.i18n import _LE, _LI, _LW
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_service import loopingcall
+from oslo_utils import timeutils
+
+from neutron_lbaas import agent_scheduler
+
+LOG = logging.getLogger(__name__)
+
+OPTS = [
+    cfg.IntOpt('loadbalancer_failover_interval',
+               default=0,
+               help=_('Seconds between two checks for dead lbaas agents. '
+                      'The load balancers of agents which did not report '
+                      'for agent_down_time seconds are rescheduled to '
+                      'healthy agents. 0 disables it.')),
+    cfg.IntOpt('loadbalancer_failover_concurrency',
+               default=10,
+               help=_('Number of load balancers of dead agents rescheduled '
+                      'at the same time.')),
+]
+
+cfg.CONF.register_opts(OPTS)
+
+
+class _NoEligibleAgent(Exception):
+    pass
+
+
+class AgentFailoverWatchdog(object):
+    """Reschedules the load balancers of dead agents.
+
+    An agent is dead once it did not report for agent_down_time seconds.
+    Its load balancers are unbound and scheduled again with the scheduler
+    of the driver, then created on their new agent. delete_loadbalancer
+    is cast to the dead agent as well, so that it drops them if it comes
+    back.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.plugin = driver.plugin
+        self.pool = eventlet.GreenPool(
+            max(cfg.CONF.loadbalancer_failover_concurrency, 1))
+        self.metrics = {'failovers': 0,
+                        'rescheduled': 0,
+                        'failed': 0,
+                        'last_recovery_time': None,
+                        'max_recovery_time': 0}
+
+    def start(self, interval):
+        check = loopingcall.FixedIntervalLoopingCall(self.check_agents)
+        check.start(interval=interval, initial_delay=interval)
+
+    def get_metrics(self):
+        return dict(self.metrics)
+
+    def check_agents(self):
+        context = ncontext.get_admin_context()
+        try:
+            self._check_agents(context)
+        except Exception:
+            LOG.exception(_LE('Failed rescheduling the load balancers of '
+                              'dead lbaas agents'))
+
+    def _check_agents(self, context):
+        db = self.plugin.db
+        agent_ids = db.get_lbaas_agent_ids_for_device_driver(
+            context, self.driver.device_driver)
+        agents = db.get_lbaas_agents(context, filters={'id': agent_ids})
+        dead_agents = dict((agent['id'], agent) for agent in agents
+                           if db.is_agent_down(agent['heartbeat_timestamp']))
+        if not dead_agents:
+            return
+        if len(dead_agents) == len(agents):
+            # rather a problem of the server than of the agents
+            LOG.warn(_LW('All lbaas agents are down, not rescheduling '
+                         'their load balancers'))
+            return
+        bindings = db.get_loadbalancer_loads_on_lbaas_agents(
+            context, list(dead_agents), agent_scheduler.LOAD_LOADBALANCERS)
+        if not bindings:
+            return
+        # the scheduler must not pick them from its cached heartbeats
+        db.invalidate_lbaas_agent_index()
+        LOG.info(_LI('Rescheduling %(count)d load balancers of dead lbaas '
+                     'agents %(hosts)s'),
+                 {'count': len(bindings),
+                  'hosts': ', '.join(sorted(agent['host'] for agent in
+                                            dead_agents.values()))})
+        failed_agents = set()
+        for agent_id, rescheduled in self.pool.imap(
+                self._reschedule_loadbalancer,
+                [lb_id for lb_id, _agent_id, _status, _load in bindings],
+                [dead_agents[agent_id]
+                 for _lb_id, agent_id, _status, _load in bindings]):
+            if rescheduled:
+                self.metrics['rescheduled'] += 1
+            else:
+                self.metrics['failed'] += 1
+                failed_agents.add(agent_id)
+        recovered_agents = set(
+            agent_id for _lb_id, agent_id, _status, _load in bindings)
+        for agent_id in recovered_agents - failed_agents:
+            agent = dead_agents[agent_id]
+            # from the last report of the agent to the rescheduling of all
+            # its load balancers
+            recovery_time = timeutils.delta_seconds(
+                agent['heartbeat_timestamp'], timeutils.utcnow())
+            self.metrics['failovers'] += 1
+            self.metrics['last_recovery_time'] = recovery_time
+            self.metrics['max_recovery_time'] = max(
+                self.metrics['max_recovery_time'], recovery_time)
+            LOG.info(_LI('Load balancers of lbaas agent %(host)s recovered '
+                         '%(time).1f seconds after its last report'),
+                     {'host': agent['host'], 'time': recovery_time})
+
+    def _reschedule_loadbalancer(self, lb_id, agent):
+        context = ncontext.get_admin_context()
+        db = self.plugin.db
+        try:
+            with context.session.begin(subtransactions=True):
+                if not db.unbind_loadbalancer(context, lb_id, agent['id']):
+                    # rescheduled or deleted meanwhile
+                    return agent['id'], True
+                loadbalancer = db.get_loadbalancer(context, lb_id)
+                new_agent = self.driver.loadbalancer_scheduler.schedule(
+                    self.plugin, context, loadbalancer,
+                    self.driver.device_driver)
+                if not new_agent:
+                    # rolls the unbinding back
+                    raise _NoEligibleAgent()
+            self.driver.agent_rpc.create_loadbalancer(
+                context, loadbalancer, new_agent['host'],
+                self.driver.device_driver)
+            self.driver.agent_rpc.delete_loadbalancer(
+                context, loadbalancer, agent['host'])
+        except _NoEligibleAgent:
+            LOG.warn(_LW('No eligible lbaas agent for load balancer '
+                         '%(lb_id)s of dead agent %(host)s'),
+                     {'lb_id': lb_id, 'host': agent['host']})
+            return agent['id'], False
+        except Exception:
+            LOG.exception(_LE('Failed rescheduling load balancer %s'), lb_id)
+            return agent['id'], False
+        return agent['id'], True
@@ -0,0 +1,212 @@
+# Copyright 2015 OpenStack Foundation.  All rights reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron import context as ncontext
+from neutron.extensions import portbindings
+from neutron.i18n import _LE, _LI
+from neutron.plugins.common import constants
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_service import loopingcall
+
+from neutron_lbaas.db.loadbalancer import models
+from neutron_lbaas.extensions import loadbalancerv2
+
+LOG = logging.getLogger(__name__)
+
+OPTS = [
+    cfg.IntOpt('loadbalancer_rebalance_interval',
+               default=0,
+               help=_('Seconds between two runs of the rebalancer moving '
+                      'load balancers from overloaded or disabled lbaas '
+                      'agents to the least loaded ones. 0 disables it.')),
+    cfg.IntOpt('loadbalancer_rebalance_max_moves',
+               default=5,
+               help=_('Maximum number of load balancers moved by a run of '
+                      'the rebalancer.')),
+    cfg.FloatOpt('loadbalancer_rebalance_threshold',
+                 default=0.2,
+                 help=_('Fraction by which the load of an agent must exceed '
+                        'its share of the total load, given its capacity, '
+                        'before load balancers are moved off it.')),
+    cfg.BoolOpt('loadbalancer_rebalance_dry_run',
+                default=False,
+                help=_('Only log the load balancers the rebalancer would '
+                       'move.')),
+]
+
+cfg.CONF.register_opts(OPTS)
+
+
+def plan_moves(agent_loads, lb_loads, capacities, max_moves, threshold):
+    """Plans the load balancer moves evening out the load of the agents.
+
+    :param agent_loads: agent id -> load of the agent
+    :param lb_loads: agent id -> [(loadbalancer id, load)] of the load
+                     balancers which can be moved off the agent
+    :param capacities: agent id -> capacity of the agents accepting load
+                       balancers, agents missing from it are drained
+    :return: [(loadbalancer id, source agent id, target agent id)]
+    """
+    if not capacities:
+        return []
+    loads = dict(agent_loads)
+    total_capacity = float(sum(capacities.values()))
+    total_load = sum(loads.values())
+    shares = dict((agent_id, total_load * capacity / total_capacity)
+                  for agent_id, capacity in capacities.items())
+    movable = dict((agent_id, sorted(lbs, key=lambda lb: lb[1],
+                                     reverse=True))
+                   for agent_id, lbs in lb_loads.items())
+    moves = []
+    while len(moves) < max_moves:
+        sources = [agent_id for agent_id in loads
+                   if movable.get(agent_id) and
+                   (agent_id not in shares or
+                    loads[agent_id] > shares[agent_id] * (1 + threshold))]
+        if not sources:
+            break
+        # drained agents first, then the most overloaded one
+        source = max(sources, key=lambda agent_id: (
+            agent_id not in shares,
+            loads[agent_id] - shares.get(agent_id, 0)))
+        target = min(capacities, key=lambda agent_id: (
+            loads[agent_id] / float(capacities[agent_id])))
+        if target == source:
+            break
+        lb = _pick_loadbalancer(movable[source], source, target, loads,
+                                capacities)
+        if not lb:
+            # the load balancers of the source are too big to even out
+            movable[source] = []
+            continue
+        movable[source].remove(lb)
+        loads[source] -= lb[1]
+        loads[target] += lb[1]
+        moves.append((lb[0], source, target))
+    return moves
+
+
+def _pick_loadbalancer(lbs, source, target, loads, capacities):
+    if source not in capacities:
+        # every load balancer leaves a drained agent
+        return lbs[0]
+    # the largest load balancer which leaves the target less loaded than
+    # the source, lbs are sorted by decreasing load
+    for lb in lbs:
+        target_load = (loads[target] + lb[1]) / float(capacities[target])
+        source_load = (loads[source] - lb[1]) / float(capacities[source])
+        if lb[1] and target_load <= source_load:
+            return lb
+
+
+class AgentRebalancer(object):
+    """Moves load balancers between the agents of a device driver.
+
+    Load balancers are moved off agents loaded beyond their share of the
+    total load, and off agents disabled by the administrator. Agents which
+    are down are left alone. A load balancer is moved by binding it and
+    its vip port to the new agent and casting delete_loadbalancer to the
+    old agent and create_loadbalancer to the new one, it stays
+    PENDING_UPDATE until the new agent deployed it.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.plugin = driver.plugin
+
+    def start(self, interval):
+        rebalance = loopingcall.FixedIntervalLoopingCall(self.rebalance)
+        rebalance.start(interval=interval, initial_delay=interval)
+
+    def rebalance(self):
+        context = ncontext.get_admin_context()
+        try:
+            moves, agents = self._plan_moves(context)
+            for lb_id, source, target in moves:
+                if cfg.CONF.loadbalancer_rebalance_dry_run:
+                    LOG.info(_LI('Would move load balancer %(lb_id)s from '
+                                 'lbaas agent %(source)s to %(target)s'),
+                             {'lb_id': lb_id,
+                              'source': agents[source]['host'],
+                              'target': agents[target]['host']})
+                else:
+                    self._move_loadbalancer(context, lb_id, agents[source],
+                                            agents[target])
+        except Exception:
+            LOG.exception(_LE('Failed rebalancing load balancers across '
+                              'lbaas agents'))
+
+    def _plan_moves(self, context):
+        db = self.plugin.db
+        agent_ids = db.get_lbaas_agent_ids_for_device_driver(
+            context, self.driver.device_driver)
+        agents = dict(
+            (agent['id'], agent) for agent in
+            db.get_lbaas_agents(context, filters={'id': agent_ids})
+            if not db.is_agent_down(agent['heartbeat_timestamp']))
+        if not agents:
+            return [], agents
+        capacities = db.get_lbaas_agent_capacities(context)
+        capacities = dict((agent_id, capacities.get(agent_id) or 1)
+                          for agent_id, agent in agents.items()
+                          if agent['admin_state_up'])
+        agent_loads = dict((agent_id, 0) for agent_id in agents)
+        lb_loads = {}
+        for lb_id, agent_id, status, load in (
+                db.get_loadbalancer_loads_on_lbaas_agents(
+                    context, list(agents),
+                    cfg.CONF.loadbalancer_scheduler_load)):
+            agent_loads[agent_id] += load
+            # load balancers with an operation in progress are not moved
+            if status == constants.ACTIVE:
+                lb_loads.setdefault(agent_id, []).append((lb_id, load))
+        moves = plan_moves(agent_loads, lb_loads, capacities,
+                           cfg.CONF.loadbalancer_rebalance_max_moves,
+                           cfg.CONF.loadbalancer_rebalance_threshold)
+        return moves, agents
+
+    def _move_loadbalancer(self, context, lb_id, source, target):
+        db = self.plugin.db
+        try:
+            db.test_and_set_status(context, models.LoadBalancer, lb_id,
+                                   constants.PENDING_UPDATE)
+        except (loadbalancerv2.StateInvalid, loadbalancerv2.EntityNotFound):
+            LOG.debug('Load balancer %s changed since the rebalancing was '
+                      'planned, not moving it', lb_id)
+            return
+        if not db.rebind_loadbalancer(context, lb_id, source['id'],
+                                      target['id']):
+            db.update_status(context, models.LoadBalancer, lb_id,
+                             provisioning_status=constants.ACTIVE)
+            return
+        LOG.info(_LI('Moving load balancer %(lb_id)s from lbaas agent '
+                     '%(source)s to %(target)s'),
+                 {'lb_id': lb_id, 'source': source['host'],
+                  'target': target['host']})
+        loadbalancer = db.get_loadbalancer(context, lb_id)
+        # the old agent leaves a vip port bound to another host plugged,
+        # whichever of the two casts is handled first
+        try:
+            db._core_plugin.update_port(
+                context, loadbalancer.vip_port_id,
+                {'port': {portbindings.HOST_ID: target['host']}})
+        except Exception:
+            LOG.exception(_LE('Failed binding the vip port of load '
+                              'balancer %(lb_id)s to %(host)s'),
+                          {'lb_id': lb_id, 'host': target['host']})
+        self.driver.agent_rpc.delete_loadbalancer(context, loadbalancer,
+                                                  source['host'])
+        self.driver.agent_rpc.create_loadbalancer(
+            context, loadbalancer, target['host'], self.driver.device_driver)
@@ -14,11 +14,15 @@
 
 from functools import wraps
 
+from neutron.i18n import _LE
+from oslo_log import log as logging
 from oslo_utils import excutils
 
 from neutron_lbaas.db.loadbalancer import models
 from neutron_lbaas.drivers import driver_mixins
 
+LOG = logging.getLogger(__name__)
+
 
 class NotImplementedManager(object):
     """Helper class to make any subclass of LoadBalancerBaseDriver explode if
@@ -61,6 +65,27 @@ class BaseLoadBalancerManager(driver_mixins.BaseRefreshMixin,
         """Does this driver need to allocate its own virtual IPs"""
         return False
 
+    @property
+    def creates_graph(self):
+        """Does create deploy the listeners nested in the load balancer
+
+        A load balancer may be created along with its listeners and their
+        pools, members and health monitors. The plugin only passes such a
+        load balancer to drivers whose create deploys all of them.
+        """
+        return False
+
+    @property
+    def rebuilds_loadbalancer(self):
+        """Does every operation deploy the whole load balancer
+
+        Coalesced driver operations only pass the last operation on a load
+        balancer to the driver. The plugin only coalesces the operations of
+        drivers which deploy the load balancer as it is in the database on
+        every operation, leaving out the entities in PENDING_DELETE.
+        """
+        return False
+
     def create_and_allocate_vip(self, context, obj):
         """Create the load balancer and allocate a VIP
 
@@ -92,10 +117,34 @@ class BasePoolManager(driver_mixins.BaseManagerMixin):
     def db_delete_method(self):
         return self.driver.plugin.db.delete_pool
 
+    @property
+    def replaces_members(self):
+        """Does update apply the member set of the pool
+
+        A pool update may replace its member set. The members of the new
+        pool are PENDING_CREATE, PENDING_UPDATE or PENDING_DELETE, the
+        plugin only passes such an update to drivers which apply them.
+        """
+        return False
+
 
 class BaseMemberManager(driver_mixins.BaseManagerMixin):
     model_class = models.MemberV2
 
+    def create_many(self, context, objs):
+        """Creates the members of a bulk request.
+
+        Creates them one by one, drivers able to create them with a single
+        backend call should override it. It does not raise, the members
+        which could not be created are passed to failed_completion.
+        """
+        for obj in objs:
+            try:
+                self.create(context, obj)
+            except Exception:
+                LOG.exception(_LE("Unable to create member %s"), obj.id)
+                self.failed_completion(context, obj)
+
     @property
     def db_delete_method(self):
         return self.driver.plugin.db.delete_member
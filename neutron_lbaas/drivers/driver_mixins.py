@@ -65,6 +65,9 @@ class BaseManagerMixin(object):
         LOG.debug("Starting successful_completion method after a successful "
                   "driver action.")
         obj_sa_cls = data_models.DATA_MODEL_TO_SA_MODEL_MAP[obj.__class__]
+        # operations coalesced into this one were deployed along with it
+        self.driver.plugin.complete_coalesced_operations(
+            context, obj.__class__, obj.id)
         if delete:
             # Check if driver is responsible for vip allocation.  If the driver
             # is responsible, then it is also responsible for cleaning it up.
@@ -102,6 +105,12 @@ class BaseManagerMixin(object):
             context, models.LoadBalancer, obj.root_loadbalancer.id,
             provisioning_status=lb_p_status,
             operating_status=lb_op_status)
+        self._complete_loadbalancer_graph(context, obj, constants.ACTIVE,
+                                          lb_const.ONLINE)
+        if isinstance(obj, data_models.Pool) and not delete:
+            # members of a replaced member set are deployed with the pool
+            self.driver.plugin.db.update_pool_members_status(
+                context, obj.id, constants.ACTIVE, lb_const.ONLINE)
         if obj == obj.root_loadbalancer or delete:
             # Do not want to update the status of the load balancer again
             # Or the obj was deleted from the db so no need to update the
@@ -132,6 +141,8 @@ class BaseManagerMixin(object):
         """
         LOG.debug("Starting failed_completion method after a failed driver "
                   "action.")
+        self.driver.plugin.complete_coalesced_operations(
+            context, obj.__class__, obj.id, succeeded=False)
         if isinstance(obj, data_models.LoadBalancer):
             LOG.debug("Updating load balancer {0} to provisioning_status = "
                       "{1}, operating_status = {2}.".format(
@@ -141,6 +152,8 @@ class BaseManagerMixin(object):
                 context, models.LoadBalancer, obj.root_loadbalancer.id,
                 provisioning_status=constants.ERROR,
                 operating_status=lb_const.OFFLINE)
+            self._complete_loadbalancer_graph(context, obj, constants.ERROR,
+                                              lb_const.OFFLINE)
             return
         obj_sa_cls = data_models.DATA_MODEL_TO_SA_MODEL_MAP[obj.__class__]
         LOG.debug("Updating object of type {0} with id of {1} to "
@@ -151,6 +164,9 @@ class BaseManagerMixin(object):
             context, obj_sa_cls, obj.id,
             provisioning_status=constants.ERROR,
             operating_status=lb_const.OFFLINE)
+        if isinstance(obj, data_models.Pool):
+            self.driver.plugin.db.update_pool_members_status(
+                context, obj.id, constants.ERROR, lb_const.OFFLINE)
         LOG.debug("Updating load balancer {0} to "
                   "provisioning_status = {1}".format(obj.root_loadbalancer.id,
                                                      constants.ACTIVE))
@@ -158,6 +174,16 @@ class BaseManagerMixin(object):
             context, models.LoadBalancer, obj.root_loadbalancer.id,
             provisioning_status=constants.ACTIVE)
 
+    def _complete_loadbalancer_graph(self, context, obj, provisioning_status,
+                                     operating_status):
+        # the listeners, pools, members and health monitors created along
+        # with a load balancer share the outcome of its creation
+        if (isinstance(obj, data_models.LoadBalancer) and
+                obj.provisioning_status == constants.PENDING_CREATE and
+                obj.listeners):
+            self.driver.plugin.db.update_loadbalancer_graph_status(
+                context, obj.id, provisioning_status, operating_status)
+
     def update_vip(self, context, loadbalancer_id, vip_address,
                    vip_port_id=None):
         lb_update = {'vip_address': vip_address}
@@ -16,6 +16,8 @@
 import os
 import shutil
 import socket
+import tempfile
+import time
 
 import netaddr
 from neutron.agent.linux import ip_lib
@@ -146,18 +148,92 @@ class HaproxyNSDriver(agent_device_driver.AgentDeviceDriver):
         socket_path = self._get_state_file_path(loadbalancer_id,
                                                 'haproxy_stats.sock', False)
         if os.path.exists(socket_path):
-            parsed_stats = self._get_stats_from_socket(
-                socket_path,
-                entity_type=(STATS_TYPE_BACKEND_REQUEST |
-                             STATS_TYPE_SERVER_REQUEST))
-            lb_stats = self._get_backend_stats(parsed_stats)
-            lb_stats['members'] = self._get_servers_stats(parsed_stats)
+            # each haproxy process keeps its own counters behind its own
+            # stats socket
+            socket_paths = jinja_cfg.get_stats_socket_paths(
+                socket_path, jinja_cfg.get_nbproc(loadbalancer_id))
+            backend_stats = []
+            servers_stats = []
+            for path in socket_paths:
+                if not os.path.exists(path):
+                    continue
+                parsed_stats = self._get_stats_from_socket(
+                    path,
+                    entity_type=(STATS_TYPE_BACKEND_REQUEST |
+                                 STATS_TYPE_SERVER_REQUEST))
+                backend_stats.append(self._get_backend_stats(parsed_stats))
+                servers_stats.append(self._get_servers_stats(parsed_stats))
+            lb_stats = self._sum_backend_stats(backend_stats)
+            lb_stats['members'] = self._merge_servers_stats(servers_stats)
             return lb_stats
         else:
             LOG.warn(_LW('Stats socket not found for loadbalancer %s') %
                      loadbalancer_id)
             return {}
 
+    def refresh_tls_material(self):
+        for loadbalancer in list(self.deployed_loadbalancers.values()):
+            listeners = [
+                listener for listener in loadbalancer.listeners
+                if listener.protocol == lb_const.PROTOCOL_TERMINATED_HTTPS]
+            if not listeners:
+                continue
+            haproxy_base_dir = self._get_state_file_path(loadbalancer.id, '')
+            refresh = (
+                any(jinja_cfg.uses_tls_ticket_keys(listener)
+                    for listener in listeners) and
+                jinja_cfg.tls_ticket_keys_expired(
+                    jinja_cfg.get_tls_ticket_keys_path(haproxy_base_dir)))
+            if self.conf.haproxy.ocsp_refresh_interval > 0:
+                for listener in listeners:
+                    for pem_path, tls_cert in jinja_cfg.get_listener_tls_certs(
+                            listener, haproxy_base_dir):
+                        if self._refresh_ocsp_response(pem_path, tls_cert):
+                            refresh = True
+            if refresh:
+                # rendering the configuration rotates the ticket keys and
+                # haproxy loads the OCSP responses when it is reloaded
+                self.deploy_instance(loadbalancer)
+
+    def _refresh_ocsp_response(self, pem_path, tls_cert):
+        """Fetches the OCSP response of a certificate when it is outdated.
+
+        :return: True if a new OCSP response was stored, False otherwise
+        """
+        ocsp_path = pem_path + '.ocsp'
+        if (os.path.exists(ocsp_path) and
+                os.path.getmtime(ocsp_path) +
+                self.conf.haproxy.ocsp_refresh_interval > time.time()):
+            return False
+        if not tls_cert.intermediates:
+            LOG.debug('No issuer certificate to request an OCSP response '
+                      'for %s', pem_path)
+            return False
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            cert_path = os.path.join(tmp_dir, 'cert.pem')
+            issuer_path = os.path.join(tmp_dir, 'issuer.pem')
+            resp_path = os.path.join(tmp_dir, 'response.der')
+            linux_utils.replace_file(cert_path, tls_cert.certificate)
+            linux_utils.replace_file(issuer_path, tls_cert.intermediates[0])
+            url = linux_utils.execute(['openssl', 'x509', '-noout',
+                                       '-ocsp_uri', '-in', cert_path]).strip()
+            if not url:
+                return False
+            linux_utils.execute(['openssl', 'ocsp', '-no_nonce',
+                                 '-issuer', issuer_path, '-cert', cert_path,
+                                 '-url', url, '-respout', resp_path])
+            with open(resp_path, 'rb') as resp:
+                linux_utils.replace_file(ocsp_path, resp.read())
+        except (RuntimeError, IOError):
+            LOG.warn(_LW('Unable to refresh the OCSP response of %s'),
+                     pem_path)
+            return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return True
+
     @n_utils.synchronized('haproxy-driver')
     def deploy_instance(self, loadbalancer):
         """Deploys loadbalancer if necessary
@@ -176,6 +252,12 @@ class HaproxyNSDriver(agent_device_driver.AgentDeviceDriver):
         return True
 
     def update(self, loadbalancer):
+        if (self.conf.haproxy.seamless_reload and
+                self._get_reload_generation(loadbalancer.id) is not None):
+            self._reload(loadbalancer)
+            return
+        # instances not running in master-worker mode, e.g. spawned before
+        # seamless reloads were enabled, are replaced by new processes
         pid_path = self._get_state_file_path(loadbalancer.id, 'haproxy.pid')
         extra_args = ['-sf']
         extra_args.extend(p.strip() for p in open(pid_path, 'r'))
@@ -267,6 +349,35 @@ class HaproxyNSDriver(agent_device_driver.AgentDeviceDriver):
                 }
         return res
 
+    def _sum_backend_stats(self, process_stats):
+        process_stats = [stats for stats in process_stats if stats]
+        if len(process_stats) < 2:
+            return process_stats[0] if process_stats else {}
+        totals = {}
+        for stats in process_stats:
+            for stat, value in stats.items():
+                totals[stat] = totals.get(stat, 0) + int(value or 0)
+        return dict((stat, str(value)) for stat, value in totals.items())
+
+    def _merge_servers_stats(self, process_stats):
+        res = {}
+        for servers in process_stats:
+            for member_id, stats in servers.items():
+                if member_id not in res:
+                    res[member_id] = dict(stats)
+                    continue
+                merged = res[member_id]
+                # every process runs its own health checks, the member is
+                # up as long as one of them reaches it
+                if stats[lb_const.STATS_STATUS] == constants.ACTIVE:
+                    merged[lb_const.STATS_STATUS] = constants.ACTIVE
+                    merged[lb_const.STATS_HEALTH] = stats[
+                        lb_const.STATS_HEALTH]
+                merged[lb_const.STATS_FAILED_CHECKS] = str(
+                    int(merged[lb_const.STATS_FAILED_CHECKS] or 0) +
+                    int(stats[lb_const.STATS_FAILED_CHECKS] or 0))
+        return res
+
     def _get_state_file_path(self, loadbalancer_id, kind,
                              ensure_state_dir=True):
         """Returns the file name for a given kind of config file."""
@@ -337,11 +448,8 @@ class HaproxyNSDriver(agent_device_driver.AgentDeviceDriver):
         interface_name = self.vif_driver.get_device_name(port)
         self.vif_driver.unplug(interface_name, namespace=namespace)
 
-    def _spawn(self, loadbalancer, extra_cmd_args=()):
-        namespace = get_ns_name(loadbalancer.id)
+    def _save_config(self, loadbalancer):
         conf_path = self._get_state_file_path(loadbalancer.id, 'haproxy.conf')
-        pid_path = self._get_state_file_path(loadbalancer.id,
-                                             'haproxy.pid')
         sock_path = self._get_state_file_path(loadbalancer.id,
                                               'haproxy_stats.sock')
         user_group = self.conf.haproxy.user_group
@@ -351,15 +459,78 @@ class HaproxyNSDriver(agent_device_driver.AgentDeviceDriver):
                               sock_path,
                               user_group,
                               haproxy_base_dir)
+        return conf_path
+
+    def _spawn(self, loadbalancer, extra_cmd_args=()):
+        namespace = get_ns_name(loadbalancer.id)
+        conf_path = self._save_config(loadbalancer)
+        pid_path = self._get_state_file_path(loadbalancer.id,
+                                             'haproxy.pid')
         cmd = ['haproxy', '-f', conf_path, '-p', pid_path]
+        if self.conf.haproxy.seamless_reload:
+            sock_path = self._get_state_file_path(loadbalancer.id,
+                                                  'haproxy_stats.sock')
+            # The master passes its command line on to the new workers
+            # whenever it is reloaded, -x makes them take over the
+            # listening sockets of the old ones
+            cmd.extend(['-W', '-x',
+                        jinja_cfg.get_reload_socket_path(sock_path)])
         cmd.extend(extra_cmd_args)
 
         ns = ip_lib.IPWrapper(namespace=namespace)
         ns.netns.execute(cmd)
 
+        self._set_reload_generation(
+            loadbalancer.id,
+            0 if self.conf.haproxy.seamless_reload else None)
         # remember deployed loadbalancer id
         self.deployed_loadbalancers[loadbalancer.id] = loadbalancer
 
+    def _reload(self, loadbalancer):
+        namespace = get_ns_name(loadbalancer.id)
+        conf_path = self._save_config(loadbalancer)
+        pid_path = self._get_state_file_path(loadbalancer.id,
+                                             'haproxy.pid')
+
+        # A master that fails to load the new configuration keeps running
+        # without any worker, so refuse to reload it with a broken one
+        ns = ip_lib.IPWrapper(namespace=namespace)
+        ns.netns.execute(['haproxy', '-c', '-f', conf_path])
+
+        # in master-worker mode the pid file only holds the master pid
+        with open(pid_path, 'r') as pids:
+            master_pid = pids.readline().strip()
+        linux_utils.execute(['kill', '-USR2', master_pid], run_as_root=True)
+
+        generation = self._get_reload_generation(loadbalancer.id) + 1
+        self._set_reload_generation(loadbalancer.id, generation)
+        LOG.debug('Reloaded haproxy for loadbalancer %(lb_id)s, reload '
+                  'generation %(generation)d',
+                  {'lb_id': loadbalancer.id, 'generation': generation})
+        self.deployed_loadbalancers[loadbalancer.id] = loadbalancer
+
+    def _get_reload_generation(self, loadbalancer_id):
+        """Returns the number of seamless reloads of a loadbalancer.
+
+        None is returned when its haproxy does not run in master-worker mode.
+        """
+        generation_path = self._get_state_file_path(
+            loadbalancer_id, 'haproxy.generation', False)
+        try:
+            with open(generation_path, 'r') as generation:
+                return int(generation.read().strip())
+        except (IOError, ValueError):
+            return None
+
+    def _set_reload_generation(self, loadbalancer_id, generation):
+        generation_path = self._get_state_file_path(loadbalancer_id,
+                                                    'haproxy.generation')
+        if generation is None:
+            if os.path.exists(generation_path):
+                os.remove(generation_path)
+            return
+        linux_utils.replace_file(generation_path, str(generation))
+
 
 class LoadBalancerManager(agent_device_driver.BaseLoadBalancerManager):
 
@@ -399,13 +570,25 @@ class ListenerManager(agent_device_driver.BaseListenerManager):
                 index_to_remove = index
         loadbalancer.listeners.pop(index_to_remove)
 
+    def _invalidate_tls_certs(self, *listeners):
+        container_ids = set()
+        for listener in listeners:
+            if listener.default_tls_container_id:
+                container_ids.add(listener.default_tls_container_id)
+            container_ids.update(sni.tls_container_id
+                                 for sni in listener.sni_containers)
+        jinja_cfg.invalidate_tls_cert_cache(container_ids)
+
     def update(self, old_listener, new_listener):
+        # an update is the signal to pick up modified certificates
+        self._invalidate_tls_certs(old_listener, new_listener)
         self.driver.loadbalancer.refresh(new_listener.loadbalancer)
 
     def create(self, listener):
         self.driver.loadbalancer.refresh(listener.loadbalancer)
 
     def delete(self, listener):
+        self._invalidate_tls_certs(listener)
         loadbalancer = listener.loadbalancer
         self._remove_listener(loadbalancer, listener.id)
         if len(loadbalancer.listeners) > 0:
@@ -446,6 +629,11 @@ class MemberManager(agent_device_driver.BaseMemberManager):
     def create(self, member):
         self.driver.loadbalancer.refresh(member.pool.listener.loadbalancer)
 
+    def create_many(self, members):
+        # the refresh deploys all of them
+        self.driver.loadbalancer.refresh(
+            members[0].pool.listener.loadbalancer)
+
     def delete(self, member):
         self._remove_member(member.pool, member.id)
         self.driver.loadbalancer.refresh(member.pool.listener.loadbalancer)
@@ -436,6 +436,14 @@ class HaproxyNSDriver(driver_base.LoadBalancerBaseDriver):
 
 class LoadBalancerManager(driver_base.BaseLoadBalancerManager):
 
+    @property
+    def creates_graph(self):
+        return True
+
+    @property
+    def rebuilds_loadbalancer(self):
+        return True
+
     def refresh(self, context, loadbalancer):
         super(LoadBalancerManager, self).refresh(context, loadbalancer)
         if not self.deployable(loadbalancer):
@@ -550,6 +558,10 @@ class ListenerManager(driver_base.BaseListenerManager):
 
 class PoolManager(driver_base.BasePoolManager):
 
+    @property
+    def replaces_members(self):
+        return True
+
     def update(self, context, old_pool, new_pool):
         super(PoolManager, self).update(context, old_pool, new_pool)
         try:
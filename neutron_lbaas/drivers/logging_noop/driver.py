@@ -62,6 +62,16 @@ class LoggingNoopLoadBalancerManager(LoggingNoopCommonManager,
         LOG.debug('allocates_vip queried')
         return False
 
+    @property
+    def creates_graph(self):
+        LOG.debug('creates_graph queried')
+        return True
+
+    @property
+    def rebuilds_loadbalancer(self):
+        LOG.debug('rebuilds_loadbalancer queried')
+        return True
+
     def create_and_allocate_vip(self, context, obj):
         LOG.debug("LB %s no-op, create_and_allocate_vip %s",
                   self.__class__.__name__, obj.id)
@@ -91,7 +101,11 @@ class LoggingNoopListenerManager(LoggingNoopCommonManager,
 
 class LoggingNoopPoolManager(LoggingNoopCommonManager,
                              driver_base.BasePoolManager):
-    pass
+
+    @property
+    def replaces_members(self):
+        LOG.debug('replaces_members queried')
+        return True
 
 
 class LoggingNoopMemberManager(LoggingNoopCommonManager,
@@ -15,6 +15,7 @@
 
 
 import abc
+import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 
@@ -32,6 +33,7 @@ DEFAULT_PERIODIC_TASK_INTERVAL = "2"
 DEFAULT_STATUS_COLLECTION = "True"
 DEFAULT_PAGE_SIZE = "300"
 DEFAULT_IS_SYNCRONOUS = "True"
+STATUS_FETCH_CONCURRENCY = 10
 
 PROV = "provisioning_status"
 NETSCALER = "netscaler"
@@ -81,6 +83,25 @@ NETSCALER_CC_OPTS = [
 if not hasattr(cfg.CONF, "netscaler_driver"):
     cfg.CONF.register_opts(NETSCALER_CC_OPTS, 'netscaler_driver')
 
+# Registered on their own, the group may already hold the options of the
+# v1 driver
+NETSCALER_CC_CLIENT_OPTS = [
+    cfg.IntOpt(
+        'netscaler_ncc_concurrency',
+        default=ncc_client.DEFAULT_CONCURRENCY,
+        help=_('Maximum number of concurrent requests, and of keep-alive '
+               'connections, to the NetScaler Control Center Server.'),
+    ),
+    cfg.IntOpt(
+        'netscaler_ncc_session_timeout',
+        default=ncc_client.DEFAULT_SESSION_TIMEOUT,
+        help=_('Lifetime in seconds of a NetScaler Control Center Server '
+               'session, when the login response does not give it. A new '
+               'session is requested before it expires.'),
+    ),
+]
+cfg.CONF.register_opts(NETSCALER_CC_CLIENT_OPTS, 'netscaler_driver')
+
 
 LBS_RESOURCE = 'loadbalancers'
 LB_RESOURCE = 'loadbalancer'
@@ -103,7 +124,7 @@ PAGE = 'page'
 SIZE = 'size'
 
 
-PROVISIONING_STATUS_TRACKER = []
+PROVISIONING_STATUS_TRACKER = set()
 
 
 class NetScalerLoadBalancerDriverV2(driver_base.LoadBalancerBaseDriver):
@@ -122,10 +143,10 @@ class NetScalerLoadBalancerDriverV2(driver_base.LoadBalancerBaseDriver):
         ncc_username = self.driver_conf.netscaler_ncc_username
         ncc_password = self.driver_conf.netscaler_ncc_password
         ncc_cleanup_mode = cfg.CONF.netscaler_driver.netscaler_ncc_cleanup_mode
-        self.client = ncc_client.NSClient(ncc_uri,
-                                          ncc_username,
-                                          ncc_password,
-                                          ncc_cleanup_mode)
+        self.client = ncc_client.NSClient(
+            ncc_uri, ncc_username, ncc_password, ncc_cleanup_mode,
+            concurrency=self.driver_conf.netscaler_ncc_concurrency,
+            session_timeout=self.driver_conf.netscaler_ncc_session_timeout)
 
     def _init_managers(self):
         self.load_balancer = NetScalerLoadBalancerManager(self)
@@ -143,7 +164,9 @@ class NetScalerLoadBalancerDriverV2(driver_base.LoadBalancerBaseDriver):
         self.is_status_collection = True
         if is_status_collection.lower() == "false":
             self.is_status_collection = False
-        self.pagesize_status_collection = pagesize_status_collection
+        self.pagesize_status_collection = int(pagesize_status_collection)
+        self.status_pool = eventlet.GreenPool(
+            min(self.pagesize_status_collection, STATUS_FETCH_CONCURRENCY))
 
         self._init_pending_status_tracker()
 
@@ -153,12 +176,13 @@ class NetScalerLoadBalancerDriverV2(driver_base.LoadBalancerBaseDriver):
         # Initialize PROVISIONING_STATUS_TRACKER for loadbalancers in
         # pending state
         db_lbs = self.plugin.db.get_loadbalancers(
-            self.admin_ctx)
+            self.admin_ctx,
+            filters={'provisioning_status': [constants.PENDING_CREATE,
+                                             constants.PENDING_UPDATE,
+                                             constants.PENDING_DELETE]})
         for db_lb in db_lbs:
-            if ((db_lb.id not in PROVISIONING_STATUS_TRACKER) and
-                (db_lb.provider.provider_name == NETSCALER) and
-                    (db_lb.provisioning_status.startswith("PENDING_"))):
-                PROVISIONING_STATUS_TRACKER.append(db_lb.id)
+            if db_lb.provider.provider_name == NETSCALER:
+                PROVISIONING_STATUS_TRACKER.add(db_lb.id)
 
     def collect_provision_status(self):
 
@@ -167,11 +191,26 @@ class NetScalerLoadBalancerDriverV2(driver_base.LoadBalancerBaseDriver):
         self._update_loadbalancers_provision_status()
 
     def _update_loadbalancers_provision_status(self):
-        for lb_id in PROVISIONING_STATUS_TRACKER:
-            lb_statuses = self._get_loadbalancer_statuses(lb_id)
-            if lb_statuses:
-                self._update_status_tree_in_db(
-                    lb_id, lb_statuses["lb_statuses"])
+        # Statuses are fetched one page of tracked loadbalancers at a
+        # time, the requests of a page running concurrently
+        lb_ids = list(PROVISIONING_STATUS_TRACKER)
+        pagesize = self.pagesize_status_collection
+        for start in range(0, len(lb_ids), pagesize):
+            page = lb_ids[start:start + pagesize]
+            page_statuses = self.status_pool.imap(
+                self._get_loadbalancer_statuses, page)
+            for lb_id, lb_statuses in zip(page, page_statuses):
+                if lb_statuses:
+                    self._apply_status_tree(
+                        lb_id, lb_statuses["lb_statuses"])
+
+    def _apply_status_tree(self, lb_id, loadbalancer_statuses):
+        try:
+            with self.admin_ctx.session.begin(subtransactions=True):
+                self._update_status_tree_in_db(lb_id, loadbalancer_statuses)
+        except Exception:
+            LOG.exception(_LE("error updating the statuses of "
+                              "loadbalancer %s"), lb_id)
 
     def _get_loadbalancer_statuses(self, lb_id):
         """Retrieve listener status from Control Center."""
@@ -201,7 +240,7 @@ class NetScalerLoadBalancerDriverV2(driver_base.LoadBalancerBaseDriver):
                     self.admin_ctx, db_lb, delete=True)
             except Exception:
                 LOG.error(_LE("error with successful completion"))
-            PROVISIONING_STATUS_TRACKER.remove(lb_id)
+            PROVISIONING_STATUS_TRACKER.discard(lb_id)
             return
         else:
             status_lb = loadbalancer_statuses["loadbalancer"]
@@ -254,7 +293,7 @@ class NetScalerLoadBalancerDriverV2(driver_base.LoadBalancerBaseDriver):
             self._update_entity_status_in_db(
                 track_loadbalancer, db_lb, status_lb, self.load_balancer)
             if not track_loadbalancer['track']:
-                PROVISIONING_STATUS_TRACKER.remove(lb_id)
+                PROVISIONING_STATUS_TRACKER.discard(lb_id)
 
     def _update_entity_status_in_db(self, track_loadbalancer,
                                     db_entity,
@@ -380,8 +419,7 @@ class NetScalerCommonManager(BaseManagerMixin):
 
     def track_provision_status(self, obj):
         for lb in self._get_loadbalancers(obj):
-            if lb.id not in PROVISIONING_STATUS_TRACKER:
-                PROVISIONING_STATUS_TRACKER.append(lb.id)
+            PROVISIONING_STATUS_TRACKER.add(lb.id)
 
     def _get_loadbalancers(self, obj):
         lbs = []
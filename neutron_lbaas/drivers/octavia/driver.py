@@ -11,15 +11,19 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
-from datetime import datetime
 from functools import wraps
+import heapq
 import threading
 import time
+import zlib
 
 from neutron import context as ncontext
+from neutron.i18n import _LE
+from neutron.plugins.common import constants
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from oslo_utils import encodeutils
 from oslo_utils import excutils
 import requests
 
@@ -28,6 +32,14 @@ from neutron_lbaas.drivers import driver_base
 LOG = logging.getLogger(__name__)
 VERSION = "1.0.0"
 
+# Octavia answers 409 while the load balancer is immutable, the request
+# was not applied and is retried whatever its method
+CONFLICT_STATUS_CODE = 409
+# a server error may come after the request was applied, only the requests
+# which can safely be applied twice are retried
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+IDEMPOTENT_METHODS = ('GET', 'PUT', 'DELETE')
+
 OPTS = [
     cfg.StrOpt(
         'base_url',
@@ -46,6 +58,43 @@ OPTS = [
         help=_('Time to stop polling octavia when a status of an entity does '
                'not change.')
     ),
+    cfg.IntOpt(
+        'request_poll_max_interval',
+        default=15,
+        help=_('Maximum interval in seconds to poll octavia, the poll '
+               'interval of a load balancer doubles up to it while its '
+               'status does not change.')
+    ),
+    cfg.IntOpt(
+        'request_pool_size',
+        default=10,
+        help=_('Maximum number of connections to octavia kept alive and '
+               'reused across requests.')
+    ),
+    cfg.IntOpt(
+        'request_timeout',
+        default=30,
+        help=_('Timeout in seconds of the requests to octavia.')
+    ),
+    cfg.IntOpt(
+        'request_retries',
+        default=3,
+        help=_('Number of times a request to octavia is retried when the '
+               'connection fails or octavia answers with a conflict or '
+               'server error. POST requests are only retried on conflicts '
+               'and connection timeouts.')
+    ),
+    cfg.FloatOpt(
+        'request_retry_backoff',
+        default=0.5,
+        help=_('Delay in seconds before retrying a request to octavia, it '
+               'doubles with every retry.')
+    ),
+    cfg.BoolOpt(
+        'request_compression',
+        default=False,
+        help=_('Compress the bodies of the requests to octavia with gzip.')
+    ),
     cfg.BoolOpt(
         'allocates_vip',
         default=False,
@@ -56,37 +105,173 @@ OPTS = [
 cfg.CONF.register_opts(OPTS, 'octavia')
 
 
-def thread_op(manager, entity, delete=False, lb_create=False):
-    context = ncontext.get_admin_context()
-    poll_interval = cfg.CONF.octavia.request_poll_interval
-    poll_timeout = cfg.CONF.octavia.request_poll_timeout
-    start_dt = datetime.now()
-    prov_status = None
-    while (datetime.now() - start_dt).seconds < poll_timeout:
-        octavia_lb = manager.driver.load_balancer.get(entity.root_loadbalancer)
+class _PendingOperation(object):
+
+    def __init__(self, manager, entity, delete, lb_create, submitted,
+                 deadline, on_complete=None):
+        self.manager = manager
+        self.entity = entity
+        self.delete = delete
+        self.lb_create = lb_create
+        self.submitted = submitted
+        self.deadline = deadline
+        self.on_complete = on_complete
+
+
+class CompletionPoller(object):
+    """Tracks the completion of the operations sent to Octavia.
+
+    Pending operations are grouped by root load balancer. A single thread
+    polls each load balancer in turn, one status request resolves every
+    operation waiting on it. The poll interval of a load balancer backs off
+    while it stays in a pending state and is reset by new operations.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._cond = threading.Condition()
+        # root load balancer id -> list of _PendingOperation
+        self._pending = {}
+        # root load balancer id -> (load balancer, poll interval, poll time)
+        self._polls = {}
+        # heap of (poll time, root load balancer id)
+        self._schedule = []
+        self._thread = None
+
+    def add(self, manager, entity, delete=False, lb_create=False,
+            on_complete=None):
+        """Waits for the completion of an operation sent to Octavia.
+
+        :param manager: completes the entity, None to only wait for the
+                        operation
+        :param on_complete: called with True or False once the operation
+                            succeeded or failed, after its entity was
+                            completed
+        """
+        lb = entity.root_loadbalancer
+        now = time.time()
+        op = _PendingOperation(manager, entity, delete, lb_create, now,
+                               now + cfg.CONF.octavia.request_poll_timeout,
+                               on_complete)
+        with self._cond:
+            self._pending.setdefault(lb.id, []).append(op)
+            self._reschedule(lb, cfg.CONF.octavia.request_poll_interval, now,
+                             keep_earlier=True)
+            self._start()
+            self._cond.notify()
+
+    def _reschedule(self, lb, interval, now, keep_earlier=False):
+        deadline = min(op.deadline for op in self._pending[lb.id])
+        poll_time = min(now + interval, deadline)
+        scheduled = self._polls.get(lb.id)
+        if keep_earlier and scheduled and scheduled[2] <= poll_time:
+            # a steady stream of operations must not push the poll back
+            self._polls[lb.id] = (lb, interval, scheduled[2])
+            return
+        self._polls[lb.id] = (lb, interval, poll_time)
+        heapq.heappush(self._schedule, (poll_time, lb.id))
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.setDaemon(True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            lb_id = self._next_poll()
+            try:
+                self.poll(lb_id)
+            except Exception:
+                LOG.exception(_LE("Unable to poll Octavia for load balancer "
+                                  "%s"), lb_id)
+
+    def _next_poll(self):
+        with self._cond:
+            while True:
+                if not self._schedule:
+                    self._cond.wait()
+                    continue
+                poll_time, lb_id = self._schedule[0]
+                if self._polls.get(lb_id, (None, None, None))[2] != poll_time:
+                    # superseded by a later reschedule
+                    heapq.heappop(self._schedule)
+                    continue
+                delay = poll_time - time.time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._schedule)
+                return lb_id
+
+    def poll(self, lb_id):
+        with self._cond:
+            if lb_id not in self._polls:
+                return
+            lb, interval, poll_time = self._polls[lb_id]
+        requested = time.time()
+        octavia_lb = {}
+        try:
+            octavia_lb = self.driver.load_balancer.get(lb)
+        except Exception:
+            LOG.exception(_LE("Unable to retrieve load balancer %s from "
+                              "Octavia"), lb_id)
         prov_status = octavia_lb.get('provisioning_status')
         LOG.debug("Octavia reports load balancer {0} has provisioning status "
-                  "of {1}".format(entity.root_loadbalancer.id, prov_status))
+                  "of {1}".format(lb_id, prov_status))
+
+        now = time.time()
+        resolved = []
+        with self._cond:
+            remaining = []
+            for op in self._pending.pop(lb_id, []):
+                # operations submitted while the status was requested may
+                # not be reflected by it yet
+                if ((prov_status in ('ACTIVE', 'DELETED', 'ERROR') and
+                     op.submitted <= requested) or op.deadline <= now):
+                    resolved.append(op)
+                else:
+                    remaining.append(op)
+            if remaining:
+                self._pending[lb_id] = remaining
+                if remaining[-1].submitted > requested:
+                    interval = cfg.CONF.octavia.request_poll_interval
+                else:
+                    interval = min(interval * 2,
+                                   cfg.CONF.octavia.request_poll_max_interval)
+                self._reschedule(lb, interval, now)
+            else:
+                del self._polls[lb_id]
+
+        context = ncontext.get_admin_context()
+        for op in resolved:
+            succeeded = self._complete(context, op, prov_status, octavia_lb)
+            if op.on_complete:
+                op.on_complete(succeeded)
+
+    def _complete(self, context, op, prov_status, octavia_lb):
+        if op.manager is None:
+            return prov_status == 'ACTIVE' or prov_status == 'DELETED'
         if prov_status == 'ACTIVE' or prov_status == 'DELETED':
-            kwargs = {'delete': delete}
-            if manager.driver.allocates_vip and lb_create:
-                kwargs['lb_create'] = lb_create
+            kwargs = {'delete': op.delete}
+            if op.manager.driver.allocates_vip and op.lb_create:
+                kwargs['lb_create'] = op.lb_create
                 # TODO(blogan): drop fk constraint on vip_port_id to ports
                 # table because the port can't be removed unless the load
                 # balancer has been deleted.  Until then we won't populate the
                 # vip_port_id field.
                 # entity.vip_port_id = octavia_lb.get('vip').get('port_id')
-                entity.vip_address = octavia_lb.get('vip').get('ip_address')
-            manager.successful_completion(context, entity, **kwargs)
-            return
-        elif prov_status == 'ERROR':
-            manager.failed_completion(context, entity)
-            return
-        time.sleep(poll_interval)
-    LOG.debug("Timeout has expired for load balancer {0} to complete an "
-              "operation.  The last reported status was "
-              "{1}".format(entity.root_loadbalancer.id, prov_status))
-    manager.failed_completion(context, entity)
+                op.entity.vip_address = octavia_lb.get('vip').get(
+                    'ip_address')
+            op.manager.successful_completion(context, op.entity, **kwargs)
+            return True
+        if prov_status != 'ERROR':
+            LOG.debug("Timeout has expired for load balancer {0} to complete "
+                      "an operation.  The last reported status was "
+                      "{1}".format(op.entity.root_loadbalancer.id,
+                                   prov_status))
+        op.manager.failed_completion(context, op.entity)
+        return False
 
 
 # A decorator for wrapping driver operations, which will automatically
@@ -100,12 +285,8 @@ def async_op(func):
                      isinstance(args[0], LoadBalancerManager))
         try:
             r = func(*args, **kwargs)
-            thread = threading.Thread(target=thread_op,
-                                      args=(args[0], args[2]),
-                                      kwargs={'delete': d,
-                                              'lb_create': lb_create})
-            thread.setDaemon(True)
-            thread.start()
+            args[0].driver.poller.add(args[0], args[2], delete=d,
+                                      lb_create=lb_create)
             return r
         except Exception:
             with excutils.save_and_reraise_exception():
@@ -117,23 +298,57 @@ class OctaviaRequest(object):
 
     def __init__(self, base_url):
         self.base_url = base_url
+        # The session keeps the connections to the controller alive, it is
+        # shared by the API workers and the completion poller
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=cfg.CONF.octavia.request_pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-type': 'application/json'})
 
     def request(self, method, url, args=None, headers=None):
+        url = '%s%s' % (self.base_url, str(url))
         if args:
-            if not headers:
-                headers = {
-                    'Content-type': 'application/json'
-                }
             args = jsonutils.dumps(args)
-        LOG.debug("url = %s", '%s%s' % (self.base_url, str(url)))
+        LOG.debug("url = %s", url)
         LOG.debug("args = %s", args)
-        r = requests.request(method,
-                             '%s%s' % (self.base_url, str(url)),
-                             data=args,
-                             headers=headers)
-        LOG.debug("Octavia Response Code: {0}".format(r.status_code))
-        LOG.debug("Octavia Response Body: {0}".format(r.content))
-        LOG.debug("Octavia Response Headers: {0}".format(r.headers))
+        if args and cfg.CONF.octavia.request_compression:
+            compressor = zlib.compressobj(9, zlib.DEFLATED,
+                                          16 + zlib.MAX_WBITS)
+            args = compressor.compress(encodeutils.safe_encode(args))
+            args += compressor.flush()
+            headers = dict(headers or {})
+            headers['Content-Encoding'] = 'gzip'
+
+        idempotent = method in IDEMPOTENT_METHODS
+        retries = cfg.CONF.octavia.request_retries
+        for attempt in range(retries + 1):
+            try:
+                r = self.session.request(
+                    method, url, data=args, headers=headers,
+                    timeout=cfg.CONF.octavia.request_timeout)
+            except requests.ConnectionError as e:
+                # other connection errors may be raised once the request
+                # was sent
+                if attempt == retries or not (
+                        idempotent or
+                        isinstance(e, requests.exceptions.ConnectTimeout)):
+                    raise
+                LOG.debug("Unable to connect to Octavia, retrying %s %s",
+                          method, url)
+            else:
+                if attempt == retries or not (
+                        r.status_code == CONFLICT_STATUS_CODE or
+                        (idempotent and r.status_code in RETRY_STATUS_CODES)):
+                    break
+                LOG.debug("Octavia Response Code: %s, retrying %s %s",
+                          r.status_code, method, url)
+            time.sleep(cfg.CONF.octavia.request_retry_backoff * 2 ** attempt)
+
+        LOG.debug("Octavia Response Code: %s", r.status_code)
+        LOG.debug("Octavia Response Body: %s", r.content)
+        LOG.debug("Octavia Response Headers: %s", r.headers)
         if method != 'DELETE':
             return r.json()
 
@@ -156,6 +371,7 @@ class OctaviaDriver(driver_base.LoadBalancerBaseDriver):
         super(OctaviaDriver, self).__init__(plugin)
 
         self.req = OctaviaRequest(cfg.CONF.octavia.base_url)
+        self.poller = CompletionPoller(self)
 
         self.load_balancer = LoadBalancerManager(self)
         self.listener = ListenerManager(self)
@@ -183,11 +399,30 @@ class LoadBalancerManager(driver_base.BaseLoadBalancerManager):
     def allocates_vip(self):
         return cfg.CONF.octavia.allocates_vip
 
+    @property
+    def creates_graph(self):
+        return True
+
     def create_and_allocate_vip(self, context, lb):
         self.create(context, lb)
 
-    @async_op
-    def create(self, context, lb):
+    @staticmethod
+    def _listener_graph_args(listener):
+        args = ListenerManager._create_args(listener)
+        pool = listener.default_pool
+        if pool:
+            args['default_pool'] = PoolManager._create_args(pool)
+            if pool.members:
+                args['default_pool']['members'] = [
+                    MemberManager._create_args(member)
+                    for member in pool.members]
+            if pool.healthmonitor:
+                args['default_pool']['health_monitor'] = (
+                    HealthMonitorManager._create_args(pool.healthmonitor))
+        return args
+
+    @classmethod
+    def _create_args(cls, lb):
         args = {
             'id': lb.id,
             'name': lb.name,
@@ -199,7 +434,16 @@ class LoadBalancerManager(driver_base.BaseLoadBalancerManager):
                 'port_id': lb.vip_port_id,
             }
         }
-        self.driver.req.post(self._url(lb), args)
+        if lb.listeners:
+            # a load balancer created with its listeners is sent to
+            # Octavia as a single graph
+            args['listeners'] = [cls._listener_graph_args(listener)
+                                 for listener in lb.listeners]
+        return args
+
+    @async_op
+    def create(self, context, lb):
+        self.driver.req.post(self._url(lb), self._create_args(lb))
 
     @async_op
     def update(self, context, old_lb, lb):
@@ -234,8 +478,8 @@ class ListenerManager(driver_base.BaseListenerManager):
             s += '/%s' % id
         return s
 
-    @classmethod
-    def _write(cls, write_func, url, listener, create=True):
+    @staticmethod
+    def _args(listener, create=True):
         sni_container_ids = [sni.tls_container_id
                              for sni in listener.sni_containers]
         args = {
@@ -250,7 +494,15 @@ class ListenerManager(driver_base.BaseListenerManager):
         }
         if create:
             args['id'] = listener.id
-        write_func(url, args)
+        return args
+
+    @classmethod
+    def _create_args(cls, listener):
+        return cls._args(listener)
+
+    @classmethod
+    def _write(cls, write_func, url, listener, create=True):
+        write_func(url, cls._args(listener, create=create))
 
     @async_op
     def create(self, context, listener):
@@ -277,8 +529,8 @@ class PoolManager(driver_base.BasePoolManager):
             s += '/%s' % id
         return s
 
-    @classmethod
-    def _write(cls, write_func, url, pool, create=True):
+    @staticmethod
+    def _args(pool, create=True):
         args = {
             'name': pool.name,
             'description': pool.description,
@@ -293,16 +545,75 @@ class PoolManager(driver_base.BasePoolManager):
             }
         if create:
             args['id'] = pool.id
-        write_func(url, args)
+        return args
+
+    @classmethod
+    def _create_args(cls, pool):
+        return cls._args(pool)
+
+    @classmethod
+    def _write(cls, write_func, url, pool, create=True):
+        write_func(url, cls._args(pool, create=create))
 
     @async_op
     def create(self, context, pool):
         self._write(self.driver.req.post, self._url(pool), pool)
 
-    @async_op
+    @property
+    def replaces_members(self):
+        return True
+
     def update(self, context, old_pool, pool):
-        self._write(self.driver.req.put, self._url(pool, id=pool.id), pool,
-                    create=False)
+        old_members = dict((member.id, member) for member in old_pool.members)
+        writes = [(self._write, self.driver.req.put,
+                   self._url(pool, id=pool.id), pool, False)]
+        # the members replaced with the pool follow its update, a request
+        # at a time as Octavia answers 409 while applying one
+        for member in pool.members:
+            url = MemberManager._url(member)
+            member_url = MemberManager._url(member, member.id)
+            old_member = old_members.get(member.id)
+            if member.provisioning_status == constants.PENDING_DELETE:
+                writes.append((self.driver.req.delete, member_url))
+            elif member.provisioning_status == constants.PENDING_CREATE:
+                writes.append((self.driver.req.post, url,
+                               MemberManager._create_args(member)))
+            elif member.provisioning_status != constants.PENDING_UPDATE:
+                continue
+            elif old_member and old_member.subnet_id != member.subnet_id:
+                # the subnet of a member cannot be updated
+                writes.append((self.driver.req.delete, member_url))
+                writes.append((self.driver.req.post, url,
+                               MemberManager._create_args(member)))
+            else:
+                writes.append((self.driver.req.put, member_url,
+                               MemberManager._update_args(member)))
+        self._update_next(context, pool, writes)
+
+    def _update_next(self, context, pool, writes):
+        write = writes.pop(0)
+        try:
+            write[0](*write[1:])
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self.failed_completion(context, pool)
+        if not writes:
+            self.driver.poller.add(self, pool)
+            return
+
+        def on_complete(succeeded):
+            # runs in the poller thread
+            poll_context = ncontext.get_admin_context()
+            if not succeeded:
+                self.failed_completion(poll_context, pool)
+                return
+            try:
+                self._update_next(poll_context, pool, writes)
+            except Exception:
+                LOG.exception(_LE("Unable to update pool %s on Octavia"),
+                              pool.id)
+
+        self.driver.poller.add(None, pool, on_complete=on_complete)
 
     @async_op
     def delete(self, context, pool):
@@ -321,9 +632,9 @@ class MemberManager(driver_base.BaseMemberManager):
             s += '/%s' % id
         return s
 
-    @async_op
-    def create(self, context, member):
-        args = {
+    @staticmethod
+    def _create_args(member):
+        return {
             'id': member.id,
             'enabled': member.admin_state_up,
             'ip_address': member.address,
@@ -331,16 +642,23 @@ class MemberManager(driver_base.BaseMemberManager):
             'weight': member.weight,
             'subnet_id': member.subnet_id,
         }
-        self.driver.req.post(self._url(member), args)
 
     @async_op
-    def update(self, context, old_member, member):
-        args = {
+    def create(self, context, member):
+        self.driver.req.post(self._url(member), self._create_args(member))
+
+    @staticmethod
+    def _update_args(member):
+        return {
             'enabled': member.admin_state_up,
             'protocol_port': member.protocol_port,
             'weight': member.weight,
         }
-        self.driver.req.put(self._url(member, member.id), args)
+
+    @async_op
+    def update(self, context, old_member, member):
+        self.driver.req.put(self._url(member, member.id),
+                            self._update_args(member))
 
     @async_op
     def delete(self, context, member):
@@ -357,9 +675,9 @@ class HealthMonitorManager(driver_base.BaseHealthMonitorManager):
             hm.pool.id)
         return s
 
-    @classmethod
-    def _write(cls, write_func, url, hm):
-        args = {
+    @staticmethod
+    def _create_args(hm):
+        return {
             'type': hm.type,
             'delay': hm.delay,
             'timeout': hm.timeout,
@@ -370,7 +688,10 @@ class HealthMonitorManager(driver_base.BaseHealthMonitorManager):
             'expected_codes': hm.expected_codes,
             'enabled': hm.admin_state_up,
         }
-        write_func(cls._url(hm), args)
+
+    @classmethod
+    def _write(cls, write_func, url, hm):
+        write_func(cls._url(hm), cls._create_args(hm))
 
     @async_op
     def create(self, context, hm):
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from neutron.plugins.common import constants
 from oslo_config import cfg
 from oslo_log import helpers as log_helpers
 
@@ -31,6 +32,25 @@ driver_opts = [
     cfg.StrOpt('vdirect_password',
                default='radware',
                help=_('vDirect user password.')),
+    cfg.IntOpt('vdirect_connection_pool_size',
+               default=10,
+               help=_('Maximum number of concurrent connections to each '
+                      'vDirect server, idle connections are kept open. '
+                      'Default: 10.')),
+    cfg.IntOpt('completion_handler_workers',
+               default=4,
+               help=_('Number of threads checking the completion of '
+                      'vDirect operations. Default: 4.')),
+    cfg.FloatOpt('completion_poll_interval',
+                 default=1.0,
+                 help=_('Seconds to wait before checking an uncompleted '
+                        'vDirect operation again. The interval doubles '
+                        'after each check. Default: 1.')),
+    cfg.FloatOpt('completion_max_poll_interval',
+                 default=16.0,
+                 help=_('Maximum number of seconds between two checks '
+                        'of an uncompleted vDirect operation. '
+                        'Default: 16.')),
     cfg.StrOpt('service_adc_type',
                default="VA",
                help=_('Service ADC type. Default: VA.')),
@@ -86,6 +106,12 @@ driver_opts = [
                default='apply',
                help=_('Name of the workflow action. '
                       'Default: apply.')),
+    cfg.BoolOpt('incremental_workflow_params',
+                default=False,
+                help=_('Send only the parts of the object graph changed '
+                       'since the last successful workflow action. The '
+                       'workflow template must support incremental '
+                       'parameters. Default: False.')),
     cfg.StrOpt('stats_action_name',
                default='stats',
                help=_('Name of the workflow action for statistics. '
@@ -122,9 +148,18 @@ class RadwareLBaaSBaseV2Driver(driver_base.LoadBalancerBaseDriver):
 
 class LoadBalancerManager(driver_base.BaseLoadBalancerManager):
 
+    @property
+    def creates_graph(self):
+        return True
+
+    @property
+    def rebuilds_loadbalancer(self):
+        return True
+
     @log_helpers.log_method_call
     def create(self, context, lb):
-        self.successful_completion(context, lb)
+        # the workflow is only created once there are members to serve
+        self.refresh(context, lb)
 
     @log_helpers.log_method_call
     def update(self, context, old_lb, lb):
@@ -187,6 +222,10 @@ class ListenerManager(driver_base.BaseListenerManager):
 
 class PoolManager(driver_base.BasePoolManager):
 
+    @property
+    def replaces_members(self):
+        return True
+
     @log_helpers.log_method_call
     def create(self, context, pool):
         if self.driver.workflow_exists(pool.root_loadbalancer):
@@ -197,7 +236,10 @@ class PoolManager(driver_base.BasePoolManager):
 
     @log_helpers.log_method_call
     def update(self, context, old_pool, pool):
-        if self.driver.workflow_exists(old_pool.root_loadbalancer):
+        # a replaced member set may bring the first members of the graph
+        if (self.driver.workflow_exists(old_pool.root_loadbalancer) or
+            any(member.provisioning_status != constants.PENDING_DELETE
+                for member in pool.members)):
             self.driver.execute_workflow(
                 context, self, pool, old_data_model=old_pool)
         else:
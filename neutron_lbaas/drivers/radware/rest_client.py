@@ -13,7 +13,10 @@
 #    under the License.
 
 import base64
+import errno
 import httplib
+import socket
+import threading
 
 from neutron.i18n import _LE, _LW
 from oslo_log import helpers as log_helpers
@@ -30,6 +33,71 @@ RESP_STR = 2
 RESP_DATA = 3
 
 
+def is_connection_closed(e):
+    """Tells whether a request failed on a connection closed by the server.
+
+    An idle connection closed by the server fails the next request before
+    any response is read, the request did not reach the server and can be
+    sent again. Timeouts are not such failures, the server may have
+    received the request.
+    """
+    if isinstance(e, httplib.BadStatusLine):
+        return True
+    return (isinstance(e, socket.error) and
+            not isinstance(e, socket.timeout) and
+            e.errno in (errno.EPIPE, errno.ECONNRESET))
+
+
+class ConnectionPool(object):
+    """Persistent connections to a vDirect server.
+
+    At most pool_size connections are used at the same time, idle ones are
+    kept open so that calls do not pay a TCP and SSL handshake each time.
+    """
+
+    def __init__(self, server, port, ssl, timeout, pool_size):
+        self.server = server
+        self.port = port
+        self.ssl = ssl
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(pool_size)
+
+    def _connect(self):
+        if self.ssl:
+            return httplib.HTTPSConnection(
+                self.server, self.port, timeout=self.timeout)
+        return httplib.HTTPConnection(
+            self.server, self.port, timeout=self.timeout)
+
+    def get(self):
+        """Returns a connection and whether it was used before."""
+        self._semaphore.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        try:
+            return self._connect(), False
+        except Exception:
+            self._semaphore.release()
+            raise
+
+    def put(self, conn, reuse=True):
+        if reuse:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+        self._semaphore.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
 class vDirectRESTClient(object):
     """REST server proxy to Radware vDirect."""
     @log_helpers.log_method_call
@@ -41,18 +109,25 @@ class vDirectRESTClient(object):
                  port=2189,
                  ssl=True,
                  timeout=5000,
-                 base_uri=''):
+                 base_uri='',
+                 pool_size=10):
         self.server = server
         self.secondary_server = secondary_server
         self.port = port
         self.ssl = ssl
         self.base_uri = base_uri
         self.timeout = timeout
+        self.pool_size = pool_size
         if user and password:
             self.auth = base64.encodestring('%s:%s' % (user, password))
             self.auth = self.auth.replace('\n', '')
+            self.auth_header = 'Basic %s' % self.auth
         else:
             raise r_exc.AuthenticationMissing()
+        # server -> ConnectionPool, both servers keep their connections
+        # when flipping
+        self._pools = {}
+        self._pools_lock = threading.Lock()
 
         debug_params = {'server': self.server,
                         'sec_server': self.secondary_server,
@@ -63,6 +138,15 @@ class vDirectRESTClient(object):
                   'port=%(port)d, '
                   'ssl=%(ssl)r', debug_params)
 
+    def _get_pool(self, server):
+        with self._pools_lock:
+            pool = self._pools.get(server)
+            if pool is None:
+                pool = self._pools[server] = ConnectionPool(
+                    server, self.port, self.ssl, self.timeout,
+                    self.pool_size)
+            return pool
+
     def _flip_servers(self):
         LOG.warning(_LW('Fliping servers. Current is: %(server)s, '
                  'switching to %(secondary)s'),
@@ -108,41 +192,37 @@ class vDirectRESTClient(object):
 
         debug_data = 'binary' if binary else body
         debug_data = debug_data if debug_data else 'EMPTY'
-        if not headers:
-            headers = {'Authorization': 'Basic %s' % self.auth}
-        else:
-            headers['Authorization'] = 'Basic %s' % self.auth
-        conn = None
-        if self.ssl:
-            conn = httplib.HTTPSConnection(
-                self.server, self.port, timeout=self.timeout)
-            if conn is None:
-                LOG.error(_LE('vdirectRESTClient: Could not establish HTTPS '
-                          'connection'))
-                return 0, None, None, None
-        else:
-            conn = httplib.HTTPConnection(
-                self.server, self.port, timeout=self.timeout)
-            if conn is None:
-                LOG.error(_LE('vdirectRESTClient: Could not establish HTTP '
-                          'connection'))
-                return 0, None, None, None
+        headers = dict(headers or {})
+        headers['Authorization'] = self.auth_header
 
-        try:
-            conn.request(action, uri, body, headers)
-            response = conn.getresponse()
-            respstr = response.read()
+        pool = self._get_pool(self.server)
+        while True:
+            try:
+                conn, reused = pool.get()
+            except Exception as e:
+                LOG.error(_LE('vdirectRESTClient: Could not establish '
+                              'connection, %r'), e)
+                return -1, None, None, None
+            response = None
+            try:
+                conn.request(action, uri, body, headers)
+                response = conn.getresponse()
+                respstr = response.read()
+            except Exception as e:
+                pool.put(conn, reuse=False)
+                if (reused and response is None and
+                        is_connection_closed(e)):
+                    # the server closed the idle connection
+                    continue
+                log_dict = {'action': action, 'e': e}
+                LOG.error(_LE('vdirectRESTClient: %(action)s failure, %(e)r'),
+                          log_dict)
+                return -1, None, None, None
+            pool.put(conn, reuse=not response.will_close)
             respdata = respstr
             try:
                 respdata = jsonutils.loads(respstr)
             except ValueError:
                 # response was not JSON, ignore the exception
                 pass
-            ret = (response.status, response.reason, respstr, respdata)
-        except Exception as e:
-            log_dict = {'action': action, 'e': e}
-            LOG.error(_LE('vdirectRESTClient: %(action)s failure, %(e)r'),
-                      log_dict)
-            ret = -1, None, None, None
-        conn.close()
-        return ret
+            return response.status, response.reason, respstr, respdata
@@ -13,6 +13,8 @@
 #    under the License.
 
 import copy
+import heapq
+import itertools
 import netaddr
 import threading
 import time
@@ -118,21 +120,27 @@ class RadwareLBaaSV2Driver(base_v2_driver.RadwareLBaaSBaseV2Driver):
         self.workflow_params = rad.workflow_params
         self.workflow_action_name = rad.workflow_action_name
         self.stats_action_name = rad.stats_action_name
+        self.incremental_workflow_params = rad.incremental_workflow_params
+        # last object graph applied on each workflow
+        self._applied_graphs = {}
         vdirect_address = rad.vdirect_address
         sec_server = rad.ha_secondary_address
         self.rest_client = rest.vDirectRESTClient(
             server=vdirect_address,
             secondary_server=sec_server,
             user=rad.vdirect_user,
-            password=rad.vdirect_password)
+            password=rad.vdirect_password,
+            pool_size=rad.vdirect_connection_pool_size)
         self.workflow_params['provision_service'] = rad_debug.provision_service
         self.workflow_params['configure_l3'] = rad_debug.configure_l3
         self.workflow_params['configure_l4'] = rad_debug.configure_l4
 
         self.queue = Queue.Queue()
-        self.completion_handler = OperationCompletionHandler(self.queue,
-                                                             self.rest_client,
-                                                             plugin)
+        self.completion_handler = OperationCompletionHandler(
+            self.queue, self.rest_client, plugin,
+            workers=rad.completion_handler_workers,
+            poll_interval=rad.completion_poll_interval,
+            max_poll_interval=rad.completion_max_poll_interval)
         self.workflow_templates_exists = False
         self.completion_handler.setDaemon(True)
         self.completion_handler_started = False
@@ -256,6 +264,7 @@ class RadwareLBaaSV2Driver(base_v2_driver.RadwareLBaaSBaseV2Driver):
             self._create_workflow(lb,
                                   lb_subnet['network_id'],
                                   proxy_subnet['network_id'])
+            self._applied_graphs.pop(self._get_wf_name(lb), None)
         else:
             # Check if proxy port exists
             proxy_port = self._get_proxy_port(ctx, lb)
@@ -273,22 +282,57 @@ class RadwareLBaaSV2Driver(base_v2_driver.RadwareLBaaSBaseV2Driver):
         wf_name = self._get_wf_name(lb)
         resource = '/api/workflow/%s/action/%s' % (
             wf_name, self.workflow_action_name)
-        response = _rest_wrapper(self.rest_client.call('POST', resource,
-                                 {'parameters': objects_graph},
-                                 TEMPLATE_HEADER), success_codes=[202])
+        parameters = self._get_workflow_parameters(wf_name, objects_graph)
+        try:
+            response = _rest_wrapper(self.rest_client.call('POST', resource,
+                                     {'parameters': parameters},
+                                     TEMPLATE_HEADER), success_codes=[202])
+        except r_exc.RESTRequestFailure:
+            if parameters is objects_graph:
+                raise
+            # the workflow does not match the cached graph, full sync
+            LOG.warning(_LW('Incremental parameters were rejected by '
+                            'workflow %s, sending all the parameters'),
+                        wf_name)
+            response = _rest_wrapper(self.rest_client.call('POST', resource,
+                                     {'parameters': objects_graph},
+                                     TEMPLATE_HEADER), success_codes=[202])
         LOG.debug('_update_workflow response: %s ', response)
+        self._applied_graphs[wf_name] = objects_graph
 
         oper = OperationAttributes(
             manager, response['uri'], lb,
             data_model, old_data_model,
-            delete=delete)
+            delete=delete,
+            post_failure_function=self._forget_applied_graph)
 
         LOG.debug('Pushing operation %s to the queue', oper)
         self._start_completion_handling_thread()
         self.queue.put_nowait(oper)
 
+    def _get_workflow_parameters(self, wf_name, objects_graph):
+        """Return the workflow action parameters for the object graph.
+
+        Only the changes since the last graph applied on the workflow are
+        returned when incremental parameters are enabled. The full graph
+        is returned when no graph was applied yet, when the last action
+        failed, or when the proxy address changed.
+        """
+        applied_graph = self._applied_graphs.pop(wf_name, None)
+        if (not self.incremental_workflow_params or applied_graph is None or
+            applied_graph['pip_address'] != objects_graph['pip_address']):
+            return objects_graph
+        parameters = _graph_delta(applied_graph, objects_graph)
+        parameters['incremental'] = True
+        return parameters
+
+    def _forget_applied_graph(self, ctx, data_model):
+        self._applied_graphs.pop(
+            self._get_wf_name(data_model.root_loadbalancer), None)
+
     def remove_workflow(self, ctx, manager, lb):
         wf_name = self._get_wf_name(lb)
+        self._applied_graphs.pop(wf_name, None)
         LOG.debug('Remove the workflow %s' % wf_name)
         resource = '/api/workflow/%s' % (wf_name)
         rest_return = self.rest_client.call('DELETE', resource, None, None)
@@ -517,26 +561,70 @@ class RadwareLBaaSV2Driver(base_v2_driver.RadwareLBaaSBaseV2Driver):
 
 class OperationCompletionHandler(threading.Thread):
 
-    """Update DB with operation status or delete the entity from DB."""
+    """Update DB with operation status or delete the entity from DB.
+
+    Operations consumed from the queue are kept in a heap ordered by
+    their next check time. A dispatcher thread hands the due operations
+    to a pool of worker threads, an uncompleted operation is checked
+    again after an interval doubling with each check, up to
+    max_poll_interval.
+    """
 
-    def __init__(self, queue, rest_client, plugin):
+    def __init__(self, queue, rest_client, plugin, workers=1,
+                 poll_interval=1, max_poll_interval=1):
         threading.Thread.__init__(self)
         self.queue = queue
         self.rest_client = rest_client
         self.plugin = plugin
         self.stoprequest = threading.Event()
-        self.opers_to_handle_before_rest = 0
+        self.workers = max(workers, 1)
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(max_poll_interval, poll_interval)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # heap of (check time, sequence, operation, interval)
+        self._schedule = []
+        self._sequence = itertools.count()
+        self._due = Queue.Queue()
+        self._threads = []
+        self.completed_count = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
 
     def join(self, timeout=None):
         self.stoprequest.set()
         super(OperationCompletionHandler, self).join(timeout)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def get_metrics(self):
+        """Return the queue depth and the completion latency figures."""
+        with self._lock:
+            scheduled = len(self._schedule)
+            completed = self.completed_count
+            total_latency = self.total_latency
+            max_latency = self.max_latency
+        return {'queue_depth': (self.queue.qsize() + scheduled +
+                                self._due.qsize()),
+                'scheduled': scheduled,
+                'completed': completed,
+                'avg_latency': (total_latency / completed
+                                if completed else 0.0),
+                'max_latency': max_latency}
+
+    def _record_completion(self, latency):
+        with self._lock:
+            self.completed_count += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
 
     def handle_operation_completion(self, oper):
         result = self.rest_client.call('GET',
                                        oper.operation_url,
                                        None,
                                        None)
-        LOG.debug('Operation completion requested %(uri) and got: %(result)',
+        LOG.debug('Operation completion requested %(uri)s and got: '
+                  '%(result)s',
                   {'uri': oper.operation_url, 'result': result})
         completed = result[rest.RESP_DATA]['complete']
         reason = result[rest.RESP_REASON],
@@ -546,6 +634,7 @@ class OperationCompletionHandler(threading.Thread):
             # or delete the entire graph from DB
             success = result[rest.RESP_DATA]['success']
             sec_to_completion = time.time() - oper.creation_time
+            self._record_completion(sec_to_completion)
             debug_data = {'oper': oper,
                           'sec_to_completion': sec_to_completion,
                           'success': success}
@@ -571,39 +660,82 @@ class OperationCompletionHandler(threading.Thread):
 
         return completed
 
-    def run(self):
+    def _schedule_check(self, oper, check_time, interval):
+        with self._wakeup:
+            heapq.heappush(self._schedule,
+                           (check_time, next(self._sequence),
+                            oper, interval))
+            self._wakeup.notify()
+
+    def _dispatch_due(self):
+        """Hand the operations due for a check over to the workers."""
+        now = time.time()
+        with self._lock:
+            while self._schedule and self._schedule[0][0] <= now:
+                _check_time, _seq, oper, interval = heapq.heappop(
+                    self._schedule)
+                self._due.put_nowait((oper, interval))
+
+    def _next_check_delay(self):
+        # the caller holds the lock
+        if not self._schedule:
+            return 1
+        return min(max(self._schedule[0][0] - time.time(), 0), 1)
+
+    def _dispatch(self):
+        while not self.stoprequest.isSet():
+            self._dispatch_due()
+            with self._wakeup:
+                delay = self._next_check_delay()
+                if delay > 0:
+                    self._wakeup.wait(delay)
+
+    def _check_operation(self, oper, interval):
+        try:
+            if self.handle_operation_completion(oper):
+                return
+        except Exception:
+            LOG.exception(_LE(
+                "Exception was thrown inside OperationCompletionHandler"))
+            return
+        LOG.debug('Operation %(oper)s is not completed yet, checking '
+                  'again in %(interval)s sec',
+                  {'oper': oper, 'interval': interval})
+        self._schedule_check(oper, time.time() + interval,
+                             min(interval * 2, self.max_poll_interval))
+
+    def _work(self):
         while not self.stoprequest.isSet():
             try:
-                oper = self.queue.get(timeout=1)
+                oper, interval = self._due.get(timeout=1)
+            except Queue.Empty:
+                continue
+            self._check_operation(oper, interval)
+            self._due.task_done()
+
+    def _start_thread(self, target, name):
+        thread = threading.Thread(target=target,
+                                  name='%s-%s' % (self.getName(), name))
+        thread.setDaemon(True)
+        thread.start()
+        self._threads.append(thread)
 
-                # Get the current queue size (N) and set the counter with it.
-                # Handle N operations with no intermission.
-                # Once N operations handles, get the size again and repeat.
-                if self.opers_to_handle_before_rest <= 0:
-                    self.opers_to_handle_before_rest = self.queue.qsize() + 1
-
-                LOG.debug('Operation consumed from the queue: ' +
-                          str(oper))
-                # check the status - if oper is done: update the db ,
-                # else push the oper again to the queue
-                if not self.handle_operation_completion(oper):
-                    LOG.debug('Operation %s is not completed yet..' % oper)
-                    # Not completed - push to the queue again
-                    self.queue.put_nowait(oper)
-
-                self.queue.task_done()
-                self.opers_to_handle_before_rest -= 1
-
-                # Take one second rest before start handling
-                # new operations or operations handled before
-                if self.opers_to_handle_before_rest <= 0:
-                    time.sleep(1)
+    def run(self):
+        self._start_thread(self._dispatch, 'dispatcher')
+        for i in range(self.workers):
+            self._start_thread(self._work, 'worker-%d' % i)
 
+        while not self.stoprequest.isSet():
+            try:
+                oper = self.queue.get(timeout=1)
             except Queue.Empty:
                 continue
-            except Exception:
-                LOG.error(_LE(
-                    "Exception was thrown inside OperationCompletionHandler"))
+            LOG.debug('Operation consumed from the queue: %s', oper)
+            # new operations are checked right away, as before
+            self._schedule_check(oper, time.time(), self.poll_interval)
+            self.queue.task_done()
+            LOG.debug('Operation completion metrics: %s',
+                      self.get_metrics())
 
     @staticmethod
     def _run_post_success_function(oper):
@@ -626,6 +758,8 @@ class OperationCompletionHandler(threading.Thread):
     def _run_post_failure_function(oper):
         try:
             ctx = context.get_admin_context()
+            if oper.post_failure_function:
+                oper.post_failure_function(ctx, oper.data_model)
             oper.manager.failed_completion(ctx, oper.data_model)
             LOG.debug('Post-operation failure function completed '
                       'for operation %s',
@@ -648,7 +782,8 @@ class OperationAttributes(object):
                  data_model=None,
                  old_data_model=None,
                  delete=False,
-                 post_operation_function=None):
+                 post_operation_function=None,
+                 post_failure_function=None):
         self.manager = manager
         self.operation_url = operation_url
         self.lb = lb
@@ -656,6 +791,7 @@ class OperationAttributes(object):
         self.old_data_model = old_data_model
         self.delete = delete
         self.post_operation_function = post_operation_function
+        self.post_failure_function = post_failure_function
         self.creation_time = time.time()
 
     def __repr__(self):
@@ -664,6 +800,61 @@ class OperationAttributes(object):
         return "<%s: {%s}>" % (self.__class__.__name__, ', '.join(items))
 
 
+def _dict_delta(old, new, skip=()):
+    delta = {'id': new['id']}
+    for key, value in new.items():
+        if key not in skip and old.get(key) != value:
+            delta[key] = value
+    for key in old:
+        if key not in new and key not in skip:
+            delta[key] = None
+    return delta
+
+
+def _graph_delta(old_graph, new_graph):
+    """Return the sections of the new object graph changed since old.
+
+    Unchanged listeners are left out, changed listeners and pools are
+    given with their id and their changed properties only. A pool replaced
+    by another one is given in full. The members of a changed pool are
+    given in full when they are new or changed, unchanged ones are left
+    out and the ids of the removed ones are listed under the
+    removed_members of the pool. The ids of removed listeners are listed
+    under removed_listeners.
+    """
+    delta = dict((key, value) for key, value in new_graph.items()
+                 if key != 'listeners')
+    old_listeners = dict((listener['id'], listener)
+                         for listener in old_graph['listeners'])
+    delta['listeners'] = []
+    for listener in new_graph['listeners']:
+        old_listener = old_listeners.pop(listener['id'], None)
+        if old_listener is None:
+            delta['listeners'].append(listener)
+            continue
+        if listener == old_listener:
+            continue
+        listener_delta = _dict_delta(old_listener, listener,
+                                     skip=('default_pool',))
+        pool = listener.get('default_pool')
+        old_pool = old_listener.get('default_pool')
+        if (not pool or not old_pool or pool['id'] != old_pool['id']):
+            if pool != old_pool:
+                listener_delta['default_pool'] = pool
+        elif pool != old_pool:
+            pool_delta = _dict_delta(old_pool, pool, skip=('members',))
+            old_members = dict((member['id'], member)
+                               for member in old_pool['members'])
+            pool_delta['members'] = [
+                member for member in pool['members']
+                if old_members.pop(member['id'], None) != member]
+            pool_delta['removed_members'] = sorted(old_members)
+            listener_delta['default_pool'] = pool_delta
+        delta['listeners'].append(listener_delta)
+    delta['removed_listeners'] = sorted(old_listeners)
+    return delta
+
+
 def _rest_wrapper(response, success_codes=None):
     """Wrap a REST call and make sure a valido status is returned."""
     success_codes = success_codes or [202]
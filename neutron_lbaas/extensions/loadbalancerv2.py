@@ -15,6 +15,7 @@
 
 
 import abc
+import copy
 
 from oslo_config import cfg
 import six
@@ -32,6 +33,111 @@ from neutron_lbaas.services.loadbalancer import constants as lb_const
 
 LOADBALANCERV2_PREFIX = "/lbaas"
 
+TLS_CIPHERS_REGEX = r'^[A-Za-z0-9_+!@=:.-]{1,255}$'
+
+
+def convert_tuning_to_dict(data):
+    """Converts a tuning profile, dropping the values that are unset.
+
+    Unset values fall back to the driver defaults, so a profile returned by
+    the API can be sent back as is.
+    """
+    if data is None:
+        return {}
+    if isinstance(data, dict):
+        return dict((key, value) for key, value in six.iteritems(data)
+                    if value is not None)
+    return data
+
+
+# set from the enclosing resources of a load balancer graph
+_GRAPH_INHERITED_ATTRIBUTES = ('tenant_id', 'loadbalancer_id', 'listener_id',
+                               'pool_id')
+
+
+def _convert_graph_resource(data, attr_info, children):
+    """Converts a resource nested in a load balancer graph.
+
+    Its attributes are defaulted, converted and validated as if it was
+    posted on its own.
+    """
+    if not isinstance(data, dict):
+        raise nexception.InvalidInput(
+            error_message=_("'%s' is not a dictionary") % data)
+    attrs = dict((name, info) for name, info in six.iteritems(attr_info)
+                 if info['allow_post'] and
+                 name not in _GRAPH_INHERITED_ATTRIBUTES)
+    unknown = (set(data) - set(attrs) - set(children) -
+               set(_GRAPH_INHERITED_ATTRIBUTES))
+    if unknown:
+        raise nexception.InvalidInput(
+            error_message=_("Unrecognized attribute(s) '%s'") %
+            ', '.join(sorted(unknown)))
+    res = {}
+    for name, info in six.iteritems(attrs):
+        if name not in data and 'default' not in info:
+            raise nexception.InvalidInput(
+                error_message=_("Required attribute '%s' not specified") %
+                name)
+        value = data.get(name, copy.deepcopy(info.get('default')))
+        if value is not attr.ATTR_NOT_SPECIFIED:
+            if 'convert_to' in info:
+                value = info['convert_to'](value)
+            for rule, rule_arg in six.iteritems(info.get('validate', {})):
+                msg = attr.validators[rule](value, rule_arg)
+                if msg:
+                    raise nexception.InvalidInput(error_message=msg)
+        res[name] = value
+    for name, convert in six.iteritems(children):
+        if data.get(name) is not None:
+            res[name] = convert(data[name])
+    return res
+
+
+def _convert_graph_list(data, convert):
+    if not isinstance(data, list):
+        raise nexception.InvalidInput(
+            error_message=_("'%s' is not a list") % data)
+    return [convert(item) for item in data]
+
+
+def _convert_graph_healthmonitor(data):
+    return _convert_graph_resource(
+        data, RESOURCE_ATTRIBUTE_MAP['healthmonitors'], {})
+
+
+def _convert_graph_member(data):
+    return _convert_graph_resource(
+        data, SUB_RESOURCE_ATTRIBUTE_MAP['members']['parameters'], {})
+
+
+def _convert_graph_members(data):
+    return _convert_graph_list(data, _convert_graph_member)
+
+
+def _convert_graph_pool(data):
+    return _convert_graph_resource(
+        data, RESOURCE_ATTRIBUTE_MAP['pools'],
+        {'members': _convert_graph_members,
+         'healthmonitor': _convert_graph_healthmonitor})
+
+
+def _convert_graph_listener(data):
+    return _convert_graph_resource(
+        data, RESOURCE_ATTRIBUTE_MAP['listeners'],
+        {'default_pool': _convert_graph_pool})
+
+
+def convert_listeners_to_graph(data):
+    """Converts the listeners posted along with a load balancer.
+
+    A listener may hold its default_pool, which may hold its members and
+    its healthmonitor. The whole graph is created with the load balancer.
+    """
+    if data is None:
+        return []
+    return _convert_graph_list(data, _convert_graph_listener)
+
 
 # Loadbalancer Exceptions
 # This exception is only for a workaround when having v1 and v2 lbaas extension
@@ -104,6 +210,10 @@ class LBConfigurationUnsupported(nexception.NeutronException):
                 "supported by driver %(driver_name)s")
 
 
+class ProviderOperationUnsupported(nexception.BadRequest):
+    message = _("Provider %(provider)s does not support %(operation)s")
+
+
 class SessionPersistenceConfigurationInvalid(nexception.BadRequest):
     message = _("Session Persistence Invalid: %(msg)s")
 
@@ -153,7 +263,9 @@ RESOURCE_ATTRIBUTE_MAP = {
         'provider': {'allow_post': True, 'allow_put': False,
                      'validate': {'type:string': None},
                      'is_visible': True, 'default': attr.ATTR_NOT_SPECIFIED},
-        'listeners': {'allow_post': False, 'allow_put': False,
+        'listeners': {'allow_post': True, 'allow_put': False,
+                      'convert_to': convert_listeners_to_graph,
+                      'default': [],
                       'is_visible': True},
         'admin_state_up': {'allow_post': True, 'allow_put': True,
                            'default': True,
@@ -162,7 +274,30 @@ RESOURCE_ATTRIBUTE_MAP = {
         'provisioning_status': {'allow_post': False, 'allow_put': False,
                                 'is_visible': True},
         'operating_status': {'allow_post': False, 'allow_put': False,
-                             'is_visible': True}
+                             'is_visible': True},
+        'tuning': {
+            'allow_post': True, 'allow_put': True,
+            'convert_to': convert_tuning_to_dict,
+            'default': {},
+            'validate': {
+                'type:dict_or_empty': {
+                    'maxconn': {'type:range': [1, 1000000],
+                                'convert_to': attr.convert_to_int},
+                    'tune_bufsize': {'type:range': [1024, 1048576],
+                                     'convert_to': attr.convert_to_int},
+                    'tune_ssl_cachesize': {'type:range': [0, 10000000],
+                                           'convert_to': attr.convert_to_int},
+                    'tune_ssl_lifetime': {'type:range': [1, 86400],
+                                          'convert_to': attr.convert_to_int},
+                    'timeout_connect': {'type:range': [1, 86400000],
+                                        'convert_to': attr.convert_to_int},
+                    'timeout_client': {'type:range': [1, 86400000],
+                                       'convert_to': attr.convert_to_int},
+                    'timeout_server': {'type:range': [1, 86400000],
+                                       'convert_to': attr.convert_to_int},
+                    'retries': {'type:range': [0, 100],
+                                'convert_to': attr.convert_to_int}}},
+            'is_visible': True}
     },
     'listeners': {
         'id': {'allow_post': False, 'allow_put': False,
@@ -212,7 +347,26 @@ RESOURCE_ATTRIBUTE_MAP = {
         'admin_state_up': {'allow_post': True, 'allow_put': True,
                            'default': True,
                            'convert_to': attr.convert_to_boolean,
-                           'is_visible': True}
+                           'is_visible': True},
+        'tuning': {
+            'allow_post': True, 'allow_put': True,
+            'convert_to': convert_tuning_to_dict,
+            'default': {},
+            'validate': {
+                'type:dict_or_empty': {
+                    'timeout_client': {'type:range': [1, 86400000],
+                                       'convert_to': attr.convert_to_int},
+                    'timeout_server': {'type:range': [1, 86400000],
+                                       'convert_to': attr.convert_to_int},
+                    'http_keepalive': {'type:boolean': None,
+                                       'convert_to': attr.convert_to_boolean},
+                    'http_reuse': {
+                        'type:values': lb_const.SUPPORTED_HTTP_REUSE_MODES},
+                    'tls_session_tickets': {
+                        'type:boolean': None,
+                        'convert_to': attr.convert_to_boolean},
+                    'tls_ciphers': {'type:regex': TLS_CIPHERS_REGEX}}},
+            'is_visible': True}
     },
     'pools': {
         'id': {'allow_post': False, 'allow_put': False,
@@ -257,7 +411,9 @@ RESOURCE_ATTRIBUTE_MAP = {
                     'cookie_name': {'type:string': None,
                                     'required': False}}},
             'is_visible': True},
-        'members': {'allow_post': False, 'allow_put': False,
+        # replaces the members of the pool with the given ones
+        'members': {'allow_post': False, 'allow_put': True,
+                    'convert_to': _convert_graph_members,
                     'is_visible': True},
         'admin_state_up': {'allow_post': True, 'allow_put': True,
                            'default': True,
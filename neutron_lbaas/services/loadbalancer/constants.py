@@ -77,6 +77,13 @@ SUPPORTED_SP_TYPES = (SESSION_PERSISTENCE_SOURCE_IP,
                       SESSION_PERSISTENCE_HTTP_COOKIE,
                       SESSION_PERSISTENCE_APP_COOKIE)
 
+HTTP_REUSE_NEVER = 'never'
+HTTP_REUSE_SAFE = 'safe'
+HTTP_REUSE_AGGRESSIVE = 'aggressive'
+HTTP_REUSE_ALWAYS = 'always'
+SUPPORTED_HTTP_REUSE_MODES = (HTTP_REUSE_NEVER, HTTP_REUSE_SAFE,
+                              HTTP_REUSE_AGGRESSIVE, HTTP_REUSE_ALWAYS)
+
 STATS_ACTIVE_CONNECTIONS = 'active_connections'
 STATS_MAX_CONNECTIONS = 'max_connections'
 STATS_TOTAL_CONNECTIONS = 'total_connections'
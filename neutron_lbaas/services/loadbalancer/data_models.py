@@ -249,6 +249,43 @@ class SessionPersistence(BaseDataModel):
         return SessionPersistence(**model_dict)
 
 
+class LoadBalancerTuning(BaseDataModel):
+
+    def __init__(self, loadbalancer_id=None, maxconn=None, tune_bufsize=None,
+                 tune_ssl_cachesize=None, tune_ssl_lifetime=None,
+                 timeout_connect=None, timeout_client=None,
+                 timeout_server=None, retries=None):
+        self.loadbalancer_id = loadbalancer_id
+        self.maxconn = maxconn
+        self.tune_bufsize = tune_bufsize
+        self.tune_ssl_cachesize = tune_ssl_cachesize
+        self.tune_ssl_lifetime = tune_ssl_lifetime
+        self.timeout_connect = timeout_connect
+        self.timeout_client = timeout_client
+        self.timeout_server = timeout_server
+        self.retries = retries
+
+    def to_api_dict(self):
+        return super(LoadBalancerTuning, self).to_dict(loadbalancer_id=False)
+
+
+class ListenerTuning(BaseDataModel):
+
+    def __init__(self, listener_id=None, timeout_client=None,
+                 timeout_server=None, http_keepalive=None, http_reuse=None,
+                 tls_session_tickets=None, tls_ciphers=None):
+        self.listener_id = listener_id
+        self.timeout_client = timeout_client
+        self.timeout_server = timeout_server
+        self.http_keepalive = http_keepalive
+        self.http_reuse = http_reuse
+        self.tls_session_tickets = tls_session_tickets
+        self.tls_ciphers = tls_ciphers
+
+    def to_api_dict(self):
+        return super(ListenerTuning, self).to_dict(listener_id=False)
+
+
 class LoadBalancerStatistics(BaseDataModel):
 
     def __init__(self, loadbalancer_id=None, bytes_in=None, bytes_out=None,
@@ -446,7 +483,8 @@ class Listener(BaseDataModel):
                  default_tls_container_id=None, sni_containers=None,
                  protocol_port=None, connection_limit=None,
                  admin_state_up=None, provisioning_status=None,
-                 operating_status=None, default_pool=None, loadbalancer=None):
+                 operating_status=None, default_pool=None, loadbalancer=None,
+                 tuning=None):
         self.id = id
         self.tenant_id = tenant_id
         self.name = name
@@ -463,6 +501,7 @@ class Listener(BaseDataModel):
         self.provisioning_status = provisioning_status
         self.default_pool = default_pool
         self.loadbalancer = loadbalancer
+        self.tuning = tuning
 
     def attached_to_loadbalancer(self):
         return bool(self.loadbalancer)
@@ -471,7 +510,7 @@ class Listener(BaseDataModel):
         ret_dict = super(Listener, self).to_dict(
             loadbalancer=False, loadbalancer_id=False, default_pool=False,
             operating_status=False, provisioning_status=False,
-            sni_containers=False)
+            sni_containers=False, tuning=False)
         # NOTE(blogan): Returning a list to future proof for M:N objects
         # that are not yet implemented.
         ret_dict['loadbalancers'] = []
@@ -480,15 +519,21 @@ class Listener(BaseDataModel):
         ret_dict['sni_container_refs'] = [container.tls_container_id
                                           for container in self.sni_containers]
         ret_dict['default_tls_container_ref'] = self.default_tls_container_id
+        ret_dict['tuning'] = None
+        if self.tuning:
+            ret_dict['tuning'] = self.tuning.to_api_dict()
         return ret_dict
 
     @classmethod
     def from_dict(cls, model_dict):
         default_pool = model_dict.pop('default_pool', None)
         loadbalancer = model_dict.pop('loadbalancer', None)
+        tuning = model_dict.pop('tuning', None)
         sni_containers = model_dict.pop('sni_containers', [])
         model_dict['sni_containers'] = [SNI.from_dict(sni)
                                         for sni in sni_containers]
+        if tuning:
+            model_dict['tuning'] = ListenerTuning.from_dict(tuning)
         if default_pool:
             model_dict['default_pool'] = Pool.from_dict(default_pool)
         if loadbalancer:
@@ -502,7 +547,7 @@ class LoadBalancer(BaseDataModel):
                  vip_subnet_id=None, vip_port_id=None, vip_address=None,
                  provisioning_status=None, operating_status=None,
                  admin_state_up=None, vip_port=None, stats=None,
-                 provider=None, listeners=None):
+                 provider=None, listeners=None, tuning=None):
         self.id = id
         self.tenant_id = tenant_id
         self.name = name
@@ -517,15 +562,19 @@ class LoadBalancer(BaseDataModel):
         self.stats = stats
         self.provider = provider
         self.listeners = listeners or []
+        self.tuning = tuning
 
     def attached_to_loadbalancer(self):
         return True
 
     def to_api_dict(self):
         ret_dict = super(LoadBalancer, self).to_dict(
-            vip_port=False, stats=False, listeners=False)
+            vip_port=False, stats=False, listeners=False, tuning=False)
         ret_dict['listeners'] = [{'id': listener.id}
                                  for listener in self.listeners]
+        ret_dict['tuning'] = None
+        if self.tuning:
+            ret_dict['tuning'] = self.tuning.to_api_dict()
         if self.provider:
             ret_dict['provider'] = self.provider.provider_name
         return ret_dict
@@ -535,6 +584,7 @@ class LoadBalancer(BaseDataModel):
         listeners = model_dict.pop('listeners', [])
         vip_port = model_dict.pop('vip_port', None)
         provider = model_dict.pop('provider', None)
+        tuning = model_dict.pop('tuning', None)
         model_dict.pop('stats', None)
         model_dict['listeners'] = [Listener.from_dict(listener)
                                    for listener in listeners]
@@ -543,6 +593,8 @@ class LoadBalancer(BaseDataModel):
         if provider:
             model_dict['provider'] = ProviderResourceAssociation.from_dict(
                 provider)
+        if tuning:
+            model_dict['tuning'] = LoadBalancerTuning.from_dict(tuning)
         return LoadBalancer(**model_dict)
 
 
@@ -554,6 +606,8 @@ SA_MODEL_TO_DATA_MODEL_MAP = {
     models.PoolV2: Pool,
     models.MemberV2: Member,
     models.LoadBalancerStatistics: LoadBalancerStatistics,
+    models.LoadBalancerTuning: LoadBalancerTuning,
+    models.ListenerTuning: ListenerTuning,
     models.SessionPersistenceV2: SessionPersistence,
     models_v2.IPAllocation: IPAllocation,
     models_v2.Port: Port,
@@ -568,6 +622,8 @@ DATA_MODEL_TO_SA_MODEL_MAP = {
     Pool: models.PoolV2,
     Member: models.MemberV2,
     LoadBalancerStatistics: models.LoadBalancerStatistics,
+    LoadBalancerTuning: models.LoadBalancerTuning,
+    ListenerTuning: models.ListenerTuning,
     SessionPersistence: models.SessionPersistenceV2,
     IPAllocation: models_v2.IPAllocation,
     Port: models_v2.Port,
@@ -0,0 +1,152 @@
+# Copyright 2015 OpenStack Foundation.  All rights reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import threading
+
+from neutron.i18n import _LE
+from oslo_config import cfg
+from oslo_log import log as logging
+from six.moves import queue as Queue
+
+LOG = logging.getLogger(__name__)
+
+OPTS = [
+    cfg.BoolOpt('async_driver_operations',
+                default=False,
+                help=_('Return from LBaaS v2 API calls once the PENDING '
+                       'state is persisted and run the driver operation '
+                       'in the background. Driver errors are then reported '
+                       'through the provisioning status only.')),
+    cfg.IntOpt('driver_operation_workers',
+               default=16,
+               help=_('Number of background driver operations run at the '
+                      'same time for each provider.')),
+    cfg.DictOpt('driver_operation_concurrency',
+                default={},
+                help=_('Per provider limit of background driver operations '
+                       'run at the same time, as provider:limit pairs. '
+                       'Providers not listed use driver_operation_workers.')),
+    cfg.ListOpt('driver_operation_coalesce_providers',
+                default=[],
+                help=_('Providers whose driver operations on the same root '
+                       'load balancer are collected for '
+                       'driver_operation_coalesce_window seconds and run as '
+                       'a single driver call. Only providers whose drivers '
+                       'rebuild the whole load balancer on every call, such '
+                       'as the haproxy ones, are accepted. Operations of '
+                       'these providers always run in the background.')),
+    cfg.FloatOpt('driver_operation_coalesce_window',
+                 default=0.5,
+                 help=_('Seconds during which the driver operations of a '
+                        'root load balancer are collected, starting from '
+                        'the first one.')),
+]
+
+cfg.CONF.register_opts(OPTS)
+
+
+class DriverOperationDispatcher(object):
+    """Runs driver operations on bounded pools of worker threads.
+
+    Every provider gets its own pool so that a slow backend cannot starve
+    the others. Operations on the same root load balancer run one at a
+    time, in the order they were submitted.
+    """
+
+    def __init__(self, workers, provider_limits=None):
+        self.workers = workers
+        self.provider_limits = dict(
+            (provider, int(limit))
+            for provider, limit in (provider_limits or {}).items())
+        self._lock = threading.Lock()
+        # operations waiting for each root load balancer, a load balancer
+        # is in this map while one of its operations is queued or running
+        self._pending = {}
+        self._ready = {}
+        # operations collected for each root load balancer
+        self._batches = {}
+
+    def _get_ready_queue(self, provider):
+        # the caller holds the lock
+        ready = self._ready.get(provider)
+        if ready is None:
+            ready = self._ready[provider] = Queue.Queue()
+            size = max(self.provider_limits.get(provider, self.workers), 1)
+            for i in range(size):
+                worker = threading.Thread(
+                    target=self._work, args=(ready,),
+                    name='lbaas-%s-worker-%d' % (provider, i))
+                worker.setDaemon(True)
+                worker.start()
+        return ready
+
+    def submit(self, provider, lb_id, operation, *args, **kwargs):
+        with self._lock:
+            ready = self._get_ready_queue(provider)
+            pending = self._pending.get(lb_id)
+            if pending is not None:
+                pending.append((operation, args, kwargs))
+                return
+            self._pending[lb_id] = collections.deque(
+                [(operation, args, kwargs)])
+        ready.put(lb_id)
+
+    def coalesce(self, provider, lb_id, item, flush, window):
+        """Collects item in the batch of lb_id.
+
+        The batch is submitted as flush(batch) window seconds after its
+        first item. Items coming while the batch runs form the next one.
+        """
+        with self._lock:
+            batch = self._batches.get(lb_id)
+            if batch is None:
+                batch = self._batches[lb_id] = []
+                timer = threading.Timer(window, self._flush,
+                                        (provider, lb_id, flush))
+                timer.setDaemon(True)
+                timer.start()
+            batch.append(item)
+
+    def _flush(self, provider, lb_id, flush):
+        with self._lock:
+            batch = self._batches.pop(lb_id)
+        self.submit(provider, lb_id, flush, batch)
+
+    def _work(self, ready):
+        while True:
+            lb_id = ready.get()
+            with self._lock:
+                operation, args, kwargs = self._pending[lb_id].popleft()
+            try:
+                operation(*args, **kwargs)
+            except Exception:
+                LOG.exception(_LE("Driver operation for loadbalancer %s "
+                                  "failed"), lb_id)
+            with self._lock:
+                if self._pending[lb_id]:
+                    requeue = True
+                else:
+                    del self._pending[lb_id]
+                    requeue = False
+            if requeue:
+                # next operation of this load balancer, behind the others
+                ready.put(lb_id)
+            ready.task_done()
+
+    def pending_count(self, lb_id=None):
+        with self._lock:
+            if lb_id:
+                return len(self._pending.get(lb_id, ()))
+            return sum(len(ops) for ops in self._pending.values())
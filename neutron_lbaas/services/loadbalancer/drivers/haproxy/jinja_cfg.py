@@ -12,7 +12,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import base64
+import collections
+import hashlib
 import os
+import time
+import zlib
 
 import jinja2
 import six
@@ -20,6 +25,7 @@ import six
 from neutron.agent.linux import utils
 from neutron.plugins.common import constants as plugin_constants
 from oslo_config import cfg
+from oslo_utils import encodeutils
 
 from neutron_lbaas.common import cert_manager
 from neutron_lbaas.common.tls_utils import cert_parser
@@ -57,17 +63,97 @@ STATS_MAP = {
 MEMBER_STATUSES = plugin_constants.ACTIVE_PENDING_STATUSES + (
     plugin_constants.INACTIVE,)
 
+TUNING_DEFAULTS = {
+    'maxconn': None,
+    'tune_bufsize': None,
+    'tune_ssl_cachesize': None,
+    'tune_ssl_lifetime': None,
+    'timeout_connect': 5000,
+    'timeout_client': 50000,
+    'timeout_server': 50000,
+    'retries': 3
+}
+
 TEMPLATES_DIR = os.path.abspath(
     os.path.join(os.path.dirname(__file__), 'templates/'))
 JINJA_ENV = None
 
+# container ref -> (expiry time, TLSContainer without the private key),
+# least recently used first
+TLS_CERT_CACHE = collections.OrderedDict()
+TLS_CERT_CACHE_SIZE = 1000
+
+# haproxy encrypts session tickets with the next to last key of the file and
+# decrypts them with any of the last TLS_TICKET_KEYS keys
+TLS_TICKET_KEYS = 3
+
 jinja_opts = [
     cfg.StrOpt(
         'jinja_config_template',
         default=os.path.join(
             TEMPLATES_DIR,
             'haproxy.loadbalancer.j2'),
-        help=_('Jinja template file for haproxy configuration'))
+        help=_('Jinja template file for haproxy configuration')),
+    cfg.IntOpt(
+        'nbproc',
+        default=1,
+        help=_('Number of haproxy processes to run for each load '
+               'balancer. Connection limits and stick tables are kept '
+               'per process.')),
+    cfg.DictOpt(
+        'loadbalancer_nbproc',
+        default={},
+        help=_('Per load balancer override of nbproc, given as '
+               'loadbalancer_id:processes pairs.')),
+    cfg.IntOpt(
+        'nbthread',
+        default=1,
+        help=_('Number of threads of each haproxy process. Threads share '
+               'the connection limits and stick tables of their process. '
+               'More than one thread requires haproxy 1.8 or later, '
+               'APP_COOKIE session persistence is then kept in stick '
+               'tables instead of appsession.')),
+    cfg.DictOpt(
+        'loadbalancer_nbthread',
+        default={},
+        help=_('Per load balancer override of nbthread, given as '
+               'loadbalancer_id:threads pairs.')),
+    cfg.ListOpt(
+        'cpu_map',
+        default=[],
+        help=_('CPU ids the haproxy processes are pinned to. The processes, '
+               'or their threads when nbthread is more than one, of a load '
+               'balancer are assigned to these CPUs round-robin, '
+               'starting at an offset derived from the load balancer id. '
+               'Leave empty to disable pinning.')),
+    cfg.BoolOpt(
+        'seamless_reload',
+        default=False,
+        help=_('Run haproxy in master-worker mode and hand the listening '
+               'sockets over to the new processes on reload, so that '
+               'configuration updates do not drop connections. Requires '
+               'haproxy 1.8 or later, APP_COOKIE session persistence is '
+               'then kept in stick tables instead of appsession.')),
+    cfg.IntOpt(
+        'tls_cert_cache_ttl',
+        default=300,
+        help=_('Number of seconds the certificates retrieved from the '
+               'certificate manager are reused across configuration '
+               'renders. Set it to 0 to disable the cache.')),
+    cfg.IntOpt(
+        'tls_ticket_key_rotation',
+        default=0,
+        help=_('Number of seconds after which the TLS session ticket keys '
+               'shared by the haproxy processes of a load balancer are '
+               'rotated. Set it to 0 to let every haproxy process generate '
+               'its own keys.')),
+    cfg.IntOpt(
+        'ocsp_refresh_interval',
+        default=0,
+        help=_('Number of seconds after which the OCSP responses stapled '
+               'by TERMINATED_HTTPS listeners are fetched again from the '
+               'OCSP responder of the certificates. Set it to 0 to disable '
+               'OCSP stapling.'))
 ]
 
 cfg.CONF.register_opts(jinja_opts, 'haproxy')
@@ -90,6 +176,60 @@ def save_config(conf_path, loadbalancer, socket_path, user_group,
     utils.replace_file(conf_path, config_str)
 
 
+def _get_loadbalancer_count(loadbalancer_id, overrides, default):
+    count = overrides.get(loadbalancer_id, default)
+    try:
+        count = int(count)
+    except (TypeError, ValueError):
+        count = default
+    return max(1, count)
+
+
+def get_nbproc(loadbalancer_id):
+    """Retrieve the number of haproxy processes for a load balancer
+
+    :param loadbalancer_id: the load balancer id
+    :return: number of haproxy processes
+    """
+    return _get_loadbalancer_count(loadbalancer_id,
+                                   cfg.CONF.haproxy.loadbalancer_nbproc,
+                                   cfg.CONF.haproxy.nbproc)
+
+
+def get_nbthread(loadbalancer_id):
+    """Retrieve the number of threads of each haproxy process
+
+    :param loadbalancer_id: the load balancer id
+    :return: number of threads per haproxy process
+    """
+    return _get_loadbalancer_count(loadbalancer_id,
+                                   cfg.CONF.haproxy.loadbalancer_nbthread,
+                                   cfg.CONF.haproxy.nbthread)
+
+
+def get_stats_socket_paths(socket_path, nbproc):
+    """Retrieve the stats socket location of every haproxy process
+
+    The first process keeps the plain socket path so that single process
+    instances are laid out as before.
+
+    :param socket_path: location of the first process stats socket
+    :param nbproc: number of haproxy processes
+    :return: list of stats socket locations ordered by process number
+    """
+    return [socket_path] + ['%s.%d' % (socket_path, proc)
+                            for proc in six.moves.range(2, nbproc + 1)]
+
+
+def get_reload_socket_path(socket_path):
+    """Retrieve the location of the socket used to hand over listeners
+
+    :param socket_path: location of the first process stats socket
+    :return: location of the listeners hand over socket
+    """
+    return os.path.join(os.path.dirname(socket_path), 'haproxy_reload.sock')
+
+
 def _get_template():
     """Retrieve Jinja template
 
@@ -113,20 +253,145 @@ def _store_listener_crt(haproxy_base_dir, listener, cert):
     :param cert: the TLS certificate
     :return: location of the stored certificate
     """
+    # PEM files are named after their certificates, an unchanged
+    # certificate maps to the file written by a previous render
     cert_path = _retrieve_crt_path(haproxy_base_dir, listener,
-                                   cert.primary_cn)
-    # build a string that represents the pem file to be saved
-    pem = _build_pem(cert)
-    utils.replace_file(cert_path, pem)
+                                   _get_cert_digest(cert))
+    if not os.path.exists(cert_path):
+        if not cert.private_key:
+            # private keys are not cached, decrypt it for the file only
+            cert = _map_cert_tls_container(
+                CERT_MANAGER_PLUGIN.CertManager().get_cert(
+                    cert.id, check_only=True), cert.id)
+        utils.replace_file(cert_path, _build_pem(cert))
     return cert_path
 
 
-def _retrieve_crt_path(haproxy_base_dir, listener, primary_cn):
+def _prune_listener_crts(haproxy_base_dir, listener, cert_paths):
+    """Remove the TLS certificates no longer used by a listener
+
+    haproxy loads every file of the listener directory for SNI, so stale
+    certificates have to be removed.
+
+    :param haproxy_base_dir: location of the instances state data
+    :param listener: the listener object
+    :param cert_paths: locations of the certificates in use
+    """
+    confs_dir = os.path.abspath(os.path.normpath(haproxy_base_dir))
+    confs_path = os.path.join(confs_dir, listener.id)
+    if not os.path.isdir(confs_path):
+        return
+    for crt_file in os.listdir(confs_path):
+        if '.pem' not in crt_file:
+            continue
+        # OCSP responses are stored next to their certificate
+        pem_path = os.path.join(confs_path,
+                                crt_file.split('.pem', 1)[0] + '.pem')
+        if pem_path not in cert_paths:
+            os.remove(os.path.join(confs_path, crt_file))
+
+
+def get_listener_tls_certs(listener, haproxy_base_dir):
+    """Retrieve the TLS certificates of a listener and their locations
+
+    :param listener: the listener object
+    :param haproxy_base_dir: location of the instances state data
+    :return: list of (certificate location, TLSContainer) tuples
+    """
+    certs = _process_tls_certificates(listener)
+    tls_certs = list(certs['sni_certs'])
+    if certs['tls_cert']:
+        tls_certs.insert(0, certs['tls_cert'])
+    return [(_retrieve_crt_path(haproxy_base_dir, listener,
+                                _get_cert_digest(tls_cert)),
+             tls_cert) for tls_cert in tls_certs]
+
+
+def get_tls_ticket_keys_path(haproxy_base_dir):
+    """Retrieve the location of the TLS session ticket keys
+
+    :param haproxy_base_dir: location of the instances state data
+    :return: location of the TLS session ticket keys file
+    """
+    return os.path.join(haproxy_base_dir, 'tls_ticket_keys')
+
+
+def uses_tls_ticket_keys(listener):
+    """Check whether a listener uses the shared TLS session ticket keys
+
+    :param listener: the listener object
+    :return: True if the listener uses the shared keys
+    """
+    if (listener.protocol != constants.PROTOCOL_TERMINATED_HTTPS or
+            cfg.CONF.haproxy.tls_ticket_key_rotation <= 0):
+        return False
+    tuning = getattr(listener, 'tuning', None)
+    return not (tuning and tuning.tls_session_tickets is False)
+
+
+def tls_ticket_keys_expired(keys_path):
+    """Check whether the TLS session ticket keys are due for rotation
+
+    :param keys_path: location of the TLS session ticket keys file
+    :return: True if the keys are missing or older than the rotation
+    """
+    if not os.path.exists(keys_path):
+        return True
+    return (os.path.getmtime(keys_path) +
+            cfg.CONF.haproxy.tls_ticket_key_rotation <= time.time())
+
+
+def _update_tls_ticket_keys(haproxy_base_dir):
+    """Create or rotate the TLS session ticket keys of a load balancer
+
+    Rotating appends a new key, tickets encrypted with the previous keys
+    can still be resumed until they drop out of the file.
+
+    :param haproxy_base_dir: location of the instances state data
+    :return: location of the TLS session ticket keys file
+    """
+    keys_path = get_tls_ticket_keys_path(haproxy_base_dir)
+    if not tls_ticket_keys_expired(keys_path):
+        return keys_path
+    keys = []
+    if os.path.exists(keys_path):
+        with open(keys_path, 'r') as keys_file:
+            keys = [key.strip() for key in keys_file if key.strip()]
+    keys.append(_generate_tls_ticket_key())
+    while len(keys) < TLS_TICKET_KEYS:
+        keys.append(_generate_tls_ticket_key())
+    utils.replace_file(keys_path, '\n'.join(keys[-TLS_TICKET_KEYS:]) + '\n')
+    return keys_path
+
+
+def _generate_tls_ticket_key():
+    """Generate a TLS session ticket key
+
+    :return: base64 encoded 48 bytes key
+    """
+    return encodeutils.safe_decode(base64.b64encode(os.urandom(48)))
+
+
+def _get_cert_digest(tls_cert):
+    """Retrieve the digest a PEM file is stored under
+
+    The private key is left out, it is bound to the certificate.
+
+    :param tls_cert: the TLS certificate
+    :return: hex digest of the certificate and its intermediates
+    """
+    pem = _build_pem(data_models.TLSContainer(
+        certificate=tls_cert.certificate,
+        intermediates=tls_cert.intermediates))
+    return hashlib.sha256(encodeutils.safe_encode(pem)).hexdigest()
+
+
+def _retrieve_crt_path(haproxy_base_dir, listener, crt_name):
     """Retrieve TLS certificate location
 
     :param haproxy_base_dir: location of the instances state data
     :param listener: the listener object
-    :param primary_cn: primary_cn used for identifying TLS certificate
+    :param crt_name: name used for identifying TLS certificate
     :return: TLS certificate location
     """
     confs_dir = os.path.abspath(os.path.normpath(haproxy_base_dir))
@@ -135,7 +400,7 @@ def _retrieve_crt_path(haproxy_base_dir, listener, primary_cn):
         if not os.path.isdir(confs_path):
             os.makedirs(confs_path, 0o755)
         return os.path.join(
-            confs_path, '{0}.pem'.format(primary_cn))
+            confs_path, '{0}.pem'.format(crt_name))
 
 
 def _process_tls_certificates(listener):
@@ -152,20 +417,59 @@ def _process_tls_certificates(listener):
     sni_certs = []
     # Retrieve, map and store default TLS certificate
     if listener.default_tls_container_id:
-        tls_cert = _map_cert_tls_container(
-            cert_mgr.get_cert(
-                listener.default_tls_container_id,
-                check_only=True))
+        tls_cert = _get_tls_container(cert_mgr,
+                                      listener.default_tls_container_id)
     if listener.sni_containers:
         # Retrieve, map and store SNI certificates
         for sni_cont in listener.sni_containers:
-            cert_container = _map_cert_tls_container(
-                cert_mgr.get_cert(sni_cont.tls_container_id, check_only=True))
+            cert_container = _get_tls_container(cert_mgr,
+                                                sni_cont.tls_container_id)
             sni_certs.append(cert_container)
 
     return {'tls_cert': tls_cert, 'sni_certs': sni_certs}
 
 
+def _get_tls_container(cert_mgr, container_id):
+    """Retrieve the mapped TLS data of a certificate container
+
+    Mapped containers are cached for tls_cert_cache_ttl seconds, so that
+    renders do not fetch and decode the same certificates over again. The
+    private key is left out, it is only decrypted when its PEM file is
+    written.
+
+    :param cert_mgr: the certificate manager
+    :param container_id: the certificate container reference
+    :return: TLSContainer object without the private key
+    """
+    now = time.time()
+    cached = TLS_CERT_CACHE.pop(container_id, None)
+    if cached and cached[0] > now:
+        TLS_CERT_CACHE[container_id] = cached
+        return cached[1]
+    tls_cert = _map_cert_tls_container(
+        cert_mgr.get_cert(container_id, check_only=True), container_id,
+        private_key=False)
+    ttl = cfg.CONF.haproxy.tls_cert_cache_ttl
+    if ttl > 0:
+        TLS_CERT_CACHE[container_id] = (now + ttl, tls_cert)
+        while len(TLS_CERT_CACHE) > TLS_CERT_CACHE_SIZE:
+            TLS_CERT_CACHE.popitem(last=False)
+    return tls_cert
+
+
+def invalidate_tls_cert_cache(container_ids=None):
+    """Drop certificate containers from the cache
+
+    :param container_ids: the certificate container references to drop,
+                          all of them when None
+    """
+    if container_ids is None:
+        TLS_CERT_CACHE.clear()
+        return
+    for container_id in container_ids:
+        TLS_CERT_CACHE.pop(container_id, None)
+
+
 def _get_primary_cn(tls_cert):
     """Retrieve primary cn for TLS certificate
 
@@ -175,16 +479,21 @@ def _get_primary_cn(tls_cert):
     return cert_parser.get_host_names(tls_cert)['cn']
 
 
-def _map_cert_tls_container(cert):
+def _map_cert_tls_container(cert, container_id=None, private_key=True):
     """Map cert data to TLS data model
 
     :param cert: TLS certificate
+    :param container_id: the certificate container reference
+    :param private_key: whether to decrypt the private key
     :return: mapped TLSContainer object
     """
     certificate = cert.get_certificate()
-    pkey = cert_parser.dump_private_key(cert.get_private_key(),
-                                        cert.get_private_key_passphrase())
+    pkey = None
+    if private_key:
+        pkey = cert_parser.dump_private_key(
+            cert.get_private_key(), cert.get_private_key_passphrase())
     return data_models.TLSContainer(
+        id=container_id,
         primary_cn=_get_primary_cn(certificate),
         private_key=pkey,
         certificate=certificate,
@@ -218,13 +527,65 @@ def render_loadbalancer_obj(loadbalancer, user_group, socket_path,
     :param haproxy_base_dir:  location of the instances state data
     :return: rendered load balancer configuration
     """
+    processes = _transform_processes(loadbalancer, socket_path)
+    nbthread = get_nbthread(loadbalancer.id)
+    stick_app_cookie = _stick_app_cookie(nbthread)
+    reload_sock = None
+    if cfg.CONF.haproxy.seamless_reload:
+        reload_sock = get_reload_socket_path(socket_path)
     loadbalancer = _transform_loadbalancer(loadbalancer, haproxy_base_dir)
     return _get_template().render({'loadbalancer': loadbalancer,
                                    'user_group': user_group,
-                                   'stats_sock': socket_path},
+                                   'stats_sock': socket_path,
+                                   'reload_sock': reload_sock,
+                                   'stick_app_cookie': stick_app_cookie,
+                                   'processes': processes,
+                                   'nbthread': nbthread},
                                   constants=constants)
 
 
+def _stick_app_cookie(nbthread):
+    """Whether APP_COOKIE persistence is rendered with stick tables
+
+    appsession is rejected by haproxy 1.8 and later, which the seamless
+    reload and threads require.
+    """
+    return cfg.CONF.haproxy.seamless_reload or nbthread > 1
+
+
+def _transform_processes(loadbalancer, socket_path):
+    """Transforms the haproxy process layout of a load balancer
+
+    :param loadbalancer: the load balancer object
+    :param socket_path: location of the first process stats socket
+    :return: list of dictionaries of transformed process values
+    """
+    nbproc = get_nbproc(loadbalancer.id)
+    nbthread = get_nbthread(loadbalancer.id)
+    cpus = cfg.CONF.haproxy.cpu_map
+    # Spread the processes of different load balancers over different CPUs
+    offset = zlib.crc32(loadbalancer.id.encode('utf-8')) & 0xffffffff
+    processes = []
+    for proc, sock in enumerate(
+            get_stats_socket_paths(socket_path, nbproc), 1):
+        cpu_map = []
+        if cpus:
+            for thread in six.moves.range(1, nbthread + 1):
+                # Threads are pinned one by one, a single threaded process
+                # is pinned as a whole
+                target = ('%d/%d' % (proc, thread) if nbthread > 1
+                          else str(proc))
+                cpu = cpus[(offset + (proc - 1) * nbthread + thread - 1) %
+                           len(cpus)]
+                cpu_map.append((target, cpu))
+        processes.append({
+            'id': proc,
+            'stats_sock': sock,
+            'cpu_map': cpu_map
+        })
+    return processes
+
+
 def _transform_loadbalancer(loadbalancer, haproxy_base_dir):
     """Transforms load balancer object
 
@@ -232,15 +593,53 @@ def _transform_loadbalancer(loadbalancer, haproxy_base_dir):
     :param haproxy_base_dir: location of the instances state data
     :return: dictionary of transformed load balancer values
     """
-    listeners = [_transform_listener(
-        x, haproxy_base_dir) for x in loadbalancer.listeners]
+    listeners = [_transform_listener(x, haproxy_base_dir)
+                 for x in loadbalancer.listeners if _include_entity(x)]
     return {
         'name': loadbalancer.name,
         'vip_address': loadbalancer.vip_address,
-        'listeners': listeners
+        'listeners': listeners,
+        'tuning': _transform_loadbalancer_tuning(loadbalancer.tuning)
     }
 
 
+def _transform_loadbalancer_tuning(tuning):
+    """Transforms load balancer tuning profile object
+
+    Values which are not set in the profile fall back to TUNING_DEFAULTS.
+
+    :param tuning: the load balancer tuning profile object or None
+    :return: dictionary of transformed tuning values
+    """
+    ret_value = dict(TUNING_DEFAULTS)
+    if tuning:
+        for key in TUNING_DEFAULTS:
+            value = getattr(tuning, key, None)
+            if value is not None:
+                ret_value[key] = value
+    return ret_value
+
+
+def _transform_listener_tuning(tuning):
+    """Transforms listener tuning profile object
+
+    :param tuning: the listener tuning profile object or None
+    :return: dictionary of transformed tuning values
+    """
+    ret_value = {
+        'timeout_client': None,
+        'timeout_server': None,
+        'http_keepalive': None,
+        'http_reuse': None,
+        'tls_session_tickets': None,
+        'tls_ciphers': None
+    }
+    if tuning:
+        for key in ret_value:
+            ret_value[key] = getattr(tuning, key, None)
+    return ret_value
+
+
 def _transform_listener(listener, haproxy_base_dir):
     """Transforms listener object
 
@@ -253,22 +652,29 @@ def _transform_listener(listener, haproxy_base_dir):
         'id': listener.id,
         'protocol_port': listener.protocol_port,
         'protocol_mode': PROTOCOL_MAP[listener.protocol],
-        'protocol': listener.protocol
+        'protocol': listener.protocol,
+        'tuning': _transform_listener_tuning(listener.tuning)
     }
     if listener.connection_limit and listener.connection_limit > -1:
         ret_value['connection_limit'] = listener.connection_limit
-    if listener.default_pool:
+    if listener.default_pool and _include_entity(listener.default_pool):
         ret_value['default_pool'] = _transform_pool(listener.default_pool)
 
     # Process and store certificates
     certs = _process_tls_certificates(listener)
+    cert_paths = set()
     if listener.default_tls_container_id:
         ret_value['default_tls_path'] = _store_listener_crt(
             haproxy_base_dir, listener, certs['tls_cert'])
+        cert_paths.add(ret_value['default_tls_path'])
     if listener.sni_containers:
         for c in certs['sni_certs']:
-            _store_listener_crt(haproxy_base_dir, listener, c)
+            cert_paths.add(_store_listener_crt(haproxy_base_dir, listener, c))
         ret_value['crt_dir'] = data_dir
+    _prune_listener_crts(haproxy_base_dir, listener, cert_paths)
+    if uses_tls_ticket_keys(listener):
+        ret_value['tls_ticket_keys'] = _update_tls_ticket_keys(
+            haproxy_base_dir)
     return ret_value
 
 
@@ -291,7 +697,8 @@ def _transform_pool(pool):
     members = [_transform_member(x)
                for x in pool.members if _include_member(x)]
     ret_value['members'] = members
-    if pool.healthmonitor and pool.healthmonitor.admin_state_up:
+    if (pool.healthmonitor and pool.healthmonitor.admin_state_up and
+            _include_entity(pool.healthmonitor)):
         ret_value['health_monitor'] = _transform_health_monitor(
             pool.healthmonitor)
     if pool.session_persistence:
@@ -359,6 +766,18 @@ def _include_member(member):
             MEMBER_STATUSES and member.admin_state_up)
 
 
+def _include_entity(entity):
+    """Helper for leaving out entities being deleted
+
+    A driver operation coalesced with the deletion of other entities
+    renders them while they are still in PENDING_DELETE.
+
+    :param entity: the listener, pool or health monitor object
+    :return: boolean of status check
+    """
+    return entity.provisioning_status != plugin_constants.PENDING_DELETE
+
+
 def _expand_expected_codes(codes):
     """Expand the expected code string in set of codes
 
@@ -12,7 +12,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+import time
+
 import requests
+from requests import adapters
 
 from neutron.common import exceptions as n_exc
 from neutron.i18n import _LE
@@ -30,6 +34,10 @@ TENANT_HEADER = 'X-Tenant-ID'
 JSON_CONTENT_TYPE = 'application/json'
 DRIVER_HEADER_VALUE = 'netscaler-openstack-lbaas'
 NITRO_LOGIN_URI = 'nitro/v2/config/login'
+DEFAULT_CONCURRENCY = 10
+DEFAULT_SESSION_TIMEOUT = 900
+# share of the session lifetime after which a new session is requested
+SESSION_REFRESH_RATIO = 0.8
 
 
 class NCCException(n_exc.NeutronException):
@@ -57,13 +65,24 @@ class NSClient(object):
     """Client to operate on REST resources of NetScaler Control Center."""
 
     def __init__(self, service_uri, username, password,
-                 ncc_cleanup_mode="False"):
+                 ncc_cleanup_mode="False", concurrency=DEFAULT_CONCURRENCY,
+                 session_timeout=DEFAULT_SESSION_TIMEOUT):
         if not service_uri:
             LOG.exception(_LE("No NetScaler Control Center URI specified. "
                               "Cannot connect."))
             raise NCCException(NCCException.CONNECTION_ERROR)
         self.service_uri = service_uri.strip('/')
         self.auth = None
+        self.auth_expiry = 0
+        self.session_timeout = session_timeout
+        self._login_lock = threading.Lock()
+        # keep-alive connections shared by every user of the client
+        self.session = requests.Session()
+        adapter = adapters.HTTPAdapter(pool_connections=1,
+                                       pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._request_slots = threading.BoundedSemaphore(concurrency)
         self.cleanup_mode = False
         if username and password:
             self.username = username
@@ -106,6 +125,7 @@ class NSClient(object):
                 login = logins
             if login and "sessionid" in login:
                 session_id = login["sessionid"]
+                timeout = login.get("timeout") or self.session_timeout
 
         if session_id:
             LOG.info(_LI("Response: %(result)s"), {"result": result['body']})
@@ -114,6 +134,8 @@ class NSClient(object):
                 {"session_id": session_id})
             # Update sessin_id in auth
             self.auth = "SessId=%s" % session_id
+            self.auth_expiry = (time.time() +
+                                int(timeout) * SESSION_REFRESH_RATIO)
         else:
             raise NCCException(NCCException.RESPONSE_ERROR)
 
@@ -139,9 +161,12 @@ class NSClient(object):
     def _resource_operation(self, method, tenant_id, resource_path,
                             object_name=None, object_data=None):
         resource_uri = "%s/%s" % (self.service_uri, resource_path)
-        if not self.auth and not self.is_login(resource_uri):
-            # Creating a session for the first time
-            self.login()
+        if not self.is_login(resource_uri) and self._session_expired():
+            # Creating a session for the first time, or renewing it
+            # before the Control Center expires it
+            with self._login_lock:
+                if self._session_expired():
+                    self.login()
         headers = self._setup_req_headers(tenant_id)
         request_body = None
         if object_data:
@@ -164,6 +189,9 @@ class NSClient(object):
 
         return response_status, resp_dict
 
+    def _session_expired(self):
+        return not self.auth or time.time() >= self.auth_expiry
+
     def _is_valid_response(self, response_status):
         # when status is less than 400, the response is fine
         return response_status < requests.codes.bad_request
@@ -188,8 +216,9 @@ class NSClient(object):
     def _execute_request(self, method, resource_uri, headers, body=None):
         service_uri_dict = {"service_uri": self.service_uri}
         try:
-            response = requests.request(method, url=resource_uri,
-                                        headers=headers, data=body)
+            with self._request_slots:
+                response = self.session.request(method, url=resource_uri,
+                                                headers=headers, data=body)
         except requests.exceptions.SSLError:
             LOG.exception(_LE("SSL error occurred while connecting "
                               "to %(service_uri)s"),
@@ -235,10 +264,10 @@ class NSClient(object):
                 self.login()
                 # Retry the operation
                 headers.update({AUTH_HEADER: self.auth})
-                self._execute_request(method,
-                                      resource_uri,
-                                      headers,
-                                      body)
+                return self._execute_request(method,
+                                             resource_uri,
+                                             headers,
+                                             body)
             else:
                 raise NCCException(NCCException.RESPONSE_ERROR)
         if not self._is_valid_response(response_status):
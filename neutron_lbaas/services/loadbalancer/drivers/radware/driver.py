@@ -14,7 +14,6 @@
 
 import base64
 import copy
-import httplib
 import netaddr
 import threading
 import time
@@ -35,6 +34,7 @@ from oslo_utils import excutils
 from six.moves import queue as Queue
 
 from neutron_lbaas.db.loadbalancer import loadbalancer_db as lb_db
+from neutron_lbaas.drivers.radware import rest_client
 from neutron_lbaas.extensions import loadbalancer
 from neutron_lbaas.services.loadbalancer.drivers import abstract_driver
 from neutron_lbaas.services.loadbalancer.drivers.radware \
@@ -129,7 +129,12 @@ driver_opts = [
     cfg.BoolOpt('service_session_mirroring_enabled',
                 default=False,
                 help=_('Enable or disable Alteon interswitch link for '
-                       'stateful session failover. Default: False.'))
+                       'stateful session failover. Default: False.')),
+    cfg.IntOpt('vdirect_connection_pool_size',
+               default=10,
+               help=_('Maximum number of concurrent connections to each '
+                      'vDirect server, idle connections are kept open. '
+                      'Default: 10.'))
 ]
 
 cfg.CONF.register_opts(driver_opts, "radware")
@@ -176,10 +181,12 @@ class LoadBalancerDriver(abstract_driver.LoadBalancerAbstractDriver):
         self.actions_to_skip = rad.actions_to_skip
         vdirect_address = rad.vdirect_address
         sec_server = rad.ha_secondary_address
-        self.rest_client = vDirectRESTClient(server=vdirect_address,
-                                             secondary_server=sec_server,
-                                             user=rad.vdirect_user,
-                                             password=rad.vdirect_password)
+        self.rest_client = vDirectRESTClient(
+            server=vdirect_address,
+            secondary_server=sec_server,
+            user=rad.vdirect_user,
+            password=rad.vdirect_password,
+            pool_size=rad.vdirect_connection_pool_size)
         self.queue = Queue.Queue()
         self.completion_handler = OperationCompletionHandler(self.queue,
                                                              self.rest_client,
@@ -663,18 +670,25 @@ class vDirectRESTClient(object):
                  port=2189,
                  ssl=True,
                  timeout=5000,
-                 base_uri=''):
+                 base_uri='',
+                 pool_size=10):
         self.server = server
         self.secondary_server = secondary_server
         self.port = port
         self.ssl = ssl
         self.base_uri = base_uri
         self.timeout = timeout
+        self.pool_size = pool_size
         if user and password:
             self.auth = base64.encodestring('%s:%s' % (user, password))
             self.auth = self.auth.replace('\n', '')
+            self.auth_header = 'Basic %s' % self.auth
         else:
             raise r_exc.AuthenticationMissing()
+        # server -> ConnectionPool, both servers keep their connections
+        # when flipping
+        self._pools = {}
+        self._pools_lock = threading.Lock()
 
         debug_params = {'server': self.server,
                         'sec_server': self.secondary_server,
@@ -685,6 +699,15 @@ class vDirectRESTClient(object):
                   'port=%(port)d, ssl=%(ssl)r',
                   debug_params)
 
+    def _get_pool(self, server):
+        with self._pools_lock:
+            pool = self._pools.get(server)
+            if pool is None:
+                pool = self._pools[server] = rest_client.ConnectionPool(
+                    server, self.port, self.ssl, self.timeout,
+                    self.pool_size)
+            return pool
+
     def _flip_servers(self):
         LOG.warning(_LW('Fliping servers. Current is: %(server)s, '
                         'switching to %(secondary)s'),
@@ -730,44 +753,40 @@ class vDirectRESTClient(object):
 
         debug_data = 'binary' if binary else body
         debug_data = debug_data if debug_data else 'EMPTY'
-        if not headers:
-            headers = {'Authorization': 'Basic %s' % self.auth}
-        else:
-            headers['Authorization'] = 'Basic %s' % self.auth
-        conn = None
-        if self.ssl:
-            conn = httplib.HTTPSConnection(
-                self.server, self.port, timeout=self.timeout)
-            if conn is None:
-                LOG.error(_LE('vdirectRESTClient: Could not establish HTTPS '
-                          'connection'))
-                return 0, None, None, None
-        else:
-            conn = httplib.HTTPConnection(
-                self.server, self.port, timeout=self.timeout)
-            if conn is None:
-                LOG.error(_LE('vdirectRESTClient: Could not establish HTTP '
-                          'connection'))
-                return 0, None, None, None
+        headers = dict(headers or {})
+        headers['Authorization'] = self.auth_header
 
-        try:
-            conn.request(action, uri, body, headers)
-            response = conn.getresponse()
-            respstr = response.read()
+        pool = self._get_pool(self.server)
+        while True:
+            try:
+                conn, reused = pool.get()
+            except Exception as e:
+                LOG.error(_LE('vdirectRESTClient: Could not establish '
+                              'connection, %r'), e)
+                return -1, None, None, None
+            response = None
+            try:
+                conn.request(action, uri, body, headers)
+                response = conn.getresponse()
+                respstr = response.read()
+            except Exception as e:
+                pool.put(conn, reuse=False)
+                if (reused and response is None and
+                        rest_client.is_connection_closed(e)):
+                    # the server closed the idle connection
+                    continue
+                log_dict = {'action': action, 'e': e}
+                LOG.error(_LE('vdirectRESTClient: %(action)s failure, %(e)r'),
+                          log_dict)
+                return -1, None, None, None
+            pool.put(conn, reuse=not response.will_close)
             respdata = respstr
             try:
                 respdata = jsonutils.loads(respstr)
             except ValueError:
                 # response was not JSON, ignore the exception
                 pass
-            ret = (response.status, response.reason, respstr, respdata)
-        except Exception as e:
-            log_dict = {'action': action, 'e': e}
-            LOG.error(_LE('vdirectRESTClient: %(action)s failure, %(e)r'),
-                      log_dict)
-            ret = -1, None, None, None
-        conn.close()
-        return ret
+            return response.status, response.reason, respstr, respdata
 
 
 class OperationAttributes(object):
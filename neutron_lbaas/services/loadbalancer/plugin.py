@@ -13,6 +13,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
+import eventlet
 import six
 
 from neutron.api.v2 import attributes as attrs
@@ -26,6 +29,7 @@ from neutron.services import service_base
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import excutils
+from oslo_utils import uuidutils
 
 from neutron_lbaas import agent_scheduler as agent_scheduler_v2
 import neutron_lbaas.common.cert_manager
@@ -39,9 +43,23 @@ from neutron_lbaas.extensions import loadbalancerv2
 from neutron_lbaas.services.loadbalancer import agent_scheduler
 from neutron_lbaas.services.loadbalancer import constants as lb_const
 from neutron_lbaas.services.loadbalancer import data_models
+from neutron_lbaas.services.loadbalancer import driver_dispatcher
 LOG = logging.getLogger(__name__)
 CERT_MANAGER_PLUGIN = neutron_lbaas.common.cert_manager.get_backend()
 
+OPTS = [
+    cfg.IntOpt('tls_container_validation_concurrency',
+               default=10,
+               help=_('Number of TLS containers of a listener fetched and '
+                      'validated at the same time.')),
+    cfg.IntOpt('tls_container_validation_timeout',
+               default=60,
+               help=_('Seconds the validation of all the TLS containers of '
+                      'a listener may take. 0 disables the timeout.')),
+]
+
+cfg.CONF.register_opts(OPTS)
+
 
 def verify_lbaas_mutual_exclusion():
     """Verifies lbaas v1 and lbaas v2 cannot be active concurrently."""
@@ -62,6 +80,18 @@ def add_provider_configuration(type_manager, service_type):
         pconf.ProviderConfiguration('neutron_lbaas'))
 
 
+def _entities(db_entity):
+    # the entities of a driver operation, a bulk operation has several
+    if isinstance(db_entity, list):
+        return db_entity
+    return [db_entity]
+
+
+def _root_loadbalancer(db_entity):
+    # the entities of a bulk operation share their root load balancer
+    return _entities(db_entity)[0].root_loadbalancer
+
+
 class LoadBalancerPlugin(ldb.LoadBalancerPluginDb,
                          agent_scheduler.LbaasAgentSchedulerDbMixin):
     """Implementation of the Neutron Loadbalancer Service Plugin.
@@ -386,6 +416,12 @@ class LoadBalancerPluginv2(loadbalancerv2.LoadBalancerPluginBaseV2):
     agent_notifiers = (
         agent_scheduler_v2.LbaasAgentSchedulerDbMixin.agent_notifiers)
 
+    # runs driver operations in the background when set
+    dispatcher = None
+
+    # members are created in bulk by create_pool_member_bulk
+    __native_bulk_support = True
+
     def __init__(self):
         """Initialization for the loadbalancer service plugin."""
         self.db = ldbv2.LoadBalancerPluginDbv2()
@@ -394,11 +430,23 @@ class LoadBalancerPluginv2(loadbalancerv2.LoadBalancerPluginBaseV2):
             self.service_type_manager, constants.LOADBALANCERV2)
         self._load_drivers()
         self.db.subscribe()
+        self.db.coalescing_providers = self._get_coalescing_providers()
+        if (cfg.CONF.async_driver_operations or
+                self.db.coalescing_providers):
+            self.dispatcher = driver_dispatcher.DriverOperationDispatcher(
+                cfg.CONF.driver_operation_workers,
+                cfg.CONF.driver_operation_concurrency)
+        # operations folded into a coalesced driver operation, keyed by
+        # the entity the driver operation ran on
+        self._coalesced_operations = {}
+        self._coalesced_lock = threading.Lock()
 
     def _load_drivers(self):
         """Loads plugin-drivers specified in configuration."""
         self.drivers, self.default_provider = service_base.load_drivers(
             constants.LOADBALANCERV2, self)
+        self.driver_providers = dict(
+            (driver, provider) for provider, driver in self.drivers.items())
 
         # NOTE(blogan): this method MUST be called after
         # service_base.load_drivers to correctly verify
@@ -408,6 +456,26 @@ class LoadBalancerPluginv2(loadbalancerv2.LoadBalancerPluginBaseV2):
         # stop service in case provider was removed, but resources were not
         self._check_orphan_loadbalancer_associations(ctx, self.drivers.keys())
 
+    def _get_coalescing_providers(self):
+        """Retrieves the providers whose driver operations are coalesced.
+
+        Only the last of the coalesced operations reaches the driver, so the
+        service is stopped if a driver does not rebuild the whole load
+        balancer on every operation.
+        """
+        providers = frozenset(cfg.CONF.driver_operation_coalesce_providers)
+        unsupported = [
+            provider for provider in providers
+            if provider in self.drivers and
+            not self.drivers[provider].load_balancer.rebuilds_loadbalancer]
+        if unsupported:
+            msg = _LE("Driver operations of providers %s cannot be "
+                      "coalesced, their drivers do not rebuild the whole "
+                      "load balancer") % sorted(unsupported)
+            LOG.error(msg)
+            raise SystemExit(1)
+        return providers
+
     def _check_orphan_loadbalancer_associations(self, context, provider_names):
         """Checks remaining associations between loadbalancers and providers.
 
@@ -461,14 +529,29 @@ class LoadBalancerPluginv2(loadbalancerv2.LoadBalancerPluginBaseV2):
 
     def _call_driver_operation(self, context, driver_method, db_entity,
                                old_db_entity=None):
-        manager_method = "%s.%s" % (driver_method.__self__.__class__.__name__,
-                                    driver_method.__name__)
-        LOG.info(_LI("Calling driver operation %s") % manager_method)
+        if self.dispatcher:
+            # the PENDING state is persisted, run the operation in the
+            # background with a context of its own
+            provider = self.driver_providers.get(
+                getattr(driver_method.__self__, 'driver', None), 'default')
+            lb_id = _root_loadbalancer(db_entity).id
+            if provider in self.db.coalescing_providers:
+                self.dispatcher.coalesce(
+                    provider, lb_id,
+                    (ncontext.Context.from_dict(context.to_dict()),
+                     driver_method, db_entity, old_db_entity),
+                    self._run_coalesced_driver_operations,
+                    cfg.CONF.driver_operation_coalesce_window)
+                return
+            if cfg.CONF.async_driver_operations:
+                self.dispatcher.submit(
+                    provider, lb_id, self._run_driver_operation,
+                    ncontext.Context.from_dict(context.to_dict()),
+                    driver_method, db_entity, old_db_entity=old_db_entity)
+                return
         try:
-            if old_db_entity:
-                driver_method(context, old_db_entity, db_entity)
-            else:
-                driver_method(context, db_entity)
+            self._invoke_driver_method(context, driver_method, db_entity,
+                                       old_db_entity)
         # catching and reraising agent issues
         except (lbaas_agentschedulerv2.NoEligibleLbaasAgent,
                 lbaas_agentschedulerv2.NoActiveLbaasAgent) as no_agent:
@@ -478,8 +561,135 @@ class LoadBalancerPluginv2(loadbalancerv2.LoadBalancerPluginBaseV2):
             self._handle_driver_error(context, db_entity)
             raise loadbalancerv2.DriverError()
 
+    def _invoke_driver_method(self, context, driver_method, db_entity,
+                              old_db_entity):
+        manager_method = "%s.%s" % (driver_method.__self__.__class__.__name__,
+                                    driver_method.__name__)
+        LOG.info(_LI("Calling driver operation %s") % manager_method)
+        if old_db_entity:
+            driver_method(context, old_db_entity, db_entity)
+        else:
+            driver_method(context, db_entity)
+
+    def _run_driver_operation(self, context, driver_method, db_entity,
+                              old_db_entity=None):
+        """Runs a driver operation dispatched in the background."""
+        try:
+            self._invoke_driver_method(context, driver_method, db_entity,
+                                       old_db_entity)
+        except Exception:
+            LOG.exception(_LE("There was an error in the driver"))
+            manager = driver_method.__self__
+            if not hasattr(manager, 'failed_completion'):
+                self._handle_driver_error(context, db_entity)
+            else:
+                manager.failed_completion(context, db_entity)
+
+    def _run_coalesced_driver_operations(self, operations):
+        """Runs the driver operations collected for a root load balancer.
+
+        Only the last operation is passed to the driver, its graph holds
+        the changes of all the others. The entities of the other
+        operations share the outcome the driver reports for the last one,
+        see complete_coalesced_operations.
+        """
+        context, driver_method, db_entity, old_db_entity = operations[-1]
+        if len(operations) > 1:
+            LOG.debug("Coalesced %(count)d driver operations of "
+                      "loadbalancer %(lb_id)s",
+                      {'count': len(operations),
+                       'lb_id': _root_loadbalancer(db_entity).id})
+        # the entities of a bulk operation complete in order, the
+        # others are completed along with the last one
+        key = self._coalesced_key(_entities(db_entity)[-1])
+        seen = set(self._coalesced_key(entity)
+                   for entity in _entities(db_entity))
+        riders = []
+        for op_context, op_method, op_entity, _old in operations[-2::-1]:
+            for entity in _entities(op_entity):
+                rider_key = self._coalesced_key(entity)
+                if (rider_key in seen or
+                        isinstance(entity, data_models.LoadBalancer)):
+                    continue
+                seen.add(rider_key)
+                riders.append((op_context, op_method, entity))
+        if riders:
+            # registered first, drivers may complete before returning
+            with self._coalesced_lock:
+                self._coalesced_operations.setdefault(key, []).append(riders)
+        try:
+            self._invoke_driver_method(context, driver_method, db_entity,
+                                       old_db_entity)
+        except Exception:
+            LOG.exception(_LE("There was an error in the driver"))
+            with self._coalesced_lock:
+                pending = self._coalesced_operations.get(key, [])
+                for i, registered in enumerate(pending):
+                    if registered is riders:
+                        del pending[i]
+                        break
+                if not pending:
+                    self._coalesced_operations.pop(key, None)
+            for context, driver_method, db_entity, _old in operations:
+                manager = driver_method.__self__
+                if not hasattr(manager, 'failed_completion'):
+                    self._handle_driver_error(context, db_entity)
+                    continue
+                for entity in _entities(db_entity):
+                    manager.failed_completion(context, entity)
+
+    @staticmethod
+    def _coalesced_key(db_entity):
+        return db_entity.__class__, db_entity.id
+
+    def complete_coalesced_operations(self, context, model, entity_id,
+                                      succeeded=True):
+        """Completes the operations coalesced into a driver operation.
+
+        Drivers report the outcome of the operation they ran on the
+        entity, the entities of the operations folded into it are
+        completed with that outcome here.
+
+        :param model: data model or sqlalchemy model class of the entity
+        :param entity_id: id of the entity the driver operation ran on
+        :param succeeded: whether the driver deployed the operation
+        """
+        model = data_models.SA_MODEL_TO_DATA_MODEL_MAP.get(model, model)
+        with self._coalesced_lock:
+            pending = self._coalesced_operations.get((model, entity_id))
+            if not pending:
+                return
+            riders = pending.pop(0)
+            if not pending:
+                del self._coalesced_operations[(model, entity_id)]
+        for rider in riders:
+            try:
+                self._complete_coalesced_entity(succeeded, *rider)
+            except loadbalancerv2.EntityNotFound:
+                LOG.debug("Coalesced %(model)s %(id)s no longer exists",
+                          {'model': rider[2].__class__.__name__,
+                           'id': rider[2].id})
+
+    def _complete_coalesced_entity(self, succeeded, context, driver_method,
+                                   db_entity):
+        # the load balancer status belongs to the operation run by the
+        # driver, only the entity is completed here
+        if succeeded and driver_method.__name__ == 'delete':
+            driver_method.__self__.db_delete_method(context, db_entity.id)
+            return
+        prov_status, op_status = constants.ACTIVE, lb_const.ONLINE
+        if not succeeded:
+            prov_status, op_status = constants.ERROR, lb_const.OFFLINE
+        if isinstance(db_entity, data_models.HealthMonitor):
+            op_status = None
+        self.db.update_status(
+            context, data_models.DATA_MODEL_TO_SA_MODEL_MAP[
+                db_entity.__class__],
+            db_entity.id, provisioning_status=prov_status,
+            operating_status=op_status)
+
     def _handle_driver_error(self, context, db_entity):
-        lb_id = db_entity.root_loadbalancer.id
+        lb_id = _root_loadbalancer(db_entity).id
         self.db.update_status(context, models.LoadBalancer, lb_id,
                               constants.ERROR)
 
@@ -507,10 +717,43 @@ class LoadBalancerPluginv2(loadbalancerv2.LoadBalancerPluginBaseV2):
     def get_plugin_description(self):
         return "Neutron LoadBalancer Service Plugin v2"
 
+    def _validate_loadbalancer_graph(self, loadbalancer_id, listeners):
+        protocol_ports = set()
+        for listener in listeners:
+            if listener['protocol_port'] in protocol_ports:
+                raise loadbalancerv2.LoadBalancerListenerProtocolPortExists(
+                    lb_id=loadbalancer_id,
+                    protocol_port=listener['protocol_port'])
+            protocol_ports.add(listener['protocol_port'])
+            listener['loadbalancer_id'] = loadbalancer_id
+            if listener['protocol'] == lb_const.PROTOCOL_TERMINATED_HTTPS:
+                self._validate_tls(listener)
+            pool = listener.get('default_pool')
+            if not pool:
+                continue
+            if ((pool['protocol'], listener['protocol']) not in
+                    lb_const.LISTENER_POOL_COMPATIBLE_PROTOCOLS):
+                raise loadbalancerv2.ListenerPoolProtocolMismatch(
+                    listener_proto=listener['protocol'],
+                    pool_proto=pool['protocol'])
+            self._validate_session_persistence_info(
+                pool.get('session_persistence'))
+
     def create_loadbalancer(self, context, loadbalancer):
         loadbalancer = loadbalancer.get('loadbalancer')
         provider_name = self._get_provider_name(loadbalancer)
         driver = self.drivers[provider_name]
+        if loadbalancer.get('listeners'):
+            # the listeners, their pools, members and health monitors are
+            # created along with the load balancer and passed to a single
+            # driver create, the id is needed to validate TLS containers
+            if not driver.load_balancer.creates_graph:
+                raise loadbalancerv2.ProviderOperationUnsupported(
+                    provider=provider_name,
+                    operation=_('creating listeners with a load balancer'))
+            loadbalancer['id'] = uuidutils.generate_uuid()
+            self._validate_loadbalancer_graph(loadbalancer['id'],
+                                              loadbalancer['listeners'])
         lb_db = self.db.create_loadbalancer(
             context, loadbalancer,
             allocate_vip=not driver.load_balancer.allocates_vip)
@@ -598,8 +841,59 @@ class LoadBalancerPluginv2(loadbalancerv2.LoadBalancerPluginBaseV2):
                     container_id=container_ref, reason=str(e))
 
         def validate_tls_containers(to_validate):
-            for container_ref in to_validate:
-                validate_tls_container(container_ref)
+            # a container may be both the default and an SNI one
+            seen = set()
+            to_validate = [container_ref for container_ref in to_validate
+                           if not (container_ref in seen or
+                                   seen.add(container_ref))]
+            if len(to_validate) < 2:
+                for container_ref in to_validate:
+                    validate_tls_container(container_ref)
+                return
+
+            errors = {}
+            done = set()
+
+            def validate(container_ref):
+                try:
+                    validate_tls_container(container_ref)
+                except Exception as e:
+                    errors[container_ref] = e
+                done.add(container_ref)
+
+            # the cert manager calls of the containers overlap, the
+            # slowest container bounds the time taken instead of their sum
+            pool = eventlet.GreenPool(
+                max(cfg.CONF.tls_container_validation_concurrency, 1))
+            threads = []
+            timeout = eventlet.Timeout(
+                cfg.CONF.tls_container_validation_timeout or None)
+            try:
+                for container_ref in to_validate:
+                    threads.append(pool.spawn(validate, container_ref))
+                pool.waitall()
+            except eventlet.Timeout as e:
+                if e is not timeout:
+                    raise
+                for thread in threads:
+                    thread.kill()
+                raise loadbalancerv2.CertManagerError(
+                    ref=', '.join(container_ref for container_ref in
+                                  to_validate if container_ref not in done),
+                    reason=_('validation timed out after %d seconds') %
+                    cfg.CONF.tls_container_validation_timeout)
+            finally:
+                timeout.cancel()
+
+            failed = [container_ref for container_ref in to_validate
+                      if container_ref in errors]
+            if len(failed) == 1:
+                raise errors[failed[0]]
+            elif failed:
+                raise loadbalancerv2.TLSContainerInvalid(
+                    container_id=', '.join(failed),
+                    reason='; '.join(six.text_type(errors[container_ref])
+                                     for container_ref in failed))
 
         to_validate = []
         if not listener['default_tls_container_ref']:
@@ -762,18 +1056,32 @@ class LoadBalancerPluginv2(loadbalancerv2.LoadBalancerPluginBaseV2):
         pool = pool.get('pool')
         self._validate_session_persistence_info(
             pool.get('session_persistence'))
+        members = pool.pop('members', None)
         old_pool = self.db.get_pool(context, id)
+        driver = self._get_driver_for_loadbalancer(
+            context, old_pool.listener.loadbalancer_id)
+        if members is not None and not driver.pool.replaces_members:
+            raise loadbalancerv2.ProviderOperationUnsupported(
+                provider=old_pool.root_loadbalancer.provider.provider_name,
+                operation=_('replacing the members of a pool'))
         self.db.test_and_set_status(context, models.PoolV2, id,
                                     constants.PENDING_UPDATE)
         try:
-            updated_pool = self.db.update_pool(context, id, pool)
+            updated_pool = old_pool
+            if pool:
+                updated_pool = self.db.update_pool(context, id, pool)
+            if members is not None:
+                # the member set is diffed by the db, the driver applies
+                # the pending members with a single pool update
+                updated_pool = self.db.replace_pool_members(context, id,
+                                                            members)
         except Exception as exc:
+            self.db.update_status(context, models.PoolV2, id,
+                                  old_pool.provisioning_status)
             self.db.update_loadbalancer_provisioning_status(
                 context, old_pool.root_loadbalancer.id)
             raise exc
 
-        driver = self._get_driver_for_loadbalancer(
-            context, updated_pool.listener.loadbalancer_id)
         self._call_driver_operation(context,
                                     driver.pool.update,
                                     updated_pool,
@@ -824,6 +1132,39 @@ class LoadBalancerPluginv2(loadbalancerv2.LoadBalancerPluginBaseV2):
 
         return self.db.get_pool_member(context, member_db.id).to_api_dict()
 
+    def create_pool_member_bulk(self, context, pool_id, members):
+        """Creates the members of a bulk request.
+
+        The members are validated and inserted in one transaction, the
+        driver is called once with all of them.
+        """
+        self._check_pool_exists(context, pool_id)
+        db_pool = self.db.get_pool(context, pool_id)
+        members = [item['member'] for item in members['members']]
+        self.db.test_and_set_status(context, models.LoadBalancer,
+                                    db_pool.root_loadbalancer.id,
+                                    constants.PENDING_UPDATE)
+        try:
+            member_dbs = self.db.create_pool_members(context, members,
+                                                     pool_id)
+        except Exception as exc:
+            self.db.update_loadbalancer_provisioning_status(
+                context, db_pool.root_loadbalancer.id)
+            raise exc
+
+        driver = self._get_driver_for_loadbalancer(
+            context, db_pool.root_loadbalancer.id)
+        self._call_driver_operation(context,
+                                    driver.member.create_many,
+                                    member_dbs)
+
+        created = dict((member.id, member) for member in
+                       self.db.get_pool_members(
+                           context,
+                           filters={'id': [m.id for m in member_dbs]}))
+        return [created[member_db.id].to_api_dict()
+                for member_db in member_dbs]
+
     def update_pool_member(self, context, id, pool_id, member):
         self._check_pool_exists(context, pool_id)
         member = member.get('member')
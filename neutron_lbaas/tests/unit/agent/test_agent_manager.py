@@ -30,6 +30,7 @@ class TestManager(base.BaseTestCase):
 
         mock_conf = mock.Mock()
         mock_conf.device_driver = ['devdriver']
+        mock_conf.loadbalancer_capacity = 0
 
         self.mock_importer = mock.patch.object(manager, 'importutils').start()
 
@@ -84,6 +85,21 @@ class TestManager(base.BaseTestCase):
         self.assertTrue(self.mgr.needs_resync)
         self.assertTrue(self.log.exception.called)
 
+    def test_refresh_tls_material(self):
+        self.mgr.refresh_tls_material(mock.Mock())
+        self.driver_mock.refresh_tls_material.assert_called_once_with()
+
+    def test_refresh_tls_material_not_implemented(self):
+        self.driver_mock.refresh_tls_material.side_effect = (
+            NotImplementedError)
+        self.mgr.refresh_tls_material(mock.Mock())
+        self.assertFalse(self.log.exception.called)
+
+    def test_refresh_tls_material_exception(self):
+        self.driver_mock.refresh_tls_material.side_effect = Exception
+        self.mgr.refresh_tls_material(mock.Mock())
+        self.assertTrue(self.log.exception.called)
+
     def _sync_state_helper(self, ready, reloaded, destroyed):
         with contextlib.nested(
             mock.patch.object(self.mgr, '_reload_loadbalancer'),
@@ -564,6 +580,36 @@ class TestManager(base.BaseTestCase):
         self.driver_mock.member.create.assert_called_once_with(member)
         self.update_statuses.assert_called_once_with(member, error=True)
 
+    def _bulk_members(self):
+        loadbalancer = data_models.LoadBalancer(id='1')
+        listener = data_models.Listener(id=1, loadbalancer_id='1',
+                                        loadbalancer=loadbalancer)
+        pool = data_models.Pool(id='1', listener=listener, protocol='HTTPS')
+        return [data_models.Member(id='1', pool=pool),
+                data_models.Member(id='2', pool=pool)]
+
+    @mock.patch.object(data_models.Member, 'from_dict')
+    def test_create_members(self, mmember):
+        members = self._bulk_members()
+        mmember.side_effect = members
+        self.mgr.create_members(mock.Mock(),
+                                [member.to_dict() for member in members])
+        self.driver_mock.member.create_many.assert_called_once_with(members)
+        self.assertFalse(self.driver_mock.member.create.called)
+        self.assertEqual([mock.call(members[0]), mock.call(members[1])],
+                         self.update_statuses.call_args_list)
+
+    @mock.patch.object(data_models.Member, 'from_dict')
+    def test_create_members_failed(self, mmember):
+        members = self._bulk_members()
+        mmember.side_effect = members
+        self.driver_mock.member.create_many.side_effect = Exception
+        self.mgr.create_members(mock.Mock(),
+                                [member.to_dict() for member in members])
+        self.assertEqual([mock.call(members[0], error=True),
+                          mock.call(members[1], error=True)],
+                         self.update_statuses.call_args_list)
+
     @mock.patch.object(data_models.Member, 'from_dict')
     def test_update_member(self, mmember):
         loadbalancer = data_models.LoadBalancer(id='1')
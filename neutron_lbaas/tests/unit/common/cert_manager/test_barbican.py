@@ -14,6 +14,7 @@
 
 from barbicanclient import client as barbican_client
 import mock
+from oslo_config import cfg
 
 import neutron_lbaas.common.cert_manager.barbican_cert_manager as bbq_common
 from neutron_lbaas.common import keystone
@@ -99,3 +100,98 @@ class TestBarbicanCert(base.BaseTestCase):
         self.assertEqual(self.private_key, cert.get_private_key())
         self.assertEqual(self.private_key_passphrase,
                          cert.get_private_key_passphrase())
+
+
+class TestBarbicanManager(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestBarbicanManager, self).setUp()
+        self.container_ref = 'container1'
+        self.container = barbican_client.containers.CertificateContainer(
+            api=mock.MagicMock())
+        self.bc = mock.MagicMock()
+        self.bc.containers.get.return_value = self.container
+        self.bc.containers.register_consumer.return_value = self.container
+        mock.patch.object(bbq_common.BarbicanKeystoneAuth,
+                          'get_barbican_client',
+                          return_value=self.bc).start()
+        self.time = mock.patch.object(bbq_common.time, 'time',
+                                      return_value=1000.0).start()
+        bbq_common._cert_cache.clear()
+        self.addCleanup(bbq_common._cert_cache.clear)
+        self.cert_manager = bbq_common.CertManager()
+
+    def test_get_cert_cached(self):
+        cert1 = self.cert_manager.get_cert(self.container_ref,
+                                           resource_ref='lb1')
+        cert2 = self.cert_manager.get_cert(self.container_ref,
+                                           resource_ref='lb1')
+        self.assertIs(cert1, cert2)
+        self.bc.containers.register_consumer.assert_called_once_with(
+            container_ref=self.container_ref, name='lbaas', url='lb1')
+        # a cached container is good for a read only access
+        self.cert_manager.get_cert(self.container_ref, check_only=True)
+        self.assertFalse(self.bc.containers.get.called)
+
+    def test_get_cert_registers_each_consumer(self):
+        self.cert_manager.get_cert(self.container_ref, resource_ref='lb1')
+        self.cert_manager.get_cert(self.container_ref, resource_ref='lb2')
+        self.cert_manager.get_cert(self.container_ref, resource_ref='lb1')
+        self.assertEqual(
+            [mock.call(container_ref=self.container_ref, name='lbaas',
+                       url='lb1'),
+             mock.call(container_ref=self.container_ref, name='lbaas',
+                       url='lb2')],
+            self.bc.containers.register_consumer.call_args_list)
+
+    def test_get_cert_expired(self):
+        self.cert_manager.get_cert(self.container_ref, check_only=True)
+        self.time.return_value += 301
+        self.cert_manager.get_cert(self.container_ref, check_only=True)
+        self.assertEqual(2, self.bc.containers.get.call_count)
+
+    def test_get_cert_cache_disabled(self):
+        cfg.CONF.set_override('barbican_cache_ttl', 0, group='certificates')
+        self.cert_manager.get_cert(self.container_ref, check_only=True)
+        self.cert_manager.get_cert(self.container_ref, check_only=True)
+        self.assertEqual(2, self.bc.containers.get.call_count)
+
+    def test_get_cert_lru(self):
+        cfg.CONF.set_override('barbican_cache_size', 2,
+                              group='certificates')
+        for ref in ('c1', 'c2', 'c1', 'c3', 'c1', 'c2'):
+            self.cert_manager.get_cert(ref, check_only=True)
+        # c2 was the least recently used when c3 was cached
+        self.assertEqual(
+            ['c1', 'c2', 'c3', 'c2'],
+            [call[1]['container_ref']
+             for call in self.bc.containers.get.call_args_list])
+
+    def test_get_cert_not_found_cached(self):
+        error = Exception('not found')
+        error.status_code = 404
+        self.bc.containers.get.side_effect = error
+        for i in range(2):
+            self.assertRaises(Exception, self.cert_manager.get_cert,
+                              self.container_ref, check_only=True)
+        self.assertEqual(1, self.bc.containers.get.call_count)
+        self.time.return_value += 31
+        self.assertRaises(Exception, self.cert_manager.get_cert,
+                          self.container_ref, check_only=True)
+        self.assertEqual(2, self.bc.containers.get.call_count)
+
+    def test_get_cert_error_not_cached(self):
+        self.bc.containers.get.side_effect = [Exception('unavailable'),
+                                              self.container]
+        self.assertRaises(Exception, self.cert_manager.get_cert,
+                          self.container_ref, check_only=True)
+        self.cert_manager.get_cert(self.container_ref, check_only=True)
+        self.assertEqual(2, self.bc.containers.get.call_count)
+
+    def test_delete_cert_invalidates(self):
+        self.cert_manager.get_cert(self.container_ref, resource_ref='lb1')
+        self.cert_manager.delete_cert(self.container_ref, 'lb1')
+        self.bc.containers.remove_consumer.assert_called_once_with(
+            container_ref=self.container_ref, name='lbaas', url='lb1')
+        self.cert_manager.get_cert(self.container_ref, resource_ref='lb1')
+        self.assertEqual(2, self.bc.containers.register_consumer.call_count)
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import mock
+
 import neutron_lbaas.common.exceptions as exceptions
 import neutron_lbaas.common.tls_utils.cert_parser as cert_parser
 from neutron_lbaas.tests import base
@@ -235,6 +237,11 @@ def _get_rsa_numbers(private_key, private_key_passphrase=None):
 
 
 class TestTLSParseUtils(base.BaseTestCase):
+    def setUp(self):
+        super(TestTLSParseUtils, self).setUp()
+        cert_parser._parse_cache.clear()
+        self.addCleanup(cert_parser._parse_cache.clear)
+
     def test_alt_subject_name_parses(self):
         hosts = cert_parser.get_host_names(ALT_EXT_CRT)
         self.assertEqual('www.CNFromSubject.org', hosts['cn'])
@@ -304,3 +311,59 @@ class TestTLSParseUtils(base.BaseTestCase):
 
         for i in range(0, len(imds)):
             self.assertEqual(EXPECTED_IMD_SUBJS[i], imds[i].get_subject().CN)
+
+    def _count_parses(self):
+        load_certificate = cert_parser.crypto.load_certificate
+        return mock.patch.object(cert_parser.crypto, 'load_certificate',
+                                 side_effect=load_certificate)
+
+    def test_validate_cert_cached(self):
+        with self._count_parses() as parse:
+            self.assertTrue(cert_parser.validate_cert(
+                ALT_EXT_CRT, private_key=ALT_EXT_CRT_KEY))
+            self.assertTrue(cert_parser.validate_cert(
+                ALT_EXT_CRT, private_key=ALT_EXT_CRT_KEY))
+            self.assertEqual(1, parse.call_count)
+            # the key is part of the result
+            self.assertRaises(exceptions.MisMatchedKey,
+                              cert_parser.validate_cert,
+                              ALT_EXT_CRT, private_key=SOME_OTHER_RSA_KEY)
+            self.assertRaises(exceptions.MisMatchedKey,
+                              cert_parser.validate_cert,
+                              ALT_EXT_CRT, private_key=SOME_OTHER_RSA_KEY)
+            self.assertEqual(3, parse.call_count)
+
+    def test_validate_sni_set(self):
+        certs = [ALT_EXT_CRT] + list(cert_parser._split_x509s(X509_IMDS))
+        sni_certs = [certs[i % len(certs)] for i in range(100)]
+        with self._count_parses() as parse:
+            for i in range(2):
+                for cert in sni_certs:
+                    self.assertTrue(cert_parser.validate_cert(cert))
+            self.assertEqual(len(certs), parse.call_count)
+
+    def test_parse_cache_size(self):
+        certs = list(cert_parser._split_x509s(X509_IMDS))
+        with mock.patch.object(cert_parser._parse_cache, 'size', 2):
+            with self._count_parses() as parse:
+                for cert in certs + certs:
+                    cert_parser.validate_cert(cert)
+                self.assertEqual(2 * len(certs), parse.call_count)
+
+    def test_get_host_names_cached(self):
+        with self._count_parses() as parse:
+            hosts = cert_parser.get_host_names(ALT_EXT_CRT)
+            hosts['dns_names'].append('www.example.com')
+            self.assertEqual(
+                4, len(cert_parser.get_host_names(ALT_EXT_CRT)['dns_names']))
+            self.assertEqual(1, parse.call_count)
+
+    def test_dump_private_key_not_cached(self):
+        # decrypted private keys are not kept around
+        with mock.patch.object(cert_parser, '_read_pyca_private_key',
+                               wraps=cert_parser._read_pyca_private_key) as rd:
+            for i in range(2):
+                cert_parser.dump_private_key(
+                    ENCRYPTED_PKCS8_CRT_KEY,
+                    ENCRYPTED_PKCS8_CRT_KEY_PASSPHRASE)
+            self.assertEqual(2, rd.call_count)
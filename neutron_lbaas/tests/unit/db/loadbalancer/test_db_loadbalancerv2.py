@@ -15,6 +15,7 @@
 
 import contextlib
 import copy
+import eventlet
 import exceptions as ex
 import mock
 import six
@@ -41,6 +42,7 @@ from neutron_lbaas.drivers.logging_noop import driver as noop_driver
 import neutron_lbaas.extensions
 from neutron_lbaas.extensions import loadbalancerv2
 from neutron_lbaas.services.loadbalancer import constants as lb_const
+from neutron_lbaas.services.loadbalancer import data_models
 from neutron_lbaas.services.loadbalancer import plugin as loadbalancer_plugin
 from neutron_lbaas.tests import base
 
@@ -65,7 +67,8 @@ class LbaasTestMixin(object):
     )
 
     def _get_loadbalancer_optional_args(self):
-        return 'description', 'vip_address', 'admin_state_up', 'name'
+        return ('description', 'vip_address', 'admin_state_up', 'name',
+                'tuning', 'listeners')
 
     def _create_loadbalancer(self, fmt, subnet_id,
                              expected_res_status=None, **kwargs):
@@ -86,7 +89,7 @@ class LbaasTestMixin(object):
     def _get_listener_optional_args(self):
         return ('name', 'description', 'default_pool_id', 'loadbalancer_id',
                 'connection_limit', 'admin_state_up',
-                'default_tls_container_ref', 'sni_container_refs')
+                'default_tls_container_ref', 'sni_container_refs', 'tuning')
 
     def _create_listener(self, fmt, protocol, protocol_port, loadbalancer_id,
                          expected_res_status=None, **kwargs):
@@ -506,6 +509,289 @@ class LbaasLoadBalancerTests(LbaasPluginDbTestCase):
                 self._validate_statuses(loadbalancer_id,
                                         loadbalancer_disabled=True)
 
+    def test_create_loadbalancer_with_tuning(self):
+        tuning = {'maxconn': 100000,
+                  'tune_bufsize': None,
+                  'tune_ssl_cachesize': None,
+                  'tune_ssl_lifetime': 600,
+                  'timeout_connect': 1000,
+                  'timeout_client': None,
+                  'timeout_server': 60000,
+                  'retries': 2}
+        self.test_create_loadbalancer(tuning=tuning)
+
+    def test_create_loadbalancer_with_invalid_tuning(self):
+        with self.subnet() as subnet:
+            self._create_loadbalancer(self.fmt, subnet['subnet']['id'],
+                                      expected_res_status=400,
+                                      tuning={'retries': -1})
+
+    def _make_loadbalancer_graph(self):
+        network = self._make_network(self.fmt, 'test-net', True)
+        subnet = self._make_subnet(
+            self.fmt, network, gateway=attributes.ATTR_NOT_SPECIFIED,
+            cidr='10.0.0.0/24')
+        subnet_id = subnet['subnet']['id']
+        members = [{'address': '10.0.0.%d' % i, 'protocol_port': 8080,
+                    'subnet_id': subnet_id} for i in (10, 11)]
+        listeners = [
+            {'protocol': lb_const.PROTOCOL_HTTP,
+             'protocol_port': 80,
+             'default_pool': {
+                 'protocol': lb_const.PROTOCOL_HTTP,
+                 'lb_algorithm': lb_const.LB_METHOD_ROUND_ROBIN,
+                 'members': members,
+                 'healthmonitor': {'type': lb_const.HEALTH_MONITOR_HTTP,
+                                   'delay': 1,
+                                   'timeout': 1,
+                                   'max_retries': 2}}},
+            {'protocol': lb_const.PROTOCOL_TCP,
+             'protocol_port': 22}]
+        return subnet_id, listeners
+
+    def test_create_loadbalancer_graph(self):
+        subnet_id, listeners = self._make_loadbalancer_graph()
+        driver = self.plugin.drivers['lbaas']
+        with contextlib.nested(
+            mock.patch.object(driver.load_balancer, 'create',
+                              wraps=driver.load_balancer.create),
+            mock.patch.object(driver.listener, 'create'),
+            mock.patch.object(driver.pool, 'create'),
+            mock.patch.object(driver.member, 'create')
+        ) as (lb_create, listener_create, pool_create, member_create):
+            res = self._create_loadbalancer(self.fmt, subnet_id,
+                                            expected_res_status=201,
+                                            listeners=listeners)
+        # a single driver operation deploys the whole graph
+        self.assertEqual(1, lb_create.call_count)
+        db_lb = lb_create.call_args[0][1]
+        self.assertEqual(2, len(db_lb.listeners))
+        self.assertEqual(2, len(db_lb.listeners[0].default_pool.members))
+        self.assertFalse(listener_create.called)
+        self.assertFalse(pool_create.called)
+        self.assertFalse(member_create.called)
+
+        lb = self.deserialize(self.fmt, res)['loadbalancer']
+        self.assertEqual(2, len(lb['listeners']))
+        resp, body = self._get_loadbalancer_statuses_api(lb['id'])
+        lb_statuses = body['statuses']['loadbalancer']
+        self.assertEqual(constants.ACTIVE, lb_statuses['provisioning_status'])
+        self.assertEqual(2, len(lb_statuses['listeners']))
+        pool_statuses = [pool for listener in lb_statuses['listeners']
+                         for pool in listener['pools']]
+        self.assertEqual(1, len(pool_statuses))
+        entities = (lb_statuses['listeners'] + pool_statuses +
+                    pool_statuses[0]['members'] +
+                    [pool_statuses[0]['healthmonitor']])
+        self.assertEqual(7, len(entities))
+        for entity in entities:
+            self.assertEqual(constants.ACTIVE, entity['provisioning_status'])
+
+    def test_create_loadbalancer_graph_duplicate_listener_port(self):
+        subnet_id, listeners = self._make_loadbalancer_graph()
+        listeners[1]['protocol_port'] = 80
+        self._create_loadbalancer(self.fmt, subnet_id,
+                                  expected_res_status=409,
+                                  listeners=listeners)
+        self.assertEqual([], self.plugin.get_loadbalancers(
+            context.get_admin_context()))
+
+    def test_create_loadbalancer_graph_duplicate_member(self):
+        subnet_id, listeners = self._make_loadbalancer_graph()
+        members = listeners[0]['default_pool']['members']
+        members[1]['address'] = members[0]['address']
+        self._create_loadbalancer(self.fmt, subnet_id,
+                                  expected_res_status=409,
+                                  listeners=listeners)
+        ctx = context.get_admin_context()
+        self.assertEqual([], self.plugin.get_loadbalancers(ctx))
+        self.assertEqual([], self.plugin.get_listeners(ctx))
+        self.assertEqual([], self.plugin.get_pools(ctx))
+
+    def test_create_loadbalancer_graph_unsupported_provider(self):
+        subnet_id, listeners = self._make_loadbalancer_graph()
+        manager = type(self.plugin.drivers['lbaas'].load_balancer)
+        with mock.patch.object(manager, 'creates_graph',
+                               new_callable=mock.PropertyMock,
+                               return_value=False):
+            self._create_loadbalancer(self.fmt, subnet_id,
+                                      expected_res_status=400,
+                                      listeners=listeners)
+        ctx = context.get_admin_context()
+        self.assertEqual([], self.plugin.get_loadbalancers(ctx))
+
+    def test_create_loadbalancer_graph_invalid(self):
+        subnet_id, listeners = self._make_loadbalancer_graph()
+        listeners[0]['default_pool']['healthmonitor']['max_retries'] = 20
+        self._create_loadbalancer(self.fmt, subnet_id,
+                                  expected_res_status=400,
+                                  listeners=listeners)
+        del listeners[0]['default_pool']['healthmonitor']['max_retries']
+        self._create_loadbalancer(self.fmt, subnet_id,
+                                  expected_res_status=400,
+                                  listeners=listeners)
+
+    def test_create_loadbalancer_graph_protocol_mismatch(self):
+        subnet_id, listeners = self._make_loadbalancer_graph()
+        listeners[0]['protocol'] = lb_const.PROTOCOL_TCP
+        self._create_loadbalancer(self.fmt, subnet_id,
+                                  expected_res_status=409,
+                                  listeners=listeners)
+
+    def test_update_loadbalancer_tuning(self):
+        with self.subnet() as subnet:
+            with self.loadbalancer(subnet=subnet,
+                                   tuning={'maxconn': 5000}) as loadbalancer:
+                loadbalancer_id = loadbalancer['loadbalancer']['id']
+                self.assertEqual(
+                    5000, loadbalancer['loadbalancer']['tuning']['maxconn'])
+                data = {'loadbalancer': {'tuning': {'retries': 5}}}
+                resp, res = self._update_loadbalancer_api(loadbalancer_id,
+                                                          data)
+                tuning = res['loadbalancer']['tuning']
+                self.assertEqual(5, tuning['retries'])
+                self.assertIsNone(tuning['maxconn'])
+                data = {'loadbalancer': {'tuning': {}}}
+                resp, res = self._update_loadbalancer_api(loadbalancer_id,
+                                                          data)
+                self.assertIsNone(res['loadbalancer']['tuning'])
+
+    def test_create_loadbalancer_async_driver_operation(self):
+        self.plugin.dispatcher = mock.Mock()
+        with self.subnet() as subnet:
+            with self.loadbalancer(subnet=subnet) as loadbalancer:
+                lb_id = loadbalancer['loadbalancer']['id']
+                self.assertEqual(
+                    constants.PENDING_CREATE,
+                    loadbalancer['loadbalancer']['provisioning_status'])
+                args, kwargs = self.plugin.dispatcher.submit.call_args
+                self.assertEqual(
+                    ('lbaas', lb_id, self.plugin._run_driver_operation),
+                    args[:3])
+                # run the operation as a dispatcher worker would
+                args[2](*args[3:], **kwargs)
+                self._validate_statuses(lb_id)
+
+    def test_async_driver_operation_error(self):
+        ctx = context.get_admin_context()
+        manager = mock.Mock()
+        driver_method = mock.Mock(side_effect=Exception,
+                                  __self__=manager, __name__='create')
+        db_lb = mock.Mock()
+        self.plugin._run_driver_operation(ctx, driver_method, db_lb)
+        manager.failed_completion.assert_called_once_with(ctx, db_lb)
+
+    def _coalesced_operations(self, ctx, create, delete):
+        member = data_models.Member(id='member1')
+        old_member = data_models.Member(id='member2')
+        pool = data_models.Pool(
+            id='pool1', listener=data_models.Listener(
+                loadbalancer=data_models.LoadBalancer(id='lb1')))
+        return [(ctx, create, member, None),
+                (ctx, delete, old_member, None),
+                (ctx, create, member, None),
+                (ctx, create, pool, None)]
+
+    def test_get_coalescing_providers(self):
+        cfg.CONF.set_override('driver_operation_coalesce_providers',
+                              ['lbaas'])
+        self.assertEqual(frozenset(['lbaas']),
+                         self.plugin._get_coalescing_providers())
+
+    def test_get_coalescing_providers_no_rebuild(self):
+        # per entity drivers would lose the operations folded into others
+        cfg.CONF.set_override('driver_operation_coalesce_providers',
+                              ['lbaas'])
+        with mock.patch.object(
+                noop_driver.LoggingNoopLoadBalancerManager,
+                'rebuilds_loadbalancer', new_callable=mock.PropertyMock,
+                return_value=False):
+            self.assertRaises(SystemExit,
+                              self.plugin._get_coalescing_providers)
+
+    def test_coalesced_driver_operations(self):
+        ctx = context.get_admin_context()
+        manager = mock.Mock()
+        create = mock.Mock(__self__=manager, __name__='create')
+        delete = mock.Mock(__self__=manager, __name__='delete')
+        operations = self._coalesced_operations(ctx, create, delete)
+        with mock.patch.object(self.plugin.db, 'update_status') as update:
+            self.plugin._run_coalesced_driver_operations(operations)
+            # only the last operation reaches the driver
+            create.assert_called_once_with(ctx, operations[-1][2])
+            # the others wait for the driver to complete it
+            self.assertFalse(manager.db_delete_method.called)
+            self.assertFalse(update.called)
+            self.plugin.complete_coalesced_operations(
+                ctx, models.PoolV2, 'pool1')
+        manager.db_delete_method.assert_called_once_with(ctx, 'member2')
+        update.assert_called_once_with(
+            ctx, models.MemberV2, 'member1',
+            provisioning_status=constants.ACTIVE,
+            operating_status=lb_const.ONLINE)
+        self.assertEqual({}, self.plugin._coalesced_operations)
+
+    def test_coalesced_driver_operations_failed_completion(self):
+        ctx = context.get_admin_context()
+        manager = mock.Mock()
+        create = mock.Mock(__self__=manager, __name__='create')
+        delete = mock.Mock(__self__=manager, __name__='delete')
+        operations = self._coalesced_operations(ctx, create, delete)
+        self.plugin._run_coalesced_driver_operations(operations)
+        with mock.patch.object(self.plugin.db, 'update_status') as update:
+            self.plugin.complete_coalesced_operations(
+                ctx, data_models.Pool, 'pool1', succeeded=False)
+        self.assertFalse(manager.db_delete_method.called)
+        self.assertEqual(
+            [mock.call(ctx, models.MemberV2, 'member1',
+                       provisioning_status=constants.ERROR,
+                       operating_status=lb_const.OFFLINE),
+             mock.call(ctx, models.MemberV2, 'member2',
+                       provisioning_status=constants.ERROR,
+                       operating_status=lb_const.OFFLINE)],
+            update.call_args_list)
+
+    def test_coalesced_bulk_driver_operation(self):
+        ctx = context.get_admin_context()
+        manager = mock.Mock()
+        create = mock.Mock(__self__=manager, __name__='create')
+        create_many = mock.Mock(__self__=manager, __name__='create_many')
+        pool = data_models.Pool(
+            id='pool1', listener=data_models.Listener(
+                loadbalancer=data_models.LoadBalancer(id='lb1')))
+        members = [data_models.Member(id='member%d' % i, pool=pool)
+                   for i in range(3)]
+        self.plugin._run_coalesced_driver_operations(
+            [(ctx, create, members[0], None),
+             (ctx, create_many, members[1:], None)])
+        create_many.assert_called_once_with(ctx, members[1:])
+        # the bulk members complete in order, the others with the last
+        with mock.patch.object(self.plugin.db, 'update_status') as update:
+            self.plugin.complete_coalesced_operations(
+                ctx, models.MemberV2, 'member1')
+            self.assertFalse(update.called)
+            self.plugin.complete_coalesced_operations(
+                ctx, models.MemberV2, 'member2')
+        update.assert_called_once_with(
+            ctx, models.MemberV2, 'member0',
+            provisioning_status=constants.ACTIVE,
+            operating_status=lb_const.ONLINE)
+
+    def test_coalesced_driver_operations_error(self):
+        ctx = context.get_admin_context()
+        manager = mock.Mock()
+        create = mock.Mock(side_effect=Exception,
+                           __self__=manager, __name__='create')
+        member = data_models.Member(id='member1')
+        pool = data_models.Pool(
+            id='pool1', listener=data_models.Listener(
+                loadbalancer=data_models.LoadBalancer(id='lb1')))
+        self.plugin._run_coalesced_driver_operations(
+            [(ctx, create, member, None), (ctx, create, pool, None)])
+        self.assertEqual([mock.call(ctx, member), mock.call(ctx, pool)],
+                         manager.failed_completion.call_args_list)
+        self.assertEqual({}, self.plugin._coalesced_operations)
+
     def test_delete_loadbalancer(self):
         with self.subnet() as subnet:
             with self.loadbalancer(subnet=subnet,
@@ -1014,6 +1300,85 @@ class LbaasListenerTests(ListenerTestBase):
                          if k in expected)
                 )
 
+    def _tls_listener_data(self, sni_count):
+        return {'default_tls_container_ref': uuidutils.generate_uuid(),
+                'sni_container_refs': [uuidutils.generate_uuid()
+                                       for i in range(sni_count)],
+                'loadbalancer_id': self.lb_id}
+
+    def test_validate_tls_concurrently(self):
+        listener = self._tls_listener_data(3)
+        # the default container is also used for SNI
+        listener['sni_container_refs'].append(
+            listener['default_tls_container_ref'])
+        with contextlib.nested(
+            mock.patch('neutron_lbaas.services.loadbalancer.plugin.'
+                       'cert_parser.validate_cert'),
+            mock.patch('neutron_lbaas.services.loadbalancer.plugin.'
+                       'CERT_MANAGER_PLUGIN.CertManager.get_cert')
+        ) as (validate_cert_mock, get_cert_mock):
+            get_cert_mock.return_value = CertMock('mock_cert')
+            self.assertTrue(self.plugin._validate_tls(listener))
+            self.assertEqual(4, get_cert_mock.call_count)
+            self.assertEqual(
+                set(listener['sni_container_refs']),
+                set(call[0][0] for call in get_cert_mock.call_args_list))
+            self.assertEqual(4, validate_cert_mock.call_count)
+
+    def test_validate_tls_aggregates_errors(self):
+        listener = self._tls_listener_data(3)
+        missing = listener['sni_container_refs'][0]
+        invalid = listener['sni_container_refs'][2]
+
+        def get_cert(container_ref, resource_ref=None):
+            if container_ref == missing:
+                error = Exception()
+                error.status_code = 404
+                raise error
+            return mock.Mock(get_certificate=lambda: container_ref)
+
+        def validate_cert(certificate, **kwargs):
+            if certificate == invalid:
+                raise exceptions.MisMatchedKey()
+
+        with contextlib.nested(
+            mock.patch('neutron_lbaas.services.loadbalancer.plugin.'
+                       'cert_parser.validate_cert',
+                       side_effect=validate_cert),
+            mock.patch('neutron_lbaas.services.loadbalancer.plugin.'
+                       'CERT_MANAGER_PLUGIN.CertManager.get_cert',
+                       side_effect=get_cert),
+            mock.patch('neutron_lbaas.services.loadbalancer.plugin.'
+                       'CERT_MANAGER_PLUGIN.CertManager.delete_cert')
+        ) as (validate_cert_mock, get_cert_mock, delete_cert_mock):
+            e = self.assertRaises(loadbalancerv2.TLSContainerInvalid,
+                                  self.plugin._validate_tls, listener)
+            self.assertIn('%s, %s' % (missing, invalid), str(e))
+            self.assertEqual(4, get_cert_mock.call_count)
+            delete_cert_mock.assert_called_once_with(invalid, mock.ANY)
+
+    def test_validate_tls_timeout(self):
+        cfg.CONF.set_override('tls_container_validation_timeout', 1)
+        listener = self._tls_listener_data(1)
+        slow = listener['sni_container_refs'][0]
+
+        def get_cert(container_ref, resource_ref=None):
+            if container_ref == slow:
+                eventlet.sleep(10)
+            return CertMock('mock_cert')
+
+        with contextlib.nested(
+            mock.patch('neutron_lbaas.services.loadbalancer.plugin.'
+                       'cert_parser.validate_cert'),
+            mock.patch('neutron_lbaas.services.loadbalancer.plugin.'
+                       'CERT_MANAGER_PLUGIN.CertManager.get_cert',
+                       side_effect=get_cert)
+        ):
+            e = self.assertRaises(loadbalancerv2.CertManagerError,
+                                  self.plugin._validate_tls, listener)
+            self.assertIn(slow, str(e))
+            self.assertNotIn(listener['default_tls_container_ref'], str(e))
+
     def test_create_listener_loadbalancer_id_does_not_exist(self):
         self._create_listener(self.fmt, 'HTTP', 80,
                               loadbalancer_id=uuidutils.generate_uuid(),
@@ -1040,6 +1405,44 @@ class LbaasListenerTests(ListenerTestBase):
             self._validate_statuses(self.lb_id, listener_id,
                                     listener_disabled=True)
 
+    def test_create_listener_with_tuning(self):
+        tuning = {'timeout_client': 30000,
+                  'timeout_server': None,
+                  'http_keepalive': True,
+                  'http_reuse': 'safe',
+                  'tls_session_tickets': None,
+                  'tls_ciphers': None}
+        with self.listener(loadbalancer_id=self.lb_id,
+                           tuning=tuning) as listener:
+            self.assertEqual(tuning, listener['listener']['tuning'])
+
+    def test_create_listener_with_invalid_tuning(self):
+        self._create_listener(self.fmt, 'HTTP', 80,
+                              loadbalancer_id=self.lb_id,
+                              expected_res_status=400,
+                              tuning={'http_reuse': 'sometimes'})
+
+    def test_create_listener_with_invalid_tls_ciphers(self):
+        self._create_listener(self.fmt, 'HTTP', 80,
+                              loadbalancer_id=self.lb_id,
+                              expected_res_status=400,
+                              tuning={'tls_ciphers': 'HIGH !aNULL'})
+
+    def test_update_listener_tuning(self):
+        with self.listener(loadbalancer_id=self.lb_id) as listener:
+            listener_id = listener['listener']['id']
+            self.assertIsNone(listener['listener']['tuning'])
+            data = {'listener': {'tuning': {'timeout_server': 90000,
+                                            'http_reuse': 'always'}}}
+            resp, body = self._update_listener_api(listener_id, data)
+            self.assertEqual({'timeout_client': None,
+                              'timeout_server': 90000,
+                              'http_keepalive': None,
+                              'http_reuse': 'always',
+                              'tls_session_tickets': None,
+                              'tls_ciphers': None},
+                             body['listener']['tuning'])
+
     def test_update_listener_with_tls(self):
         default_tls_container_ref = uuidutils.generate_uuid()
         sni_tls_container_ref_1 = uuidutils.generate_uuid()
@@ -1677,6 +2080,181 @@ class LbaasMemberTests(MemberTestBase):
                 self.pool_id,
                 {'member': member_data})
 
+    def _bulk_member_data(self, count):
+        return {'members': [{'address': '10.0.0.%d' % (i + 1),
+                             'protocol_port': 80,
+                             'subnet_id': self.test_subnet_id,
+                             'tenant_id': self._tenant_id}
+                            for i in range(count)]}
+
+    def test_create_member_bulk(self):
+        driver = self.plugin.drivers['lbaas']
+        with mock.patch.object(driver.member, 'create_many',
+                               wraps=driver.member.create_many) as create:
+            resp, body = self._create_member_api(self.pool_id,
+                                                 self._bulk_member_data(3))
+        self.assertEqual(webob.exc.HTTPCreated.code, resp.status_int)
+        self.assertEqual(1, create.call_count)
+        self.assertEqual(3, len(create.call_args[0][1]))
+        members = body['members']
+        self.assertEqual(['10.0.0.1', '10.0.0.2', '10.0.0.3'],
+                         [member['address'] for member in members])
+        for member in members:
+            self.assertTrue(member['id'])
+            self._validate_statuses(self.lb_id, self.listener_id,
+                                    self.pool_id, member['id'])
+        resp, body = self._list_members_api(self.pool_id)
+        self.assertEqual(3, len(body['members']))
+
+    def test_create_member_bulk_driver_error(self):
+        driver = self.plugin.drivers['lbaas']
+        create = driver.member.create
+
+        def create_member(context, member):
+            if member.address == '10.0.0.2':
+                raise Exception()
+            create(context, member)
+
+        with mock.patch.object(driver.member, 'create',
+                               side_effect=create_member):
+            resp, body = self._create_member_api(self.pool_id,
+                                                 self._bulk_member_data(3))
+        self.assertEqual(webob.exc.HTTPCreated.code, resp.status_int)
+        # the failure of a member does not stop the others
+        members = dict((member['address'], member)
+                       for member in body['members'])
+        self.assertEqual(constants.ERROR,
+                         members['10.0.0.2']['provisioning_status'])
+        for address in ('10.0.0.1', '10.0.0.3'):
+            self._validate_statuses(self.lb_id, self.listener_id,
+                                    self.pool_id, members[address]['id'])
+
+    def test_create_member_bulk_not_dispatched(self):
+        # bulk operations follow async_driver_operations like the others
+        self.plugin.dispatcher = mock.Mock()
+        resp, body = self._create_member_api(self.pool_id,
+                                             self._bulk_member_data(2))
+        self.assertEqual(webob.exc.HTTPCreated.code, resp.status_int)
+        self.assertFalse(self.plugin.dispatcher.submit.called)
+        self.assertFalse(self.plugin.dispatcher.coalesce.called)
+        for member in body['members']:
+            self._validate_statuses(self.lb_id, self.listener_id,
+                                    self.pool_id, member['id'])
+
+    def test_create_member_bulk_duplicate(self):
+        data = self._bulk_member_data(3)
+        data['members'][2]['address'] = '10.0.0.1'
+        resp, body = self._create_member_api(self.pool_id, data)
+        self.assertEqual(webob.exc.HTTPConflict.code, resp.status_int)
+        resp, body = self._list_members_api(self.pool_id)
+        self.assertEqual([], body['members'])
+        self._validate_statuses(self.lb_id, self.listener_id, self.pool_id)
+
+    def test_replace_members(self):
+        self._create_member_api(self.pool_id, self._bulk_member_data(3))
+        resp, body = self._list_members_api(self.pool_id)
+        old_ids = dict((member['address'], member['id'])
+                       for member in body['members'])
+        members = self._bulk_member_data(4)['members'][1:]
+        members[0]['weight'] = 5
+        driver = self.plugin.drivers['lbaas']
+        with contextlib.nested(
+            mock.patch.object(driver.pool, 'update',
+                              wraps=driver.pool.update),
+            mock.patch.object(driver.member, 'create'),
+            mock.patch.object(driver.member, 'delete')
+        ) as (pool_update, member_create, member_delete):
+            resp, body = self._update_pool_api(
+                self.pool_id, {'pool': {'members': members}})
+        self.assertEqual(webob.exc.HTTPOk.code, resp.status_int)
+        self.assertEqual(1, pool_update.call_count)
+        self.assertFalse(member_create.called)
+        self.assertFalse(member_delete.called)
+        self.assertEqual(3, len(body['pool']['members']))
+
+        resp, body = self._list_members_api(self.pool_id)
+        members = dict((member['address'], member)
+                       for member in body['members'])
+        self.assertEqual(set(['10.0.0.2', '10.0.0.3', '10.0.0.4']),
+                         set(members))
+        # matching members are kept
+        self.assertEqual(old_ids['10.0.0.2'], members['10.0.0.2']['id'])
+        self.assertEqual(5, members['10.0.0.2']['weight'])
+        self.assertEqual(old_ids['10.0.0.3'], members['10.0.0.3']['id'])
+        for member in members.values():
+            self._validate_statuses(self.lb_id, self.listener_id,
+                                    self.pool_id, member['id'])
+
+    def test_replace_members_empty(self):
+        self._create_member_api(self.pool_id, self._bulk_member_data(2))
+        resp, body = self._update_pool_api(self.pool_id,
+                                           {'pool': {'members': []}})
+        self.assertEqual(webob.exc.HTTPOk.code, resp.status_int)
+        resp, body = self._list_members_api(self.pool_id)
+        self.assertEqual([], body['members'])
+
+    def test_replace_members_pending_delete(self):
+        self._create_member_api(self.pool_id, self._bulk_member_data(2))
+        members = self._bulk_member_data(1)['members']
+        driver = self.plugin.drivers['lbaas']
+        with mock.patch.object(driver.pool, 'update'):
+            resp, body = self._update_pool_api(
+                self.pool_id, {'pool': {'members': members}})
+        self.assertEqual(webob.exc.HTTPOk.code, resp.status_int)
+        # the left out member stays until the driver removed it
+        resp, body = self._list_members_api(self.pool_id)
+        members = dict((member['address'], member)
+                       for member in body['members'])
+        self.assertEqual(constants.PENDING_DELETE,
+                         members['10.0.0.2']['provisioning_status'])
+
+        ctx = context.get_admin_context()
+        self.plugin.db.update_pool_members_status(
+            ctx, self.pool_id, constants.ACTIVE, lb_const.ONLINE)
+        resp, body = self._list_members_api(self.pool_id)
+        self.assertEqual(['10.0.0.1'],
+                         [member['address'] for member in body['members']])
+
+    def test_replace_members_pending_delete_failed(self):
+        self._create_member_api(self.pool_id, self._bulk_member_data(2))
+        members = self._bulk_member_data(1)['members']
+        driver = self.plugin.drivers['lbaas']
+        with mock.patch.object(driver.pool, 'update'):
+            self._update_pool_api(self.pool_id,
+                                  {'pool': {'members': members}})
+        ctx = context.get_admin_context()
+        self.plugin.db.update_pool_members_status(
+            ctx, self.pool_id, constants.ERROR, lb_const.OFFLINE)
+        resp, body = self._list_members_api(self.pool_id)
+        members = dict((member['address'], member)
+                       for member in body['members'])
+        self.assertEqual(constants.ERROR,
+                         members['10.0.0.2']['provisioning_status'])
+
+    def test_replace_members_unsupported_provider(self):
+        self._create_member_api(self.pool_id, self._bulk_member_data(2))
+        manager = type(self.plugin.drivers['lbaas'].pool)
+        with mock.patch.object(manager, 'replaces_members',
+                               new_callable=mock.PropertyMock,
+                               return_value=False):
+            resp, body = self._update_pool_api(
+                self.pool_id, {'pool': {'members': []}})
+        self.assertEqual(webob.exc.HTTPBadRequest.code, resp.status_int)
+        resp, body = self._list_members_api(self.pool_id)
+        self.assertEqual(2, len(body['members']))
+        self._validate_statuses(self.lb_id, self.listener_id, self.pool_id)
+
+    def test_replace_members_duplicate(self):
+        self._create_member_api(self.pool_id, self._bulk_member_data(2))
+        members = self._bulk_member_data(2)['members']
+        members[1]['address'] = members[0]['address']
+        resp, body = self._update_pool_api(self.pool_id,
+                                           {'pool': {'members': members}})
+        self.assertEqual(webob.exc.HTTPConflict.code, resp.status_int)
+        resp, body = self._list_members_api(self.pool_id)
+        self.assertEqual(2, len(body['members']))
+        self._validate_statuses(self.lb_id, self.listener_id, self.pool_id)
+
     def test_update_member(self):
         keys = [('address', "127.0.0.1"),
                 ('tenant_id', self._tenant_id),
@@ -57,10 +57,15 @@ class TestLoadBalancerCallbacks(
                     'list_loadbalancers_on_lbaas_agent') as mock_agent_lbs:
                 mock_agent_lbs.return_value = [
                     data_models.LoadBalancer(id=lb_id)]
-                ready = self.callbacks.get_ready_devices(
-                    context.get_admin_context(),
-                )
+                with mock.patch.object(
+                        self.plugin_instance.db,
+                        'invalidate_lbaas_agent_index') as invalidate:
+                    ready = self.callbacks.get_ready_devices(
+                        context.get_admin_context(),
+                    )
                 self.assertEqual([lb_id], ready)
+                # the agent (re)started, its configuration is reloaded
+                invalidate.assert_called_once_with()
 
     def test_get_ready_devices_multiple_listeners_and_loadbalancers(self):
         ctx = context.get_admin_context()
@@ -220,6 +225,36 @@ class TestLoadBalancerCallbacks(
             host='host'
         )
 
+    def test_unplug_vip_port_plugged_on_other_host(self):
+        port = {portbindings.HOST_ID: 'otherhost'}
+        core_plugin = self.plugin.db._core_plugin
+        with mock.patch.object(core_plugin, 'get_port', return_value=port):
+            with mock.patch.object(core_plugin,
+                                   'update_port') as mock_update_port:
+                self.callbacks.unplug_vip_port(context.get_admin_context(),
+                                               port_id='port_id', host='host')
+                self.assertFalse(mock_update_port.called)
+
+    def test_plug_vip_port_unplugged_by_old_host(self):
+        # the agent a load balancer moved off unplugged the port before
+        # the new agent plugged it
+        core = self.plugin_instance.db._core_plugin
+        with self.loadbalancer() as loadbalancer:
+            lb_id = loadbalancer['loadbalancer']['id']
+            ctx = context.get_admin_context()
+            self.plugin_instance.db.update_loadbalancer_provisioning_status(
+                ctx, lb_id)
+            db_lb = self.plugin_instance.db.get_loadbalancer(ctx, lb_id)
+            self.callbacks.unplug_vip_port(ctx, port_id=db_lb.vip_port_id,
+                                           host='oldhost')
+            self.callbacks.plug_vip_port(ctx, port_id=db_lb.vip_port_id,
+                                         host='newhost')
+            db_port = core.get_port(ctx, db_lb.vip_port_id)
+            self.assertEqual('neutron:' + constants.LOADBALANCERV2,
+                             db_port['device_owner'])
+            self.assertEqual(lb_id, db_port['device_id'])
+            self.assertTrue(db_port['admin_state_up'])
+
     def test_loadbalancer_deployed(self):
         with self.loadbalancer() as loadbalancer:
             ctx = context.get_admin_context()
@@ -277,6 +312,42 @@ class TestLoadBalancerCallbacks(
             self.assertEqual(constants.ACTIVE, l.provisioning_status)
             self.assertEqual(lb_const.ONLINE, l.operating_status)
 
+    def test_update_status_loadbalancer_graph(self):
+        with self.loadbalancer() as loadbalancer:
+            loadbalancer_id = loadbalancer['loadbalancer']['id']
+            ctx = context.get_admin_context()
+            with mock.patch.object(self.plugin_instance.db,
+                                   'update_loadbalancer_graph_status') as gs:
+                self.callbacks.update_status(
+                    ctx, 'loadbalancer', loadbalancer_id,
+                    provisioning_status=constants.ACTIVE,
+                    operating_status=lb_const.ONLINE)
+                gs.assert_called_once_with(ctx, loadbalancer_id,
+                                           constants.ACTIVE, lb_const.ONLINE)
+                # only the creation of the load balancer deploys them
+                self.callbacks.update_status(
+                    ctx, 'loadbalancer', loadbalancer_id,
+                    provisioning_status=constants.ACTIVE,
+                    operating_status=lb_const.ONLINE)
+                self.assertEqual(1, gs.call_count)
+
+    def test_update_status_completes_coalesced_operations(self):
+        with self.loadbalancer() as loadbalancer:
+            loadbalancer_id = loadbalancer['loadbalancer']['id']
+            ctx = context.get_admin_context()
+            with mock.patch.object(self.plugin_instance,
+                                   'complete_coalesced_operations') as comp:
+                self.callbacks.update_status(
+                    ctx, 'loadbalancer', loadbalancer_id,
+                    operating_status=lb_const.ONLINE)
+                self.assertFalse(comp.called)
+                self.callbacks.update_status(
+                    ctx, 'loadbalancer', loadbalancer_id,
+                    provisioning_status=constants.ERROR)
+            comp.assert_called_once_with(
+                ctx, db_models.LoadBalancer, loadbalancer_id,
+                succeeded=False)
+
     def test_update_status_loadbalancer_deleted_already(self):
         with mock.patch.object(agent_callbacks, 'LOG') as mock_log:
             loadbalancer_id = 'deleted_lb'
@@ -107,6 +107,20 @@ class TestLoadBalancerAgentApi(base.BaseTestCase):
     def test_create_member(self):
         self._call_test_helper('create_member', {'member': 'test'})
 
+    def test_create_members(self):
+        with contextlib.nested(
+            mock.patch.object(self.api.client, 'cast'),
+            mock.patch.object(self.api.client, 'prepare'),
+        ) as (
+            rpc_mock, prepare_mock
+        ):
+            prepare_mock.return_value = self.api.client
+            self.api.create_members(mock.sentinel.context, ['test'],
+                                    host='host')
+        prepare_mock.assert_called_once_with(server='host', version='1.1')
+        rpc_mock.assert_called_once_with(mock.sentinel.context,
+                                         'create_members', members=['test'])
+
     def test_update_member(self):
         self._call_test_helper('update_member', {'old_member': 'test',
                                                  'member': 'test'})
@@ -393,6 +407,42 @@ class TestLoadBalancerPluginNotificationWrapper(TestLoadBalancerPluginBase):
                             self.assertEqual(constants.PENDING_UPDATE,
                                              lb.provisioning_status)
 
+    def test_create_members(self):
+        with self.loadbalancer(no_delete=True) as loadbalancer:
+            lb_id = loadbalancer['loadbalancer']['id']
+            self._update_status(models.LoadBalancer, constants.ACTIVE, lb_id)
+            with self.listener(loadbalancer_id=lb_id,
+                               no_delete=True) as listener:
+                listener_id = listener['listener']['id']
+                self._update_status(models.LoadBalancer, constants.ACTIVE,
+                                    lb_id)
+                with self.pool(listener_id=listener_id,
+                               no_delete=True) as pool:
+                    pool_id = pool['pool']['id']
+                    self._update_status(models.LoadBalancer, constants.ACTIVE,
+                                        lb_id)
+                    with self.subnet(cidr='11.0.0.0/24') as subnet:
+                        members = {'members': [
+                            {'member': {'address': '11.0.0.%d' % i,
+                                        'protocol_port': 80,
+                                        'weight': 1,
+                                        'admin_state_up': True,
+                                        'subnet_id': subnet['subnet']['id'],
+                                        'tenant_id': self._tenant_id}}
+                            for i in (2, 3)]}
+                        ctx = context.get_admin_context()
+                        self.plugin_instance.create_pool_member_bulk(
+                            ctx, pool_id, members)
+                        # a single cast for all of them
+                        self.assertFalse(self.mock_api.create_member.called)
+                        calls = self.mock_api.create_members.call_args_list
+                        self.assertEqual(1, len(calls))
+                        _, called_members, called_host = calls[0][0]
+                        self.assertEqual(['11.0.0.2', '11.0.0.3'],
+                                         [member.address
+                                          for member in called_members])
+                        self.assertEqual('host', called_host)
+
     def test_update_member(self):
         with self.loadbalancer(no_delete=True) as loadbalancer:
             lb_id = loadbalancer['loadbalancer']['id']
@@ -0,0 +1,124 @@
+# Copyright 2015 OpenStack Foundation.  All rights reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import mock
+from neutron.plugins.common import constants
+from oslo_utils import timeutils
+
+from neutron_lbaas.drivers.common import agent_failover
+from neutron_lbaas.tests import base
+
+
+class FakeAgent(dict):
+
+    def __init__(self, agent_id, host, down=False):
+        heartbeat = timeutils.utcnow()
+        if down:
+            heartbeat -= datetime.timedelta(seconds=60)
+        super(FakeAgent, self).__init__(id=agent_id, host=host,
+                                        heartbeat_timestamp=heartbeat,
+                                        admin_state_up=True)
+        self.down = down
+
+
+class TestAgentFailoverWatchdog(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestAgentFailoverWatchdog, self).setUp()
+        self.driver = mock.Mock(device_driver='dummy')
+        self.db = self.driver.plugin.db
+        self.agents = {'a1': FakeAgent('a1', 'host1', down=True),
+                       'a2': FakeAgent('a2', 'host2'),
+                       'a3': FakeAgent('a3', 'host3')}
+        self.db.get_lbaas_agents.return_value = list(self.agents.values())
+        self.db.is_agent_down.side_effect = lambda heartbeat: any(
+            agent.down for agent in self.agents.values()
+            if agent['heartbeat_timestamp'] is heartbeat)
+        self.bindings = dict(('lb%d' % i, 'a1') for i in range(20))
+        self.bindings['lb20'] = 'a2'
+        self.db.get_loadbalancer_loads_on_lbaas_agents.side_effect = (
+            self._get_loadbalancer_loads)
+        self.db.unbind_loadbalancer.side_effect = self._unbind
+        self.db.get_loadbalancer.side_effect = (
+            lambda context, lb_id: mock.Mock(id=lb_id))
+        self.driver.loadbalancer_scheduler.schedule.side_effect = (
+            self._schedule)
+        mock.patch.object(agent_failover, 'ncontext').start()
+        self.watchdog = agent_failover.AgentFailoverWatchdog(self.driver)
+        self.create = self.driver.agent_rpc.create_loadbalancer
+        self.delete = self.driver.agent_rpc.delete_loadbalancer
+
+    def _get_loadbalancer_loads(self, context, agent_ids, load):
+        return [(lb_id, agent_id, constants.ACTIVE, 1)
+                for lb_id, agent_id in sorted(self.bindings.items())
+                if agent_id in agent_ids]
+
+    def _unbind(self, context, lb_id, agent_id):
+        if self.bindings.get(lb_id) != agent_id:
+            return False
+        del self.bindings[lb_id]
+        return True
+
+    def _schedule(self, plugin, context, loadbalancer, device_driver):
+        healthy = sorted(agent_id for agent_id, agent in self.agents.items()
+                         if not agent.down)
+        # spread the load balancers like a least loaded scheduler
+        agent_id = min(healthy, key=lambda agent_id: sum(
+            1 for bound in self.bindings.values() if bound == agent_id))
+        self.bindings[loadbalancer.id] = agent_id
+        return self.agents[agent_id]
+
+    def test_reschedule_dead_agent(self):
+        self.watchdog.check_agents()
+        self.assertEqual(20, self.create.call_count)
+        self.assertEqual(20, self.delete.call_count)
+        for call in self.delete.call_args_list:
+            self.assertEqual('host1', call[0][2])
+        hosts = [call[0][2] for call in self.create.call_args_list]
+        self.assertEqual(set(['host2', 'host3']), set(hosts))
+        self.assertNotIn('a1', self.bindings.values())
+        metrics = self.watchdog.get_metrics()
+        self.assertEqual(1, metrics['failovers'])
+        self.assertEqual(20, metrics['rescheduled'])
+        self.assertEqual(0, metrics['failed'])
+        self.assertTrue(metrics['last_recovery_time'] >= 60)
+        # the scheduler reloads the agents it caches
+        self.db.invalidate_lbaas_agent_index.assert_called_once_with()
+
+        # nothing is left to reschedule
+        self.watchdog.check_agents()
+        self.assertEqual(20, self.create.call_count)
+        self.assertEqual(1, self.watchdog.get_metrics()['failovers'])
+
+    def test_no_dead_agent(self):
+        self.agents['a1'].down = False
+        self.watchdog.check_agents()
+        self.assertFalse(self.db.unbind_loadbalancer.called)
+
+    def test_all_agents_dead(self):
+        for agent in self.agents.values():
+            agent.down = True
+        self.watchdog.check_agents()
+        self.assertFalse(self.db.unbind_loadbalancer.called)
+
+    def test_no_eligible_agent(self):
+        self.driver.loadbalancer_scheduler.schedule.side_effect = None
+        self.driver.loadbalancer_scheduler.schedule.return_value = None
+        self.watchdog.check_agents()
+        self.assertFalse(self.create.called)
+        metrics = self.watchdog.get_metrics()
+        self.assertEqual(0, metrics['failovers'])
+        self.assertEqual(20, metrics['failed'])
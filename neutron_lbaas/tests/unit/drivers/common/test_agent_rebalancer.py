@@ -0,0 +1,147 @@
+# Copyright 2015 OpenStack Foundation.  All rights reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from neutron.extensions import portbindings
+from neutron.plugins.common import constants
+from oslo_config import cfg
+
+from neutron_lbaas.db.loadbalancer import models
+from neutron_lbaas.drivers.common import agent_rebalancer
+from neutron_lbaas.extensions import loadbalancerv2
+from neutron_lbaas.tests import base
+
+
+class TestPlanMoves(base.BaseTestCase):
+
+    def test_balanced(self):
+        self.assertEqual([], agent_rebalancer.plan_moves(
+            {'a1': 2, 'a2': 2},
+            {'a1': [('lb1', 1), ('lb2', 1)], 'a2': [('lb3', 1), ('lb4', 1)]},
+            {'a1': 1, 'a2': 1}, 5, 0.2))
+
+    def test_relieve_overloaded_agent(self):
+        lbs = [('lb%d' % i, 1) for i in range(10)]
+        moves = agent_rebalancer.plan_moves(
+            {'a1': 10, 'a2': 0, 'a3': 2}, {'a1': lbs},
+            {'a1': 1, 'a2': 1, 'a3': 1}, 10, 0.2)
+        targets = [target for _lb, _source, target in moves]
+        self.assertEqual(6, len(moves))
+        self.assertEqual(4, targets.count('a2'))
+        self.assertEqual(2, targets.count('a3'))
+        self.assertEqual(set(['a1']),
+                         set(source for _lb, source, _t in moves))
+
+    def test_max_moves(self):
+        lbs = [('lb%d' % i, 1) for i in range(10)]
+        moves = agent_rebalancer.plan_moves(
+            {'a1': 10, 'a2': 0}, {'a1': lbs}, {'a1': 1, 'a2': 1}, 2, 0.2)
+        self.assertEqual(2, len(moves))
+
+    def test_largest_fitting_loadbalancer(self):
+        moves = agent_rebalancer.plan_moves(
+            {'a1': 1000, 'a2': 0},
+            {'a1': [('lb1', 900), ('lb2', 60), ('lb3', 40)]},
+            {'a1': 1, 'a2': 1}, 5, 0.2)
+        # moving lb1 would only overload a2
+        self.assertEqual([('lb2', 'a1', 'a2'), ('lb3', 'a1', 'a2')], moves)
+
+    def test_capacity(self):
+        lbs = [('lb%d' % i, 1) for i in range(8)]
+        moves = agent_rebalancer.plan_moves(
+            {'a1': 8, 'a2': 0}, {'a1': lbs}, {'a1': 1, 'a2': 3}, 10, 0.2)
+        self.assertEqual(6, len(moves))
+
+    def test_drain(self):
+        moves = agent_rebalancer.plan_moves(
+            {'a1': 2, 'a2': 5, 'a3': 5},
+            {'a1': [('lb1', 1), ('lb2', 1)], 'a2': [('lb3', 5)]},
+            {'a2': 1, 'a3': 1}, 5, 0.2)
+        self.assertEqual([('lb1', 'a1', 'a2'), ('lb2', 'a1', 'a3')], moves)
+
+
+class TestAgentRebalancer(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestAgentRebalancer, self).setUp()
+        self.driver = mock.Mock(device_driver='dummy')
+        self.db = self.driver.plugin.db
+        self.agents = [
+            {'id': 'a1', 'host': 'host1', 'admin_state_up': True,
+             'heartbeat_timestamp': None},
+            {'id': 'a2', 'host': 'host2', 'admin_state_up': True,
+             'heartbeat_timestamp': None}]
+        self.db.get_lbaas_agents.return_value = self.agents
+        self.db.is_agent_down.return_value = False
+        self.db.get_lbaas_agent_capacities.return_value = {}
+        self.db.get_loadbalancer_loads_on_lbaas_agents.return_value = [
+            ('lb1', 'a1', constants.ACTIVE, 1),
+            ('lb2', 'a1', constants.PENDING_UPDATE, 1),
+            ('lb3', 'a1', constants.ACTIVE, 1)]
+        self.db.rebind_loadbalancer.return_value = True
+        self.rebalancer = agent_rebalancer.AgentRebalancer(self.driver)
+
+    def test_rebalance(self):
+        self.rebalancer.rebalance()
+        self.db.test_and_set_status.assert_called_once_with(
+            mock.ANY, models.LoadBalancer, 'lb1', constants.PENDING_UPDATE)
+        self.db.rebind_loadbalancer.assert_called_once_with(
+            mock.ANY, 'lb1', 'a1', 'a2')
+        loadbalancer = self.db.get_loadbalancer.return_value
+        self.driver.agent_rpc.delete_loadbalancer.assert_called_once_with(
+            mock.ANY, loadbalancer, 'host1')
+        self.driver.agent_rpc.create_loadbalancer.assert_called_once_with(
+            mock.ANY, loadbalancer, 'host2', 'dummy')
+        self.db._core_plugin.update_port.assert_called_once_with(
+            mock.ANY, loadbalancer.vip_port_id,
+            {'port': {portbindings.HOST_ID: 'host2'}})
+
+    def test_rebalance_binds_vip_port_first(self):
+        update_port = self.db._core_plugin.update_port
+
+        def cast(*args):
+            # the old agent may handle its cast first, it must find the
+            # vip port bound to the new host
+            self.assertTrue(update_port.called)
+
+        self.driver.agent_rpc.delete_loadbalancer.side_effect = cast
+        self.driver.agent_rpc.create_loadbalancer.side_effect = cast
+        self.rebalancer.rebalance()
+        self.assertTrue(self.driver.agent_rpc.delete_loadbalancer.called)
+
+    def test_rebalance_dry_run(self):
+        cfg.CONF.set_override('loadbalancer_rebalance_dry_run', True)
+        self.rebalancer.rebalance()
+        self.assertFalse(self.db.test_and_set_status.called)
+        self.assertFalse(self.driver.agent_rpc.create_loadbalancer.called)
+
+    def test_rebalance_loadbalancer_changed(self):
+        self.db.test_and_set_status.side_effect = (
+            loadbalancerv2.StateInvalid(id='lb1', state='PENDING_UPDATE'))
+        self.rebalancer.rebalance()
+        self.assertFalse(self.db.rebind_loadbalancer.called)
+        self.assertFalse(self.driver.agent_rpc.create_loadbalancer.called)
+
+    def test_rebalance_loadbalancer_rebound(self):
+        self.db.rebind_loadbalancer.return_value = False
+        self.rebalancer.rebalance()
+        self.db.update_status.assert_called_once_with(
+            mock.ANY, models.LoadBalancer, 'lb1',
+            provisioning_status=constants.ACTIVE)
+        self.assertFalse(self.driver.agent_rpc.create_loadbalancer.called)
+
+    def test_rebalance_skips_dead_agents(self):
+        self.db.is_agent_down.side_effect = lambda heartbeat: True
+        self.rebalancer.rebalance()
+        self.assertFalse(self.db.get_loadbalancer_loads_on_lbaas_agents.called)
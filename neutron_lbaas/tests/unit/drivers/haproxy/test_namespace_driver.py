@@ -36,6 +36,7 @@ class TestHaproxyNSDriver(base.BaseTestCase):
         conf.interface_driver = 'intdriver'
         conf.haproxy.user_group = 'test_group'
         conf.haproxy.send_gratuitous_arp = 3
+        conf.haproxy.seamless_reload = False
         self.conf = conf
         self.rpc_mock = mock.Mock()
         with mock.patch(
@@ -204,6 +205,60 @@ class TestHaproxyNSDriver(base.BaseTestCase):
             self.assertEqual({}, self.driver.get_stats(self.lb.id))
             self.assertFalse(mocket.called)
 
+    def test_get_stats_multiple_processes(self):
+        raw_stats = ('# pxname,svname,scur,smax,stot,bin,bout,econ,eresp,'
+                     'status,chkfail,type,check_status,\n'
+                     'pool_id,BACKEND,1,2,10,100,200,0,1,UP,,1,,\n'
+                     'pool_id,member_id_1,1,1,5,50,100,,0,UP,0,2,L7OK,\n'
+                     'pool_id,member_id_2,0,1,5,50,100,,0,DOWN,3,2,L4CON,\n')
+        raw_stats_2 = ('# pxname,svname,scur,smax,stot,bin,bout,econ,eresp,'
+                       'status,chkfail,type,check_status,\n'
+                       'pool_id,BACKEND,2,3,20,300,400,1,0,UP,,1,,\n'
+                       'pool_id,member_id_1,1,2,10,150,200,,0,UP,1,2,L7OK,\n'
+                       'pool_id,member_id_2,1,1,10,150,200,,0,UP,0,2,L7OK,'
+                       '\n')
+        self.driver._get_state_file_path = mock.Mock(
+            return_value='/path/haproxy_stats.sock')
+        with contextlib.nested(
+                mock.patch.object(namespace_driver.jinja_cfg, 'get_nbproc',
+                                  return_value=2),
+                mock.patch.object(self.driver, '_get_stats_from_socket'),
+                mock.patch('os.path.exists', return_value=True)
+        ) as (nbproc, get_stats, path_exists):
+            get_stats.side_effect = [
+                self.driver._parse_stats(raw_stats),
+                self.driver._parse_stats(raw_stats_2)]
+            stats = self.driver.get_stats(self.lb.id)
+            nbproc.assert_called_once_with(self.lb.id)
+            self.assertEqual(
+                [mock.call('/path/haproxy_stats.sock', entity_type=6),
+                 mock.call('/path/haproxy_stats.sock.2', entity_type=6)],
+                get_stats.call_args_list)
+            exp_stats = {'connection_errors': '1',
+                         'active_connections': '3',
+                         'current_sessions': '3',
+                         'bytes_in': '400',
+                         'max_connections': '5',
+                         'max_sessions': '5',
+                         'bytes_out': '600',
+                         'response_errors': '1',
+                         'total_sessions': '30',
+                         'total_connections': '30',
+                         'members': {
+                             'member_id_1': {
+                                 'status': 'ACTIVE',
+                                 'health': 'L7OK',
+                                 'failed_checks': '1'
+                             },
+                             'member_id_2': {
+                                 'status': 'ACTIVE',
+                                 'health': 'L7OK',
+                                 'failed_checks': '3'
+                             }
+                         }
+                         }
+            self.assertEqual(exp_stats, stats)
+
     def test_deploy_instance(self):
         self.driver.deployable = mock.Mock(return_value=False)
         self.driver.exists = mock.Mock(return_value=True)
@@ -250,6 +305,204 @@ class TestHaproxyNSDriver(base.BaseTestCase):
             self.driver._spawn.assert_called_once_with(self.lb,
                                                        ['-sf', '123'])
 
+    def test_update_seamless_reload(self):
+        self.conf.haproxy.seamless_reload = True
+        self.driver._get_reload_generation = mock.Mock(return_value=2)
+        self.driver._reload = mock.Mock()
+        self.driver._spawn = mock.Mock()
+        self.driver.update(self.lb)
+        self.driver._reload.assert_called_once_with(self.lb)
+        self.assertFalse(self.driver._spawn.called)
+
+    def test_update_seamless_reload_not_master_worker(self):
+        self.conf.haproxy.seamless_reload = True
+        self.driver._get_reload_generation = mock.Mock(return_value=None)
+        self.driver._get_state_file_path = mock.Mock(return_value='/path')
+        self.driver._reload = mock.Mock()
+        self.driver._spawn = mock.Mock()
+        with mock.patch('__builtin__.open') as m_open:
+            file_mock = mock.MagicMock()
+            m_open.return_value = file_mock
+            file_mock.__iter__.return_value = iter(['123'])
+            self.driver.update(self.lb)
+            self.driver._spawn.assert_called_once_with(self.lb,
+                                                       ['-sf', '123'])
+        self.assertFalse(self.driver._reload.called)
+
+    @mock.patch('neutron.agent.linux.utils.execute')
+    @mock.patch('neutron_lbaas.services.loadbalancer.drivers.haproxy.'
+                'jinja_cfg.save_config')
+    @mock.patch('neutron.agent.linux.ip_lib.IPWrapper')
+    def test_reload(self, ip_wrap, jinja_save, execute):
+        mock_ns = ip_wrap.return_value
+        self.driver._get_state_file_path = mock.Mock(
+            side_effect=lambda lb_id, kind, ensure_dir=True: '/path/' + kind)
+        self.driver._get_reload_generation = mock.Mock(return_value=2)
+        self.driver._set_reload_generation = mock.Mock()
+        with mock.patch('__builtin__.open') as m_open:
+            file_mock = mock.MagicMock()
+            m_open.return_value = file_mock
+            file_mock.__enter__.return_value = file_mock
+            file_mock.readline.return_value = '123\n'
+            self.driver._reload(self.lb)
+        jinja_save.assert_called_once_with(
+            '/path/haproxy.conf', self.lb, '/path/haproxy_stats.sock',
+            'test_group', '/path/')
+        ip_wrap.assert_called_once_with(
+            namespace=namespace_driver.get_ns_name(self.lb.id))
+        mock_ns.netns.execute.assert_called_once_with(
+            ['haproxy', '-c', '-f', '/path/haproxy.conf'])
+        execute.assert_called_once_with(['kill', '-USR2', '123'],
+                                        run_as_root=True)
+        self.driver._set_reload_generation.assert_called_once_with(
+            self.lb.id, 3)
+        self.assertEqual(self.lb,
+                         self.driver.deployed_loadbalancers[self.lb.id])
+
+    @mock.patch('neutron.agent.linux.utils.execute')
+    @mock.patch('neutron_lbaas.services.loadbalancer.drivers.haproxy.'
+                'jinja_cfg.save_config')
+    @mock.patch('neutron.agent.linux.ip_lib.IPWrapper')
+    def test_reload_invalid_config(self, ip_wrap, jinja_save, execute):
+        mock_ns = ip_wrap.return_value
+        mock_ns.netns.execute.side_effect = RuntimeError
+        self.driver._get_state_file_path = mock.Mock(return_value='/path')
+        self.driver._set_reload_generation = mock.Mock()
+        self.assertRaises(RuntimeError, self.driver._reload, self.lb)
+        self.assertFalse(execute.called)
+        self.assertFalse(self.driver._set_reload_generation.called)
+
+    def test_get_reload_generation(self):
+        self.driver._get_state_file_path = mock.Mock(return_value='/path')
+        with mock.patch('__builtin__.open') as m_open:
+            file_mock = mock.MagicMock()
+            m_open.return_value = file_mock
+            file_mock.__enter__.return_value = file_mock
+            file_mock.read.return_value = '4\n'
+            self.assertEqual(4, self.driver._get_reload_generation(self.lb.id))
+            m_open.side_effect = IOError
+            self.assertIsNone(self.driver._get_reload_generation(self.lb.id))
+
+    @mock.patch('os.remove')
+    @mock.patch('os.path.exists')
+    @mock.patch('neutron.agent.linux.utils.replace_file')
+    def test_set_reload_generation(self, replace_file, exists, remove):
+        self.driver._get_state_file_path = mock.Mock(return_value='/path')
+        self.driver._set_reload_generation(self.lb.id, 5)
+        replace_file.assert_called_once_with('/path', '5')
+        exists.return_value = True
+        self.driver._set_reload_generation(self.lb.id, None)
+        remove.assert_called_once_with('/path')
+
+    @mock.patch('neutron_lbaas.services.loadbalancer.drivers.haproxy.'
+                'jinja_cfg.get_listener_tls_certs')
+    @mock.patch('neutron_lbaas.services.loadbalancer.drivers.haproxy.'
+                'jinja_cfg.tls_ticket_keys_expired')
+    @mock.patch('neutron_lbaas.services.loadbalancer.drivers.haproxy.'
+                'jinja_cfg.uses_tls_ticket_keys')
+    def test_refresh_tls_material(self, uses_keys, keys_expired, get_certs):
+        listener = data_models.Listener(id='listener1',
+                                        protocol='TERMINATED_HTTPS')
+        http_lb = data_models.LoadBalancer(
+            id='lb2', listeners=[data_models.Listener(protocol='HTTP')])
+        self.lb.listeners.append(listener)
+        self.driver.deployed_loadbalancers = {self.lb.id: self.lb,
+                                              http_lb.id: http_lb}
+        self.driver._get_state_file_path = mock.Mock(return_value='/path/')
+        self.driver._refresh_ocsp_response = mock.Mock(return_value=False)
+        self.driver.deploy_instance = mock.Mock()
+        self.conf.haproxy.ocsp_refresh_interval = 0
+        uses_keys.return_value = True
+        keys_expired.return_value = False
+
+        self.driver.refresh_tls_material()
+        keys_expired.assert_called_once_with('/path/tls_ticket_keys')
+        self.assertFalse(get_certs.called)
+        self.assertFalse(self.driver.deploy_instance.called)
+
+        keys_expired.return_value = True
+        self.driver.refresh_tls_material()
+        self.driver.deploy_instance.assert_called_once_with(self.lb)
+
+        self.driver.deploy_instance.reset_mock()
+        keys_expired.return_value = False
+        self.conf.haproxy.ocsp_refresh_interval = 3600
+        get_certs.return_value = [('/path/listener1/crt.pem', 'tls_cert')]
+        self.driver._refresh_ocsp_response.return_value = True
+        self.driver.refresh_tls_material()
+        get_certs.assert_called_once_with(listener, '/path/')
+        self.driver._refresh_ocsp_response.assert_called_once_with(
+            '/path/listener1/crt.pem', 'tls_cert')
+        self.driver.deploy_instance.assert_called_once_with(self.lb)
+
+    @mock.patch('shutil.rmtree')
+    @mock.patch('tempfile.mkdtemp')
+    @mock.patch('neutron.agent.linux.utils.replace_file')
+    @mock.patch('neutron.agent.linux.utils.execute')
+    @mock.patch('os.path.exists')
+    def test_refresh_ocsp_response(self, exists, execute, replace_file,
+                                   mkdtemp, rmtree):
+        self.conf.haproxy.ocsp_refresh_interval = 3600
+        exists.return_value = False
+        mkdtemp.return_value = '/tmp_dir'
+        execute.return_value = 'http://ocsp.example.com\n'
+        tls_cert = mock.Mock(certificate='cert', intermediates=['issuer'])
+        with mock.patch('__builtin__.open') as m_open:
+            file_mock = mock.MagicMock()
+            m_open.return_value = file_mock
+            file_mock.__enter__.return_value = file_mock
+            file_mock.read.return_value = 'response'
+            self.assertTrue(self.driver._refresh_ocsp_response(
+                '/path/crt.pem', tls_cert))
+        execute.assert_has_calls([
+            mock.call(['openssl', 'x509', '-noout', '-ocsp_uri',
+                       '-in', '/tmp_dir/cert.pem']),
+            mock.call(['openssl', 'ocsp', '-no_nonce',
+                       '-issuer', '/tmp_dir/issuer.pem',
+                       '-cert', '/tmp_dir/cert.pem',
+                       '-url', 'http://ocsp.example.com',
+                       '-respout', '/tmp_dir/response.der'])])
+        replace_file.assert_has_calls([
+            mock.call('/tmp_dir/cert.pem', 'cert'),
+            mock.call('/tmp_dir/issuer.pem', 'issuer'),
+            mock.call('/path/crt.pem.ocsp', 'response')])
+        rmtree.assert_called_once_with('/tmp_dir', ignore_errors=True)
+
+    @mock.patch('shutil.rmtree')
+    @mock.patch('tempfile.mkdtemp')
+    @mock.patch('neutron.agent.linux.utils.replace_file')
+    @mock.patch('neutron.agent.linux.utils.execute')
+    @mock.patch('os.path.exists')
+    def test_refresh_ocsp_response_failed(self, exists, execute,
+                                          replace_file, mkdtemp, rmtree):
+        self.conf.haproxy.ocsp_refresh_interval = 3600
+        exists.return_value = False
+        mkdtemp.return_value = '/tmp_dir'
+        execute.side_effect = RuntimeError
+        tls_cert = mock.Mock(certificate='cert', intermediates=['issuer'])
+        self.assertFalse(self.driver._refresh_ocsp_response(
+            '/path/crt.pem', tls_cert))
+        rmtree.assert_called_once_with('/tmp_dir', ignore_errors=True)
+
+    @mock.patch('time.time')
+    @mock.patch('os.path.getmtime')
+    @mock.patch('os.path.exists')
+    @mock.patch('neutron.agent.linux.utils.execute')
+    def test_refresh_ocsp_response_not_needed(self, execute, exists,
+                                              getmtime, time):
+        self.conf.haproxy.ocsp_refresh_interval = 3600
+        exists.return_value = True
+        getmtime.return_value = 100
+        time.return_value = 200
+        tls_cert = mock.Mock(intermediates=['issuer'])
+        self.assertFalse(self.driver._refresh_ocsp_response(
+            '/path/crt.pem', tls_cert))
+        exists.return_value = False
+        tls_cert.intermediates = []
+        self.assertFalse(self.driver._refresh_ocsp_response(
+            '/path/crt.pem', tls_cert))
+        self.assertFalse(execute.called)
+
     @mock.patch('socket.socket')
     @mock.patch('os.path.exists')
     @mock.patch('neutron.agent.linux.ip_lib.IPWrapper')
@@ -432,6 +685,24 @@ class TestHaproxyNSDriver(base.BaseTestCase):
         self.assertEqual(self.lb,
                          self.driver.deployed_loadbalancers[self.lb.id])
 
+    @mock.patch('neutron.agent.linux.utils.replace_file')
+    @mock.patch('neutron.common.utils.ensure_dir')
+    @mock.patch('neutron_lbaas.services.loadbalancer.drivers.haproxy.'
+                'jinja_cfg.save_config')
+    @mock.patch('neutron.agent.linux.ip_lib.IPWrapper')
+    def test_spawn_seamless_reload(self, ip_wrap, jinja_save, ensure_dir,
+                                   replace_file):
+        self.conf.haproxy.seamless_reload = True
+        mock_ns = ip_wrap.return_value
+        self.driver._spawn(self.lb, ['-sf', '123'])
+        conf_dir = self.driver.state_path + '/' + self.lb.id + '/%s'
+        mock_ns.netns.execute.assert_called_once_with(
+            ['haproxy', '-f', conf_dir % 'haproxy.conf', '-p',
+             conf_dir % 'haproxy.pid', '-W', '-x',
+             conf_dir % 'haproxy_reload.sock', '-sf', '123'])
+        replace_file.assert_called_once_with(
+            conf_dir % 'haproxy.generation', '0')
+
 
 class BaseTestManager(base.BaseTestCase):
 
@@ -560,6 +831,17 @@ class TestListenerManager(BaseTestListenerManager):
         self.listener_manager.update(old_listener, self.in_listener)
         self.refresh.assert_called_once_with(self.in_lb)
 
+    @mock.patch('neutron_lbaas.services.loadbalancer.drivers.haproxy.'
+                'jinja_cfg.invalidate_tls_cert_cache')
+    def test_update_invalidates_tls_certs(self, invalidate):
+        old_listener = data_models.Listener(
+            id='listener1', default_tls_container_id='cont1',
+            sni_containers=[data_models.SNI(tls_container_id='cont2')])
+        self.in_listener.default_tls_container_id = 'cont3'
+        self.listener_manager.update(old_listener, self.in_listener)
+        invalidate.assert_called_once_with(set(['cont1', 'cont2', 'cont3']))
+        self.refresh.assert_called_once_with(self.in_lb)
+
     def test_create(self):
         self.listener_manager.create(self.in_listener)
         self.refresh.assert_called_once_with(self.in_lb)
@@ -630,6 +912,10 @@ class TestMemberManager(BaseTestMemberManager):
         self.member_manager.create(self.in_member)
         self.refresh.assert_called_once_with(self.in_lb)
 
+    def test_create_many(self):
+        self.member_manager.create_many([self.in_member, self.member2])
+        self.refresh.assert_called_once_with(self.in_lb)
+
     def test_delete(self):
         self.member_manager.delete(self.in_member)
         self.refresh.assert_called_once_with(self.in_lb)
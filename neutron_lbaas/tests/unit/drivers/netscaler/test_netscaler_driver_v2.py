@@ -12,6 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import eventlet
 import mock
 
 from neutron_lbaas.drivers.netscaler \
@@ -325,6 +327,43 @@ class TestNetScalerLoadBalancerDriverV2(
         MonitorManagerTest(self, self.driver.health_monitor,
                            self.lb.listeners[0].default_pool.healthmonitor)
 
+    def test_init_pending_status_tracker(self):
+        lbs = [mock.Mock(id='lb1'), mock.Mock(id='lb2')]
+        lbs[0].provider.provider_name = netscaler_driver_v2.NETSCALER
+        lbs[1].provider.provider_name = 'haproxy'
+        self.plugin.db.get_loadbalancers.return_value = lbs
+        with mock.patch.object(netscaler_driver_v2,
+                               'PROVISIONING_STATUS_TRACKER', set()) as t:
+            self.driver._init_pending_status_tracker()
+            self.assertEqual(set(['lb1']), t)
+        self.plugin.db.get_loadbalancers.assert_called_once_with(
+            mock.ANY, filters={'provisioning_status': [
+                'PENDING_CREATE', 'PENDING_UPDATE', 'PENDING_DELETE']})
+
+    def test_update_loadbalancers_provision_status(self):
+        self.driver.pagesize_status_collection = 2
+        self.driver.status_pool = eventlet.GreenPool(2)
+        self.driver.admin_ctx = mock.MagicMock()
+        statuses = {'lb1': {'lb_statuses': 'tree1'},
+                    'lb2': None,
+                    'lb3': {'lb_statuses': 'tree3'}}
+        with contextlib.nested(
+            mock.patch.object(netscaler_driver_v2,
+                              'PROVISIONING_STATUS_TRACKER',
+                              set(statuses)),
+            mock.patch.object(self.driver, '_get_loadbalancer_statuses',
+                              side_effect=statuses.get),
+            mock.patch.object(self.driver, '_update_status_tree_in_db')
+        ) as (tracker, get_statuses, update_tree):
+            self.driver._update_loadbalancers_provision_status()
+        self.assertEqual(3, get_statuses.call_count)
+        self.assertEqual(
+            sorted([mock.call('lb1', 'tree1'), mock.call('lb3', 'tree3')]),
+            sorted(update_tree.call_args_list))
+        # one transaction per status tree
+        self.assertEqual(
+            2, self.driver.admin_ctx.session.begin.call_count)
+
 
 def mock_create_resource_func(*args, **kwargs):
     return 201, {}
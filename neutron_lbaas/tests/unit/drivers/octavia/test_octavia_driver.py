@@ -12,12 +12,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import zlib
+
 import mock
 from oslo_config import cfg
+import requests
 
 from neutron import context
+from neutron.plugins.common import constants
 from neutron_lbaas.drivers.octavia import driver
 from neutron_lbaas.services.loadbalancer import data_models
+from neutron_lbaas.tests import base
 from neutron_lbaas.tests.unit.db.loadbalancer import test_db_loadbalancerv2
 
 
@@ -50,6 +55,91 @@ class ManagerTest(object):
         pass
 
 
+class TestOctaviaRequest(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestOctaviaRequest, self).setUp()
+        self.req = driver.OctaviaRequest('http://octavia')
+        self.session = mock.Mock()
+        self.req.session = self.session
+        self.response = mock.Mock(status_code=200)
+        self.session.request.return_value = self.response
+        sleep_patcher = mock.patch('time.sleep')
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def test_session_headers(self):
+        req = driver.OctaviaRequest('http://octavia')
+        self.assertEqual('application/json',
+                         req.session.headers['Content-type'])
+
+    def test_request(self):
+        self.assertEqual(self.response.json.return_value,
+                         self.req.post('/v1/loadbalancers', {'id': 'lb1'}))
+        self.session.request.assert_called_once_with(
+            'POST', 'http://octavia/v1/loadbalancers', data='{"id": "lb1"}',
+            headers=None, timeout=cfg.CONF.octavia.request_timeout)
+
+    def test_request_delete(self):
+        self.assertIsNone(self.req.delete('/v1/loadbalancers/lb1'))
+        self.assertFalse(self.response.json.called)
+
+    def test_request_compression(self):
+        cfg.CONF.set_override('request_compression', True, group='octavia')
+        self.req.put('/v1/loadbalancers/lb1', {'name': 'lb'})
+        kwargs = self.session.request.call_args[1]
+        self.assertEqual({'Content-Encoding': 'gzip'}, kwargs['headers'])
+        self.assertEqual('{"name": "lb"}',
+                         zlib.decompress(kwargs['data'], 16 + zlib.MAX_WBITS))
+
+    def test_request_retries(self):
+        cfg.CONF.set_override('request_retry_backoff', 1, group='octavia')
+        conflict = mock.Mock(status_code=409)
+        self.session.request.side_effect = [
+            requests.ConnectionError, conflict, self.response]
+        self.req.get('/v1/loadbalancers/lb1')
+        self.assertEqual(3, self.session.request.call_count)
+        self.sleep.assert_has_calls([mock.call(1), mock.call(2)])
+
+    def test_request_retries_exhausted(self):
+        cfg.CONF.set_override('request_retries', 1, group='octavia')
+        error = mock.Mock(status_code=503)
+        self.session.request.return_value = error
+        self.assertEqual(error.json.return_value,
+                         self.req.get('/v1/loadbalancers/lb1'))
+        self.assertEqual(2, self.session.request.call_count)
+
+        self.session.request.side_effect = requests.ConnectionError
+        self.assertRaises(requests.ConnectionError,
+                          self.req.get, '/v1/loadbalancers/lb1')
+
+    def test_request_post_retries(self):
+        conflict = mock.Mock(status_code=409)
+        self.session.request.side_effect = [
+            requests.exceptions.ConnectTimeout, conflict, self.response]
+        self.req.post('/v1/loadbalancers', {'id': 'lb1'})
+        self.assertEqual(3, self.session.request.call_count)
+
+    def test_request_post_no_retry_once_sent(self):
+        error = mock.Mock(status_code=503)
+        self.session.request.return_value = error
+        self.assertEqual(error.json.return_value,
+                         self.req.post('/v1/loadbalancers', {'id': 'lb1'}))
+        self.assertEqual(1, self.session.request.call_count)
+
+        self.session.request.side_effect = requests.ConnectionError
+        self.assertRaises(requests.ConnectionError, self.req.post,
+                          '/v1/loadbalancers', {'id': 'lb1'})
+        self.assertEqual(2, self.session.request.call_count)
+        self.assertFalse(self.sleep.called)
+
+    def test_request_no_retry_on_client_error(self):
+        self.response.status_code = 404
+        self.req.get('/v1/loadbalancers/lb1')
+        self.assertEqual(1, self.session.request.call_count)
+        self.assertFalse(self.sleep.called)
+
+
 class BaseOctaviaDriverTest(test_db_loadbalancerv2.LbaasPluginDbTestCase):
 
     # Copied it from Brocade's test code :/
@@ -76,6 +166,7 @@ class BaseOctaviaDriverTest(test_db_loadbalancerv2.LbaasPluginDbTestCase):
         self.driver = driver.OctaviaDriver(self.plugin)
         # mock of rest call.
         self.driver.req = mock.Mock()
+        self.driver.poller = mock.Mock()
         self.lb = self._create_fake_models()
 
 
@@ -111,6 +202,16 @@ class TestOctaviaDriver(BaseOctaviaDriverTest):
                 'port_id': lb.vip_port_id,
             }
         }
+        # the listeners created with the load balancer are nested in it
+        listener = lb.listeners[0]
+        pool = listener.default_pool
+        listener_args = self.driver.listener._create_args(listener)
+        listener_args['default_pool'] = self.driver.pool._create_args(pool)
+        listener_args['default_pool']['members'] = [
+            self.driver.member._create_args(pool.members[0])]
+        listener_args['default_pool']['health_monitor'] = (
+            self.driver.health_monitor._create_args(pool.healthmonitor))
+        args['listeners'] = [listener_args]
         m.create(lb, lb_url, args)
 
         # Update LB test
@@ -236,6 +337,50 @@ class TestOctaviaDriver(BaseOctaviaDriverTest):
         # Test member delete.
         m.delete(member, mem_url_id)
 
+    def test_pool_update_replaces_members(self):
+        pool = self.lb.listeners[0].default_pool
+        old_pool = data_models.Pool(id=pool.id, listener=pool.listener)
+        old_pool.members = [
+            data_models.Member(id='kept', pool=old_pool, subnet_id='s1'),
+            data_models.Member(id='moved', pool=old_pool, subnet_id='s1')]
+        statuses = [('added', constants.PENDING_CREATE, 's1'),
+                    ('removed', constants.PENDING_DELETE, 's1'),
+                    ('kept', constants.PENDING_UPDATE, 's1'),
+                    ('moved', constants.PENDING_UPDATE, 's2'),
+                    ('same', constants.ACTIVE, 's1')]
+        pool.members = [
+            data_models.Member(id=id, pool=pool, provisioning_status=status,
+                               subnet_id=subnet_id)
+            for id, status, subnet_id in statuses]
+        self.driver.pool.update(self.context, old_pool, pool)
+        # a request at a time, Octavia answers 409 while applying one
+        self.assertEqual(1, self.driver.req.put.call_count)
+        for i in range(5):
+            self.driver.poller.add.assert_called_with(
+                None, pool, on_complete=mock.ANY)
+            self.driver.poller.add.call_args[1]['on_complete'](True)
+        self.driver.poller.add.assert_called_with(self.driver.pool, pool)
+
+        url = self.driver.member._url(pool.members[0])
+        self.driver.req.post.assert_has_calls([
+            mock.call(url, self.driver.member._create_args(pool.members[0])),
+            mock.call(url, self.driver.member._create_args(pool.members[3]))])
+        self.driver.req.put.assert_called_with(
+            url + '/kept', self.driver.member._update_args(pool.members[2]))
+        self.assertEqual([mock.call(url + '/removed'),
+                          mock.call(url + '/moved')],
+                         self.driver.req.delete.call_args_list)
+
+    def test_pool_update_replaces_members_failed(self):
+        pool = self.lb.listeners[0].default_pool
+        pool.members[0].provisioning_status = constants.PENDING_CREATE
+        self.driver.pool.failed_completion = mock.Mock()
+        self.driver.pool.update(self.context, pool, pool)
+        self.driver.poller.add.call_args[1]['on_complete'](False)
+        self.assertFalse(self.driver.req.post.called)
+        self.driver.pool.failed_completion.assert_called_once_with(
+            mock.ANY, pool)
+
     def test_health_monitor_ops(self):
         m = ManagerTest(self, self.driver.health_monitor,
                         self.driver.req)
@@ -270,10 +415,10 @@ class TestOctaviaDriver(BaseOctaviaDriverTest):
         m.delete(hm, hm_url)
 
 
-class TestThreadedDriver(BaseOctaviaDriverTest):
+class TestCompletionPoller(BaseOctaviaDriverTest):
 
         def setUp(self):
-            super(TestThreadedDriver, self).setUp()
+            super(TestCompletionPoller, self).setUp()
             cfg.CONF.set_override('request_poll_interval', 1, group='octavia')
             cfg.CONF.set_override('request_poll_timeout', 5, group='octavia')
             self.driver.req.get = mock.MagicMock()
@@ -287,46 +432,96 @@ class TestThreadedDriver(BaseOctaviaDriverTest):
             self.driver.load_balancer.successful_completion = (
                 self.succ_completion)
             self.driver.load_balancer.failed_completion = self.fail_completion
-
-        def test_thread_op_goes_active(self):
+            self.poller = driver.CompletionPoller(self.driver)
+            self.poller._start = mock.Mock()
+            time_patcher = mock.patch('time.time', return_value=100)
+            self.time = time_patcher.start()
+            self.addCleanup(time_patcher.stop)
+
+        def _poll(self, at):
+            self.time.return_value = at
+            self.poller.poll(self.lb.id)
+
+        def test_async_op_adds_pending_operation(self):
+            self.driver.load_balancer.delete(self.context, self.lb)
+            self.driver.poller.add.assert_called_once_with(
+                self.driver.load_balancer, self.lb, delete=True,
+                lb_create=False)
+
+        def test_poll_goes_active(self):
             self.driver.req.get.side_effect = [
                 {'provisioning_status': 'PENDING_CREATE'},
                 {'provisioning_status': 'ACTIVE'}
             ]
-            driver.thread_op(self.driver.load_balancer, self.lb)
+            self.poller.add(self.driver.load_balancer, self.lb)
+            self._poll(101)
+            self.assertEqual(0, self.succ_completion.call_count)
+            self._poll(103)
             self.succ_completion.assert_called_once_with(self.context, self.lb,
                                                          delete=False)
             self.assertEqual(0, self.fail_completion.call_count)
-
-        def test_thread_op_goes_deleted(self):
+            self.assertEqual({}, self.poller._pending)
+
+        def test_poll_calls_on_complete(self):
+            self.driver.req.get.return_value = {
+                'provisioning_status': 'ERROR'}
+            on_complete = mock.Mock()
+            self.poller.add(self.driver.load_balancer, self.lb,
+                            on_complete=on_complete)
+            self._poll(101)
+            on_complete.assert_called_once_with(False)
+
+        def test_poll_only_waits_without_manager(self):
+            self.driver.req.get.return_value = {
+                'provisioning_status': 'ACTIVE'}
+            on_complete = mock.Mock()
+            self.poller.add(None, self.lb, on_complete=on_complete)
+            self._poll(101)
+            on_complete.assert_called_once_with(True)
+            self.assertFalse(self.succ_completion.called)
+
+        def test_poll_goes_deleted(self):
             self.driver.req.get.side_effect = [
                 {'provisioning_status': 'PENDING_DELETE'},
                 {'provisioning_status': 'DELETED'}
             ]
-            driver.thread_op(self.driver.load_balancer, self.lb, delete=True)
+            self.poller.add(self.driver.load_balancer, self.lb, delete=True)
+            self._poll(101)
+            self._poll(103)
             self.succ_completion.assert_called_once_with(self.context, self.lb,
                                                          delete=True)
             self.assertEqual(0, self.fail_completion.call_count)
 
-        def test_thread_op_goes_error(self):
+        def test_poll_goes_error(self):
             self.driver.req.get.side_effect = [
                 {'provisioning_status': 'PENDING_CREATE'},
                 {'provisioning_status': 'ERROR'}
             ]
-            driver.thread_op(self.driver.load_balancer, self.lb)
+            self.poller.add(self.driver.load_balancer, self.lb)
+            self._poll(101)
+            self._poll(103)
             self.fail_completion.assert_called_once_with(self.context, self.lb)
             self.assertEqual(0, self.succ_completion.call_count)
 
-        def test_thread_op_a_times_out(self):
-            cfg.CONF.set_override('request_poll_timeout', 1, group='octavia')
-            self.driver.req.get.side_effect = [
-                {'provisioning_status': 'PENDING_CREATE'}
-            ]
-            driver.thread_op(self.driver.load_balancer, self.lb)
+        def test_poll_times_out(self):
+            self.driver.req.get.return_value = {
+                'provisioning_status': 'PENDING_CREATE'}
+            self.poller.add(self.driver.load_balancer, self.lb)
+            self._poll(101)
+            self.assertEqual(0, self.fail_completion.call_count)
+            self._poll(105)
             self.fail_completion.assert_called_once_with(self.context, self.lb)
             self.assertEqual(0, self.succ_completion.call_count)
 
-        def test_thread_op_updates_vip_when_vip_delegated(self):
+        def test_poll_get_fails(self):
+            self.driver.req.get.side_effect = Exception
+            self.poller.add(self.driver.load_balancer, self.lb)
+            self._poll(101)
+            self.assertEqual(0, self.fail_completion.call_count)
+            self._poll(105)
+            self.fail_completion.assert_called_once_with(self.context, self.lb)
+
+        def test_poll_updates_vip_when_vip_delegated(self):
             cfg.CONF.set_override('allocates_vip', True, group='octavia')
             expected_vip = '10.1.1.1'
             self.driver.req.get.side_effect = [
@@ -335,10 +530,80 @@ class TestThreadedDriver(BaseOctaviaDriverTest):
                 {'provisioning_status': 'ACTIVE',
                  'vip': {'ip_address': expected_vip}}
             ]
-            driver.thread_op(self.driver.load_balancer,
-                             self.lb,
-                             lb_create=True)
+            self.poller.add(self.driver.load_balancer, self.lb,
+                            lb_create=True)
+            self._poll(101)
+            self._poll(103)
             self.succ_completion.assert_called_once_with(self.context, self.lb,
                                                          delete=False,
                                                          lb_create=True)
             self.assertEqual(expected_vip, self.lb.vip_address)
+
+        def test_poll_resolves_all_operations_of_a_load_balancer(self):
+            listener = self.lb.listeners[0]
+            member = listener.default_pool.members[0]
+            self.driver.req.get.return_value = {
+                'provisioning_status': 'ACTIVE'}
+            self.poller.add(self.driver.load_balancer, self.lb)
+            self.poller.add(self.driver.load_balancer, listener)
+            self.poller.add(self.driver.load_balancer, member, delete=True)
+            self._poll(101)
+            self.assertEqual(1, self.driver.req.get.call_count)
+            self.succ_completion.assert_has_calls([
+                mock.call(self.context, self.lb, delete=False),
+                mock.call(self.context, listener, delete=False),
+                mock.call(self.context, member, delete=True)])
+
+        def test_poll_keeps_operations_submitted_during_request(self):
+            listener = self.lb.listeners[0]
+
+            def get(url):
+                self.time.return_value = 102
+                self.poller.add(self.driver.load_balancer, listener)
+                return {'provisioning_status': 'ACTIVE'}
+
+            self.driver.req.get.side_effect = get
+            self.poller.add(self.driver.load_balancer, self.lb)
+            self._poll(101)
+            self.succ_completion.assert_called_once_with(self.context, self.lb,
+                                                         delete=False)
+            self.assertEqual([listener], [op.entity for op in
+                                          self.poller._pending[self.lb.id]])
+            self.assertEqual(1, self.poller._polls[self.lb.id][1])
+
+        def test_poll_backs_off(self):
+            cfg.CONF.set_override('request_poll_timeout', 100,
+                                  group='octavia')
+            cfg.CONF.set_override('request_poll_max_interval', 4,
+                                  group='octavia')
+            self.driver.req.get.return_value = {
+                'provisioning_status': 'PENDING_UPDATE'}
+            self.poller.add(self.driver.load_balancer, self.lb)
+            intervals = []
+            for at in (101, 103, 107, 111):
+                self._poll(at)
+                intervals.append(self.poller._polls[self.lb.id][1])
+            self.assertEqual([2, 4, 4, 4], intervals)
+            self.assertEqual(115, self.poller._polls[self.lb.id][2])
+
+            self.poller.add(self.driver.load_balancer, self.lb)
+            self.assertEqual((self.lb, 1, 112),
+                             self.poller._polls[self.lb.id])
+
+        def test_add_keeps_earlier_poll(self):
+            self.poller.add(self.driver.load_balancer, self.lb)
+            for at in (100.5, 100.9):
+                self.time.return_value = at
+                self.poller.add(self.driver.load_balancer, self.lb)
+                self.assertEqual((self.lb, 1, 101),
+                                 self.poller._polls[self.lb.id])
+            self.assertEqual([(101, self.lb.id)], self.poller._schedule)
+
+        def test_next_poll_skips_superseded_schedule(self):
+            self.poller.add(self.driver.load_balancer, self.lb)
+            self.time.return_value = 102
+            self.poller._reschedule(self.lb, 5, 102)
+            self.assertEqual(2, len(self.poller._schedule))
+            self.time.return_value = 107
+            self.assertEqual(self.lb.id, self.poller._next_poll())
+            self.assertEqual([], self.poller._schedule)
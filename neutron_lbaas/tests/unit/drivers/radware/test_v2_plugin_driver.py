@@ -16,6 +16,7 @@ import contextlib
 import copy
 import mock
 import re
+import time
 
 from neutron import context
 from neutron import manager
@@ -29,6 +30,7 @@ from neutron_lbaas.drivers.radware import exceptions as r_exc
 from neutron_lbaas.drivers.radware import v2_driver
 from neutron_lbaas.extensions import loadbalancerv2
 from neutron_lbaas.services.loadbalancer import constants as lb_const
+from neutron_lbaas.tests import base
 from neutron_lbaas.tests.unit.db.loadbalancer import test_db_loadbalancerv2
 
 GET_200 = ('/api/workflow/', '/api/workflowTemplate')
@@ -911,3 +913,147 @@ class TestLBaaSDriverDebugOptions(TestLBaaSDriverBase):
                             ]
                             self.driver_rest_call_mock.assert_has_calls(
                                 calls, any_order=True)
+
+
+class TestOperationCompletionHandler(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestOperationCompletionHandler, self).setUp()
+        self.rest_client = mock.Mock()
+        self.handler = v2_driver.OperationCompletionHandler(
+            Queue.Queue(), self.rest_client, mock.Mock(), workers=2,
+            poll_interval=1, max_poll_interval=4)
+
+    def _oper(self, age=0):
+        return mock.Mock(operation_url='/api/operation/1',
+                         creation_time=time.time() - age)
+
+    def test_uncompleted_operation_backoff(self):
+        self.rest_client.call.return_value = (
+            200, 'OK', '', {'complete': False})
+        oper = self._oper()
+        intervals = []
+        interval = 1
+        for _i in range(4):
+            self.handler._check_operation(oper, interval)
+            _check_time, _seq, queued, interval = self.handler._schedule.pop()
+            self.assertEqual(oper, queued)
+            intervals.append(interval)
+        self.assertEqual([2, 4, 4, 4], intervals)
+
+    def test_failing_check_drops_operation(self):
+        self.rest_client.call.side_effect = Exception
+        self.handler._check_operation(self._oper(), 1)
+        self.assertEqual([], self.handler._schedule)
+
+    def test_dispatch_due_by_check_time(self):
+        now = time.time()
+        opers = [self._oper() for _i in range(3)]
+        self.handler._schedule_check(opers[0], now - 1, 1)
+        self.handler._schedule_check(opers[1], now + 100, 1)
+        self.handler._schedule_check(opers[2], now - 2, 1)
+        self.handler._dispatch_due()
+        self.assertEqual((opers[2], 1), self.handler._due.get_nowait())
+        self.assertEqual((opers[0], 1), self.handler._due.get_nowait())
+        self.assertTrue(self.handler._due.empty())
+        self.assertEqual(1, len(self.handler._schedule))
+        self.assertEqual(1, self.handler._next_check_delay())
+
+    @mock.patch.object(v2_driver.OperationCompletionHandler,
+                       '_run_post_success_function')
+    def test_completion_metrics(self, post_success):
+        self.rest_client.call.return_value = (
+            200, 'OK', '', {'complete': True, 'success': True})
+        self.handler._schedule_check(self._oper(), time.time() + 10, 1)
+        self.assertTrue(self.handler.handle_operation_completion(
+            self._oper(age=4)))
+        self.assertTrue(self.handler.handle_operation_completion(
+            self._oper(age=2)))
+        metrics = self.handler.get_metrics()
+        self.assertEqual(1, metrics['queue_depth'])
+        self.assertEqual(2, metrics['completed'])
+        self.assertTrue(3 <= metrics['avg_latency'] < 4)
+        self.assertTrue(4 <= metrics['max_latency'] < 5)
+        self.assertEqual(2, post_success.call_count)
+
+
+class TestWorkflowParameters(base.BaseTestCase):
+
+    def _graph(self, members, pip_address='10.0.0.2'):
+        return {'vip_address': '10.0.0.1', 'admin_state_up': True,
+                'pip_address': pip_address,
+                'listeners': [
+                    {'id': 'l1', 'protocol_port': 80,
+                     'default_pool': {'id': 'p1',
+                                      'lb_algorithm': 'ROUND_ROBIN',
+                                      'members': members}},
+                    {'id': 'l2', 'protocol_port': 81,
+                     'default_pool': {'id': 'p2',
+                                      'lb_algorithm': 'ROUND_ROBIN',
+                                      'members': [{'id': 'm0',
+                                                   'weight': 1}]}}]}
+
+    def test_graph_delta(self):
+        old = self._graph([{'id': 'm1', 'weight': 1},
+                           {'id': 'm2', 'weight': 1},
+                           {'id': 'm3', 'weight': 1}])
+        new = self._graph([{'id': 'm1', 'weight': 1},
+                           {'id': 'm2', 'weight': 5},
+                           {'id': 'm4', 'weight': 1}])
+        self.assertEqual(
+            {'vip_address': '10.0.0.1', 'admin_state_up': True,
+             'pip_address': '10.0.0.2',
+             'listeners': [
+                 {'id': 'l1',
+                  'default_pool': {'id': 'p1',
+                                   'members': [{'id': 'm2', 'weight': 5},
+                                               {'id': 'm4', 'weight': 1}],
+                                   'removed_members': ['m3']}}],
+             'removed_listeners': []},
+            v2_driver._graph_delta(old, new))
+
+    def test_graph_delta_listeners(self):
+        old = self._graph([{'id': 'm1', 'weight': 1}])
+        new = self._graph([{'id': 'm1', 'weight': 1}])
+        new['listeners'][0]['protocol_port'] = 8080
+        new['listeners'][1] = {'id': 'l3', 'protocol_port': 82}
+        delta = v2_driver._graph_delta(old, new)
+        self.assertEqual([{'id': 'l1', 'protocol_port': 8080},
+                          {'id': 'l3', 'protocol_port': 82}],
+                         delta['listeners'])
+        self.assertEqual(['l2'], delta['removed_listeners'])
+
+    def _driver(self, incremental=True):
+        driver = mock.Mock(spec=v2_driver.RadwareLBaaSV2Driver)
+        driver.incremental_workflow_params = incremental
+        driver._applied_graphs = {}
+        return driver
+
+    def _parameters(self, driver, graph):
+        return v2_driver.RadwareLBaaSV2Driver._get_workflow_parameters(
+            driver, 'LB_1', graph)
+
+    def test_get_workflow_parameters(self):
+        driver = self._driver()
+        old = self._graph([{'id': 'm1', 'weight': 1}])
+        # nothing applied yet
+        self.assertIs(old, self._parameters(driver, old))
+        driver._applied_graphs['LB_1'] = old
+        new = self._graph([{'id': 'm1', 'weight': 2}])
+        parameters = self._parameters(driver, new)
+        self.assertTrue(parameters['incremental'])
+        self.assertEqual([{'id': 'l1', 'default_pool': {
+            'id': 'p1', 'members': [{'id': 'm1', 'weight': 2}],
+            'removed_members': []}}], parameters['listeners'])
+        # the applied graph is only known again once the action is posted
+        self.assertEqual({}, driver._applied_graphs)
+
+    def test_get_workflow_parameters_full_sync(self):
+        driver = self._driver()
+        driver._applied_graphs['LB_1'] = self._graph([])
+        new = self._graph([], pip_address='10.0.1.2')
+        self.assertIs(new, self._parameters(driver, new))
+        driver = self._driver(incremental=False)
+        driver._applied_graphs['LB_1'] = self._graph([])
+        new = self._graph([])
+        self.assertIs(new, self._parameters(driver, new))
@@ -65,13 +65,32 @@ RET_DEF_TLS_CONT = {'id': 'cont_id_1', 'allencompassingpem': 'imapem'}
 RET_SNI_CONT_1 = {'id': 'cont_id_2', 'allencompassingpem': 'imapem2'}
 RET_SNI_CONT_2 = {'id': 'cont_id_3', 'allencompassingpem': 'imapem3'}
 
+RET_LB_TUNING = {
+    'maxconn': None,
+    'tune_bufsize': None,
+    'tune_ssl_cachesize': None,
+    'tune_ssl_lifetime': None,
+    'timeout_connect': 5000,
+    'timeout_client': 50000,
+    'timeout_server': 50000,
+    'retries': 3}
+
+RET_LISTENER_TUNING = {
+    'timeout_client': None,
+    'timeout_server': None,
+    'http_keepalive': None,
+    'http_reuse': None,
+    'tls_session_tickets': None,
+    'tls_ciphers': None}
+
 RET_LISTENER = {
     'id': 'sample_listener_id_1',
     'protocol_port': '80',
     'protocol': 'HTTP',
     'protocol_mode': 'http',
     'default_pool': RET_POOL,
-    'connection_limit': 98}
+    'connection_limit': 98,
+    'tuning': RET_LISTENER_TUNING}
 
 RET_LISTENER_TLS = {
     'id': 'sample_listener_id_1',
@@ -101,7 +120,8 @@ RET_LISTENER_TLS_SNI = {
 RET_LB = {
     'name': 'test-lb',
     'vip_address': '10.0.0.2',
-    'listeners': [RET_LISTENER]}
+    'listeners': [RET_LISTENER],
+    'tuning': RET_LB_TUNING}
 
 RET_LB_TLS = {
     'name': 'test-lb',
@@ -115,11 +135,12 @@ RET_LB_TLS_SNI = {
 
 
 def sample_loadbalancer_tuple(proto=None, monitor=True, persistence=True,
-                              persistence_type=None, tls=False, sni=False):
+                              persistence_type=None, tls=False, sni=False,
+                              tuning=None, listener_tuning=None):
     proto = 'HTTP' if proto is None else proto
     in_lb = collections.namedtuple(
         'loadbalancer', 'id, name, vip_address, protocol, vip_port, '
-                        'listeners')
+                        'listeners, tuning')
     return in_lb(
         id='sample_loadbalancer_id_1',
         name='test-lb',
@@ -130,7 +151,9 @@ def sample_loadbalancer_tuple(proto=None, monitor=True, persistence=True,
                                          persistence=persistence,
                                          persistence_type=persistence_type,
                                          tls=tls,
-                                         sni=sni)]
+                                         sni=sni,
+                                         tuning=listener_tuning)],
+        tuning=tuning
     )
 
 
@@ -142,14 +165,15 @@ def sample_vip_port_tuple():
 
 
 def sample_listener_tuple(proto=None, monitor=True, persistence=True,
-                          persistence_type=None, tls=False, sni=False):
+                          persistence_type=None, tls=False, sni=False,
+                          tuning=None):
     proto = 'HTTP' if proto is None else proto
     port = '443' if proto is 'HTTPS' or proto is 'TERMINATED_HTTPS' else '80'
     in_listener = collections.namedtuple(
         'listener', 'id, protocol_port, protocol, default_pool, '
                     'connection_limit, default_tls_container_id, '
                     'sni_container_ids, default_tls_container, '
-                    'sni_containers')
+                    'sni_containers, tuning, provisioning_status')
     return in_listener(
         id='sample_listener_id_1',
         protocol_port=port,
@@ -181,7 +205,9 @@ def sample_listener_tuple(proto=None, monitor=True, persistence=True,
                     private_key='--imakey3--\n', intermediates=[
                         '--imainter3--\n', '--imainter3too--\n'],
                     primary_cn='fakeCN2'))]
-        if sni else []
+        if sni else [],
+        tuning=tuning,
+        provisioning_status='ACTIVE'
     )
 
 
@@ -202,6 +228,36 @@ def sample_tls_container_tuple(id='cont_id_1', certificate=None,
               intermediates=intermediates or [], primary_cn=primary_cn)
 
 
+def sample_loadbalancer_tuning_tuple(maxconn=None, tune_bufsize=None,
+                                     tune_ssl_cachesize=None,
+                                     tune_ssl_lifetime=None,
+                                     timeout_connect=None, timeout_client=None,
+                                     timeout_server=None, retries=None):
+    tuning = collections.namedtuple(
+        'loadbalancer_tuning', 'maxconn, tune_bufsize, tune_ssl_cachesize, '
+                               'tune_ssl_lifetime, timeout_connect, '
+                               'timeout_client, timeout_server, retries')
+    return tuning(maxconn=maxconn, tune_bufsize=tune_bufsize,
+                  tune_ssl_cachesize=tune_ssl_cachesize,
+                  tune_ssl_lifetime=tune_ssl_lifetime,
+                  timeout_connect=timeout_connect,
+                  timeout_client=timeout_client,
+                  timeout_server=timeout_server, retries=retries)
+
+
+def sample_listener_tuning_tuple(timeout_client=None, timeout_server=None,
+                                 http_keepalive=None, http_reuse=None,
+                                 tls_session_tickets=None, tls_ciphers=None):
+    tuning = collections.namedtuple(
+        'listener_tuning', 'timeout_client, timeout_server, http_keepalive, '
+                           'http_reuse, tls_session_tickets, tls_ciphers')
+    return tuning(timeout_client=timeout_client,
+                  timeout_server=timeout_server,
+                  http_keepalive=http_keepalive, http_reuse=http_reuse,
+                  tls_session_tickets=tls_session_tickets,
+                  tls_ciphers=tls_ciphers)
+
+
 def sample_pool_tuple(proto=None, monitor=True, persistence=True,
                       persistence_type=None, hm_admin_state=True):
     proto = 'HTTP' if proto is None else proto
@@ -251,12 +307,13 @@ def sample_health_monitor_tuple(proto='HTTP', admin_state=True):
     proto = 'HTTP' if proto is 'TERMINATED_HTTPS' else proto
     monitor = collections.namedtuple(
         'monitor', 'id, type, delay, timeout, max_retries, http_method, '
-                   'url_path, expected_codes, admin_state_up')
+                   'url_path, expected_codes, admin_state_up, '
+                   'provisioning_status')
 
     return monitor(id='sample_monitor_id_1', type=proto, delay=30,
                    timeout=31, max_retries=3, http_method='GET',
                    url_path='/index.html', expected_codes='500, 405, 404',
-                   admin_state_up=admin_state)
+                   admin_state_up=admin_state, provisioning_status='ACTIVE')
 
 
 def sample_base_expected_config(backend, frontend=None):
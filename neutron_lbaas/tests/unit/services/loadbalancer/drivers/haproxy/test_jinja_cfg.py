@@ -13,10 +13,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import base64
 import contextlib
 import mock
 
+from neutron.plugins.common import constants
 from neutron.tests import base
+from oslo_config import cfg
 
 from neutron_lbaas.common.cert_manager import cert_manager
 from neutron_lbaas.common.tls_utils import cert_parser
@@ -27,6 +30,13 @@ from neutron_lbaas.tests.unit.services.loadbalancer.drivers.haproxy.\
 
 
 class TestHaproxyCfg(base.BaseTestCase):
+    def setUp(self):
+        super(TestHaproxyCfg, self).setUp()
+        self.addCleanup(jinja_cfg.invalidate_tls_cert_cache)
+
+    def _crt_name(self, tls_container):
+        return jinja_cfg._get_cert_digest(tls_container)
+
     def test_save_config(self):
         with contextlib.nested(
             mock.patch('neutron_lbaas.services.loadbalancer.'
@@ -52,16 +62,17 @@ class TestHaproxyCfg(base.BaseTestCase):
     def test_render_template_tls_termination(self):
         lb = sample_configs.sample_loadbalancer_tuple(
             proto='TERMINATED_HTTPS', tls=True, sni=True)
+        crt_name = self._crt_name(lb.listeners[0].default_tls_container)
 
         fe = ("frontend sample_listener_id_1\n"
               "    option tcplog\n"
               "    maxconn 98\n"
               "    option forwardfor\n"
               "    bind 10.0.0.2:443"
-              " ssl crt /v2/sample_listener_id_1/fakeCNM.pem"
+              " ssl crt /v2/sample_listener_id_1/%s.pem"
               " crt /v2/sample_listener_id_1\n"
               "    mode http\n"
-              "    default_backend sample_pool_id_1\n\n")
+              "    default_backend sample_pool_id_1\n\n" % crt_name)
         be = ("backend sample_pool_id_1\n"
               "    mode http\n"
               "    redirect scheme https if !{ ssl_fc }\n"
@@ -99,15 +110,16 @@ class TestHaproxyCfg(base.BaseTestCase):
     def test_render_template_tls_termination_no_sni(self):
         lb = sample_configs.sample_loadbalancer_tuple(
             proto='TERMINATED_HTTPS', tls=True)
+        crt_name = self._crt_name(lb.listeners[0].default_tls_container)
 
         fe = ("frontend sample_listener_id_1\n"
               "    option tcplog\n"
               "    maxconn 98\n"
               "    option forwardfor\n"
               "    bind 10.0.0.2:443"
-              " ssl crt /v2/sample_listener_id_1/fakeCNM.pem\n"
+              " ssl crt /v2/sample_listener_id_1/%s.pem\n"
               "    mode http\n"
-              "    default_backend sample_pool_id_1\n\n")
+              "    default_backend sample_pool_id_1\n\n" % crt_name)
         be = ("backend sample_pool_id_1\n"
               "    mode http\n"
               "    redirect scheme https if !{ ssl_fc }\n"
@@ -141,6 +153,63 @@ class TestHaproxyCfg(base.BaseTestCase):
                                     frontend=fe, backend=be),
                                 rendered_obj)
 
+    def test_render_template_tls_tuning(self):
+        cfg.CONF.set_override('tls_ticket_key_rotation', 3600,
+                              group='haproxy')
+        lb = sample_configs.sample_loadbalancer_tuple(
+            proto='TERMINATED_HTTPS', tls=True,
+            tuning=sample_configs.sample_loadbalancer_tuning_tuple(
+                tune_ssl_cachesize=100000, tune_ssl_lifetime=600),
+            listener_tuning=sample_configs.sample_listener_tuning_tuple(
+                tls_ciphers='ECDHE+AESGCM:!aNULL'))
+        crt_name = self._crt_name(lb.listeners[0].default_tls_container)
+        with contextlib.nested(
+            mock.patch('os.makedirs'),
+            mock.patch('os.listdir'),
+            mock.patch.object(jinja_cfg, 'utils'),
+            mock.patch.object(jinja_cfg, '_process_tls_certificates'),
+            mock.patch.object(jinja_cfg, '_update_tls_ticket_keys')
+        ) as (makedirs, listdir, utils, crt, update_keys):
+            crt.return_value = {
+                'tls_cert': lb.listeners[0].default_tls_container,
+                'sni_certs': []}
+            update_keys.return_value = '/v2/tls_ticket_keys'
+            rendered_obj = jinja_cfg.render_loadbalancer_obj(
+                lb, 'nogroup', '/sock_path', '/v2')
+            update_keys.assert_called_once_with('/v2')
+        self.assertIn("    tune.ssl.cachesize 100000\n"
+                      "    tune.ssl.lifetime 600\n", rendered_obj)
+        self.assertIn("    bind 10.0.0.2:443"
+                      " ssl crt /v2/sample_listener_id_1/%s.pem"
+                      " ciphers ECDHE+AESGCM:!aNULL"
+                      " tls-ticket-keys /v2/tls_ticket_keys\n" % crt_name,
+                      rendered_obj)
+
+    def test_render_template_tls_tickets_disabled(self):
+        cfg.CONF.set_override('tls_ticket_key_rotation', 3600,
+                              group='haproxy')
+        lb = sample_configs.sample_loadbalancer_tuple(
+            proto='TERMINATED_HTTPS', tls=True,
+            listener_tuning=sample_configs.sample_listener_tuning_tuple(
+                tls_session_tickets=False))
+        crt_name = self._crt_name(lb.listeners[0].default_tls_container)
+        with contextlib.nested(
+            mock.patch('os.makedirs'),
+            mock.patch('os.listdir'),
+            mock.patch.object(jinja_cfg, 'utils'),
+            mock.patch.object(jinja_cfg, '_process_tls_certificates'),
+            mock.patch.object(jinja_cfg, '_update_tls_ticket_keys')
+        ) as (makedirs, listdir, utils, crt, update_keys):
+            crt.return_value = {
+                'tls_cert': lb.listeners[0].default_tls_container,
+                'sni_certs': []}
+            rendered_obj = jinja_cfg.render_loadbalancer_obj(
+                lb, 'nogroup', '/sock_path', '/v2')
+            self.assertFalse(update_keys.called)
+        self.assertIn("    bind 10.0.0.2:443"
+                      " ssl crt /v2/sample_listener_id_1/%s.pem"
+                      " no-tls-tickets\n" % crt_name, rendered_obj)
+
     def test_render_template_http(self):
         be = ("backend sample_pool_id_1\n"
               "    mode http\n"
@@ -309,6 +378,208 @@ class TestHaproxyCfg(base.BaseTestCase):
                     sample_configs.sample_base_expected_config(backend=be),
                     rendered_obj)
 
+    def test_render_template_tuning(self):
+        lb = sample_configs.sample_loadbalancer_tuple(
+            tuning=sample_configs.sample_loadbalancer_tuning_tuple(
+                maxconn=200000, tune_bufsize=32768, tune_ssl_cachesize=0,
+                timeout_connect=1000, retries=1),
+            listener_tuning=sample_configs.sample_listener_tuning_tuple(
+                timeout_client=60000, timeout_server=70000,
+                http_keepalive=True, http_reuse='safe'))
+        fe = ("frontend sample_listener_id_1\n"
+              "    option tcplog\n"
+              "    maxconn 98\n"
+              "    option forwardfor\n"
+              "    option http-keep-alive\n"
+              "    timeout client 60000\n"
+              "    bind 10.0.0.2:80\n"
+              "    mode http\n"
+              "    default_backend sample_pool_id_1\n\n")
+        be = ("backend sample_pool_id_1\n"
+              "    mode http\n"
+              "    balance roundrobin\n"
+              "    cookie SRV insert indirect nocache\n"
+              "    timeout check 31\n"
+              "    option httpchk GET /index.html\n"
+              "    http-check expect rstatus %s\n"
+              "    option forwardfor\n"
+              "    option http-keep-alive\n"
+              "    http-reuse safe\n"
+              "    timeout server 70000\n"
+              "    server sample_member_id_1 10.0.0.99:82 "
+              "weight 13 check inter 30s fall 3 cookie sample_member_id_1\n"
+              "    server sample_member_id_2 10.0.0.98:82 "
+              "weight 13 check inter 30s fall 3 cookie sample_member_id_2\n\n"
+              % sample_configs.PIPED_CODES)
+        expected = sample_configs.sample_base_expected_config(
+            frontend=fe, backend=be)
+        expected = expected.replace(
+            "    log /dev/log local1 notice\n",
+            "    log /dev/log local1 notice\n"
+            "    maxconn 200000\n"
+            "    tune.bufsize 32768\n"
+            "    tune.ssl.cachesize 0\n")
+        expected = expected.replace("    retries 3\n", "    retries 1\n")
+        expected = expected.replace("    timeout connect 5000\n",
+                                    "    timeout connect 1000\n")
+        rendered_obj = jinja_cfg.render_loadbalancer_obj(
+            lb, 'nogroup', '/sock_path', '/v2')
+        self.assertEqual(expected, rendered_obj)
+
+    def test_transform_loadbalancer_tuning(self):
+        tuning = sample_configs.sample_loadbalancer_tuning_tuple(
+            maxconn=1000, timeout_server=60000)
+        expected = dict(sample_configs.RET_LB_TUNING)
+        expected.update(maxconn=1000, timeout_server=60000)
+        self.assertEqual(expected,
+                         jinja_cfg._transform_loadbalancer_tuning(tuning))
+        self.assertEqual(sample_configs.RET_LB_TUNING,
+                         jinja_cfg._transform_loadbalancer_tuning(None))
+
+    def test_transform_listener_tuning(self):
+        tuning = sample_configs.sample_listener_tuning_tuple(
+            http_reuse='always')
+        expected = dict(sample_configs.RET_LISTENER_TUNING)
+        expected['http_reuse'] = 'always'
+        self.assertEqual(expected,
+                         jinja_cfg._transform_listener_tuning(tuning))
+
+    def test_render_template_pending_delete_listener(self):
+        # a listener delete coalesced into another driver operation is
+        # rendered in PENDING_DELETE and has to disappear
+        lb = sample_configs.sample_loadbalancer_tuple()
+        lb = lb._replace(listeners=[lb.listeners[0]._replace(
+            provisioning_status=constants.PENDING_DELETE)])
+        rendered_obj = jinja_cfg.render_loadbalancer_obj(
+            lb, 'nogroup', '/sock_path', '/v2')
+        self.assertNotIn('frontend', rendered_obj)
+        self.assertNotIn('backend', rendered_obj)
+
+    def test_render_template_pending_delete_pool(self):
+        lb = sample_configs.sample_loadbalancer_tuple()
+        listener = lb.listeners[0]
+        lb = lb._replace(listeners=[listener._replace(
+            default_pool=listener.default_pool._replace(
+                provisioning_status=constants.PENDING_DELETE))])
+        rendered_obj = jinja_cfg.render_loadbalancer_obj(
+            lb, 'nogroup', '/sock_path', '/v2')
+        self.assertIn('frontend sample_listener_id_1', rendered_obj)
+        self.assertNotIn('default_backend', rendered_obj)
+        self.assertNotIn('backend sample_pool_id_1', rendered_obj)
+
+    def test_transform_pool_pending_delete_health_monitor(self):
+        pool = sample_configs.sample_pool_tuple()
+        pool = pool._replace(healthmonitor=pool.healthmonitor._replace(
+            provisioning_status=constants.PENDING_DELETE))
+        self.assertEqual('', jinja_cfg._transform_pool(pool)['health_monitor'])
+
+    def test_render_template_multiple_processes(self):
+        cfg.CONF.set_override('nbproc', 2, group='haproxy')
+        cfg.CONF.set_override('cpu_map', ['0', '1'], group='haproxy')
+        lb = sample_configs.sample_loadbalancer_tuple()
+        with mock.patch.object(jinja_cfg.zlib, 'crc32', return_value=1):
+            rendered_obj = jinja_cfg.render_loadbalancer_obj(
+                lb, 'nogroup', '/sock_path', '/v2')
+        self.assertIn("    log /dev/log local1 notice\n"
+                      "    nbproc 2\n"
+                      "    cpu-map 1 1\n"
+                      "    stats socket /sock_path mode 0666 level user"
+                      " process 1\n"
+                      "    cpu-map 2 0\n"
+                      "    stats socket /sock_path.2 mode 0666 level user"
+                      " process 2\n\n",
+                      rendered_obj)
+
+    def test_render_template_threads(self):
+        cfg.CONF.set_override('nbthread', 2, group='haproxy')
+        cfg.CONF.set_override('cpu_map', ['0', '1'], group='haproxy')
+        lb = sample_configs.sample_loadbalancer_tuple(
+            persistence_type='APP_COOKIE')
+        with mock.patch.object(jinja_cfg.zlib, 'crc32', return_value=1):
+            rendered_obj = jinja_cfg.render_loadbalancer_obj(
+                lb, 'nogroup', '/sock_path', '/v2')
+        self.assertIn("    log /dev/log local1 notice\n"
+                      "    nbthread 2\n"
+                      "    cpu-map 1/1 1\n"
+                      "    cpu-map 1/2 0\n"
+                      "    stats socket /sock_path mode 0666 level user\n\n",
+                      rendered_obj)
+        self.assertIn("    stick match req.cook(APP_COOKIE)\n", rendered_obj)
+        self.assertNotIn("appsession", rendered_obj)
+
+    def test_render_template_seamless_reload(self):
+        cfg.CONF.set_override('seamless_reload', True, group='haproxy')
+        lb = sample_configs.sample_loadbalancer_tuple()
+        rendered_obj = jinja_cfg.render_loadbalancer_obj(
+            lb, 'nogroup', '/sock_path/haproxy_stats.sock', '/v2')
+        self.assertIn("    stats socket /sock_path/haproxy_stats.sock "
+                      "mode 0666 level user\n"
+                      "    stats socket /sock_path/haproxy_reload.sock "
+                      "mode 0600 level admin expose-fd listeners\n",
+                      rendered_obj)
+
+    def test_render_template_seamless_reload_app_cookie(self):
+        cfg.CONF.set_override('seamless_reload', True, group='haproxy')
+        lb = sample_configs.sample_loadbalancer_tuple(
+            persistence_type='APP_COOKIE')
+        rendered_obj = jinja_cfg.render_loadbalancer_obj(
+            lb, 'nogroup', '/sock_path/haproxy_stats.sock', '/v2')
+        self.assertIn("    balance roundrobin\n"
+                      "    stick-table type string len 64 size 10k\n"
+                      "    stick store-response res.cook(APP_COOKIE)\n"
+                      "    stick match req.cook(APP_COOKIE)\n",
+                      rendered_obj)
+        self.assertNotIn("appsession", rendered_obj)
+
+    def test_get_reload_socket_path(self):
+        self.assertEqual(
+            '/the/path/haproxy_reload.sock',
+            jinja_cfg.get_reload_socket_path('/the/path/haproxy_stats.sock'))
+
+    def test_get_nbproc(self):
+        self.assertEqual(1, jinja_cfg.get_nbproc('lb_id_1'))
+        cfg.CONF.set_override('nbproc', 4, group='haproxy')
+        cfg.CONF.set_override('loadbalancer_nbproc',
+                              {'lb_id_2': '2', 'lb_id_3': 'bogus',
+                               'lb_id_4': '0'},
+                              group='haproxy')
+        self.assertEqual(4, jinja_cfg.get_nbproc('lb_id_1'))
+        self.assertEqual(2, jinja_cfg.get_nbproc('lb_id_2'))
+        self.assertEqual(4, jinja_cfg.get_nbproc('lb_id_3'))
+        self.assertEqual(1, jinja_cfg.get_nbproc('lb_id_4'))
+
+    def test_get_nbthread(self):
+        self.assertEqual(1, jinja_cfg.get_nbthread('lb_id_1'))
+        cfg.CONF.set_override('nbthread', 4, group='haproxy')
+        cfg.CONF.set_override('loadbalancer_nbthread', {'lb_id_2': '2'},
+                              group='haproxy')
+        self.assertEqual(4, jinja_cfg.get_nbthread('lb_id_1'))
+        self.assertEqual(2, jinja_cfg.get_nbthread('lb_id_2'))
+
+    def test_get_stats_socket_paths(self):
+        self.assertEqual(['/sock_path'],
+                         jinja_cfg.get_stats_socket_paths('/sock_path', 1))
+        self.assertEqual(['/sock_path', '/sock_path.2', '/sock_path.3'],
+                         jinja_cfg.get_stats_socket_paths('/sock_path', 3))
+
+    def test_transform_processes(self):
+        lb = sample_configs.sample_loadbalancer_tuple()
+        self.assertEqual(
+            [{'id': 1, 'stats_sock': '/sock_path', 'cpu_map': []}],
+            jinja_cfg._transform_processes(lb, '/sock_path'))
+
+    def test_transform_processes_threads(self):
+        cfg.CONF.set_override('nbproc', 2, group='haproxy')
+        cfg.CONF.set_override('nbthread', 2, group='haproxy')
+        cfg.CONF.set_override('cpu_map', ['0', '1', '2'], group='haproxy')
+        lb = sample_configs.sample_loadbalancer_tuple()
+        with mock.patch.object(jinja_cfg.zlib, 'crc32', return_value=1):
+            processes = jinja_cfg._transform_processes(lb, '/sock_path')
+        self.assertEqual([('1/1', '1'), ('1/2', '2')],
+                         processes[0]['cpu_map'])
+        self.assertEqual([('2/1', '0'), ('2/2', '1')],
+                         processes[1]['cpu_map'])
+
     def test_retrieve_crt_path(self):
         with mock.patch('os.makedirs'):
             with mock.patch('os.path.isdir') as isdir:
@@ -323,13 +594,209 @@ class TestHaproxyCfg(base.BaseTestCase):
 
     def test_store_listener_crt(self):
         l = sample_configs.sample_listener_tuple(tls=True, sni=True)
+        crt_name = self._crt_name(l.default_tls_container)
         with mock.patch('os.makedirs'):
-            with mock.patch('neutron.agent.linux.utils.replace_file'):
+            with mock.patch('neutron.agent.linux.utils.replace_file') as rf:
                     ret = jinja_cfg._store_listener_crt(
                         '/v2/loadbalancers', l, l.default_tls_container)
                     self.assertEqual(
-                        '/v2/loadbalancers/sample_listener_id_1/fakeCNM.pem',
-                        ret)
+                        '/v2/loadbalancers/sample_listener_id_1/%s.pem'
+                        % crt_name, ret)
+                    rf.assert_called_once_with(
+                        ret, jinja_cfg._build_pem(l.default_tls_container))
+
+    def test_store_listener_crt_private_key(self):
+        l = sample_configs.sample_listener_tuple(tls=True)
+        cert = sample_configs.sample_tls_container_tuple(
+            certificate='imacert', intermediates=['imainter'])
+        with contextlib.nested(
+            mock.patch('os.makedirs'),
+            mock.patch('neutron.agent.linux.utils.replace_file'),
+            mock.patch.object(jinja_cfg, 'CERT_MANAGER_PLUGIN'),
+            mock.patch.object(cert_parser, 'get_host_names'),
+            mock.patch.object(cert_parser, 'dump_private_key')
+        ) as (makedirs, replace_file, cert_mgr, get_host_names, dump):
+            backend_cert = cert_mgr.CertManager.return_value.get_cert
+            backend_cert.return_value.get_certificate.return_value = 'imacert'
+            backend_cert.return_value.get_intermediates.return_value = [
+                'imainter']
+            dump.return_value = 'imakey'
+            ret = jinja_cfg._store_listener_crt('/v2', l, cert)
+            backend_cert.assert_called_once_with('cont_id_1',
+                                                 check_only=True)
+            replace_file.assert_called_once_with(
+                ret, 'imainter\nimacert\nimakey')
+
+    def test_store_listener_crt_unchanged(self):
+        l = sample_configs.sample_listener_tuple(tls=True)
+        with contextlib.nested(
+            mock.patch('os.makedirs'),
+            mock.patch('os.path.exists'),
+            mock.patch('neutron.agent.linux.utils.replace_file')
+        ) as (makedirs, exists, replace_file):
+            exists.return_value = True
+            jinja_cfg._store_listener_crt(
+                '/v2/loadbalancers', l, l.default_tls_container)
+            self.assertFalse(replace_file.called)
+
+    def test_prune_listener_crts(self):
+        l = sample_configs.sample_listener_tuple()
+        with contextlib.nested(
+            mock.patch('os.path.isdir'),
+            mock.patch('os.listdir'),
+            mock.patch('os.remove')
+        ) as (isdir, listdir, remove):
+            isdir.return_value = True
+            listdir.return_value = ['keep.pem', 'stale.pem', 'other']
+            jinja_cfg._prune_listener_crts(
+                '/v2', l, set(['/v2/sample_listener_id_1/keep.pem']))
+            remove.assert_called_once_with(
+                '/v2/sample_listener_id_1/stale.pem')
+
+    def test_prune_listener_crts_ocsp(self):
+        l = sample_configs.sample_listener_tuple()
+        with contextlib.nested(
+            mock.patch('os.path.isdir'),
+            mock.patch('os.listdir'),
+            mock.patch('os.remove')
+        ) as (isdir, listdir, remove):
+            isdir.return_value = True
+            listdir.return_value = ['keep.pem', 'keep.pem.ocsp',
+                                    'stale.pem.ocsp']
+            jinja_cfg._prune_listener_crts(
+                '/v2', l, set(['/v2/sample_listener_id_1/keep.pem']))
+            remove.assert_called_once_with(
+                '/v2/sample_listener_id_1/stale.pem.ocsp')
+
+    def test_get_listener_tls_certs(self):
+        l = sample_configs.sample_listener_tuple(tls=True, sni=True)
+        sni_cert = l.sni_containers[0].tls_container
+        with mock.patch.object(jinja_cfg, '_process_tls_certificates') as crt:
+            crt.return_value = {'tls_cert': l.default_tls_container,
+                                'sni_certs': [sni_cert]}
+            self.assertEqual(
+                [('/v2/sample_listener_id_1/%s.pem'
+                  % self._crt_name(l.default_tls_container),
+                  l.default_tls_container),
+                 ('/v2/sample_listener_id_1/%s.pem'
+                  % self._crt_name(sni_cert), sni_cert)],
+                jinja_cfg.get_listener_tls_certs(l, '/v2'))
+
+    def test_uses_tls_ticket_keys(self):
+        http = sample_configs.sample_listener_tuple()
+        https = sample_configs.sample_listener_tuple(
+            proto='TERMINATED_HTTPS', tls=True)
+        no_tickets = sample_configs.sample_listener_tuple(
+            proto='TERMINATED_HTTPS', tls=True,
+            tuning=sample_configs.sample_listener_tuning_tuple(
+                tls_session_tickets=False))
+        self.assertFalse(jinja_cfg.uses_tls_ticket_keys(https))
+        cfg.CONF.set_override('tls_ticket_key_rotation', 3600,
+                              group='haproxy')
+        self.assertFalse(jinja_cfg.uses_tls_ticket_keys(http))
+        self.assertTrue(jinja_cfg.uses_tls_ticket_keys(https))
+        self.assertFalse(jinja_cfg.uses_tls_ticket_keys(no_tickets))
+
+    def test_update_tls_ticket_keys(self):
+        with contextlib.nested(
+            mock.patch('os.path.exists'),
+            mock.patch.object(jinja_cfg, '_generate_tls_ticket_key'),
+            mock.patch('neutron.agent.linux.utils.replace_file')
+        ) as (exists, generate, replace_file):
+            exists.return_value = False
+            generate.side_effect = ['key1', 'key2', 'key3']
+            self.assertEqual('/v2/tls_ticket_keys',
+                             jinja_cfg._update_tls_ticket_keys('/v2'))
+            replace_file.assert_called_once_with('/v2/tls_ticket_keys',
+                                                 'key1\nkey2\nkey3\n')
+
+    def test_update_tls_ticket_keys_rotate(self):
+        cfg.CONF.set_override('tls_ticket_key_rotation', 3600,
+                              group='haproxy')
+        keys_file = mock.MagicMock()
+        keys_file.__enter__.return_value = ['key1\n', 'key2\n', 'key3\n']
+        with contextlib.nested(
+            mock.patch('os.path.exists'),
+            mock.patch('os.path.getmtime'),
+            mock.patch('time.time'),
+            mock.patch('__builtin__.open'),
+            mock.patch.object(jinja_cfg, '_generate_tls_ticket_key'),
+            mock.patch('neutron.agent.linux.utils.replace_file')
+        ) as (exists, getmtime, time, mock_open, generate, replace_file):
+            exists.return_value = True
+            getmtime.return_value = 100
+            time.return_value = 200
+            jinja_cfg._update_tls_ticket_keys('/v2')
+            self.assertFalse(replace_file.called)
+
+            mock_open.return_value = keys_file
+            generate.return_value = 'key4'
+            time.return_value = 3700
+            jinja_cfg._update_tls_ticket_keys('/v2')
+            replace_file.assert_called_once_with('/v2/tls_ticket_keys',
+                                                 'key2\nkey3\nkey4\n')
+
+    def test_generate_tls_ticket_key(self):
+        key = jinja_cfg._generate_tls_ticket_key()
+        self.assertEqual(48, len(base64.b64decode(key)))
+
+    def test_get_tls_container_cached(self):
+        cert_mgr = mock.Mock()
+        with mock.patch.object(jinja_cfg, '_map_cert_tls_container') as map:
+            first = jinja_cfg._get_tls_container(cert_mgr, 'cont_id_1')
+            second = jinja_cfg._get_tls_container(cert_mgr, 'cont_id_1')
+            self.assertEqual(first, second)
+            cert_mgr.get_cert.assert_called_once_with('cont_id_1',
+                                                      check_only=True)
+            self.assertEqual(1, map.call_count)
+
+            jinja_cfg.invalidate_tls_cert_cache(['cont_id_1'])
+            jinja_cfg._get_tls_container(cert_mgr, 'cont_id_1')
+            self.assertEqual(2, cert_mgr.get_cert.call_count)
+
+    def test_get_tls_container_no_private_key(self):
+        cert_mgr = mock.Mock()
+        with contextlib.nested(
+            mock.patch.object(cert_parser, 'get_host_names'),
+            mock.patch.object(cert_parser, 'dump_private_key')
+        ) as (get_host_names, dump):
+            get_host_names.return_value = {'cn': 'fakeCN'}
+            tls_cert = jinja_cfg._get_tls_container(cert_mgr, 'cont_id_1')
+            self.assertEqual('cont_id_1', tls_cert.id)
+            self.assertIsNone(tls_cert.private_key)
+            self.assertFalse(dump.called)
+
+    def test_get_tls_container_cache_size(self):
+        cert_mgr = mock.Mock()
+        with contextlib.nested(
+            mock.patch.object(jinja_cfg, 'TLS_CERT_CACHE_SIZE', 2),
+            mock.patch.object(jinja_cfg, '_map_cert_tls_container')
+        ):
+            for container_id in ('cont_id_1', 'cont_id_2', 'cont_id_1',
+                                 'cont_id_3'):
+                jinja_cfg._get_tls_container(cert_mgr, container_id)
+            self.assertEqual(['cont_id_1', 'cont_id_3'],
+                             list(jinja_cfg.TLS_CERT_CACHE))
+
+    def test_get_tls_container_expired(self):
+        cert_mgr = mock.Mock()
+        cfg.CONF.set_override('tls_cert_cache_ttl', 10, group='haproxy')
+        with contextlib.nested(
+            mock.patch.object(jinja_cfg, '_map_cert_tls_container'),
+            mock.patch('time.time')
+        ) as (map, time):
+            time.return_value = 100
+            jinja_cfg._get_tls_container(cert_mgr, 'cont_id_1')
+            time.return_value = 111
+            jinja_cfg._get_tls_container(cert_mgr, 'cont_id_1')
+            self.assertEqual(2, cert_mgr.get_cert.call_count)
+
+    def test_get_tls_container_cache_disabled(self):
+        cert_mgr = mock.Mock()
+        cfg.CONF.set_override('tls_cert_cache_ttl', 0, group='haproxy')
+        with mock.patch.object(jinja_cfg, '_map_cert_tls_container'):
+            jinja_cfg._get_tls_container(cert_mgr, 'cont_id_1')
+            self.assertEqual({}, jinja_cfg.TLS_CERT_CACHE)
 
     def test_process_tls_certificates(self):
         sl = sample_configs.sample_listener_tuple(tls=True, sni=True)
@@ -15,6 +15,7 @@
 import mock
 from neutron.tests.unit import testlib_api
 import requests
+import time
 
 from neutron_lbaas.services.loadbalancer.drivers.netscaler import ncc_client
 from neutron_lbaas.services.loadbalancer.drivers.netscaler \
@@ -42,10 +43,11 @@ class TestNSClient(testlib_api.WebTestCase):
     def setUp(self):
         self.log = mock.patch.object(ncc_client, 'LOG').start()
         super(TestNSClient, self).setUp()
-        # mock the requests.request function call
+        # mock the request function of the client session
         self.request_method_mock = mock.Mock()
         requests.request = self.request_method_mock
         self.testclient = self._get_nsclient()
+        self.testclient.session.request = self.request_method_mock
         self.testclient.login = mock.Mock()
         self.testclient.login.side_effect = self.mock_auth_func(
             self.testclient)
@@ -194,6 +196,33 @@ class TestNSClient(testlib_api.WebTestCase):
             headers=mock.ANY,
             data=mock.ANY)
 
+    def test_session_refreshed_before_expiry(self):
+        """Asserts that a new session is requested ahead of expiry."""
+        fake_response = requests.Response()
+        fake_response.status_code = requests.codes.ok
+        fake_response.headers = []
+        self.request_method_mock.return_value = fake_response
+        self.testclient.auth_expiry = time.time() + 60
+        self.testclient.retrieve_resource(TEST_TENANT_ID,
+                                          netscaler_driver.VIPS_RESOURCE)
+        self.assertFalse(self.testclient.login.called)
+        self.testclient.auth_expiry = time.time() - 1
+        self.testclient.retrieve_resource(TEST_TENANT_ID,
+                                          netscaler_driver.VIPS_RESOURCE)
+        self.testclient.login.assert_called_once_with()
+        self.assertEqual(2, self.request_method_mock.call_count)
+
+    def test_login_sets_session_expiry(self):
+        """Asserts that the session lifetime given at login is used."""
+        client = self._get_nsclient()
+        body = '{"login": [{"sessionid": "##abc", "timeout": 100}]}'
+        with mock.patch.object(client, 'create_resource',
+                               return_value=(201, {'body': body})):
+            client.login()
+        self.assertEqual('SessId=##abc', client.auth)
+        self.assertTrue(time.time() + 70 < client.auth_expiry <=
+                        time.time() + 100 * ncc_client.SESSION_REFRESH_RATIO)
+
     def _get_nsclient(self):
         return ncc_client.NSClient(TESTURI, TEST_USERNAME, TEST_PASSWORD)
 
@@ -0,0 +1,98 @@
+# Copyright 2015 OpenStack Foundation.  All rights reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from neutron_lbaas.services.loadbalancer import driver_dispatcher
+from neutron_lbaas.tests import base
+
+
+class TestDriverOperationDispatcher(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestDriverOperationDispatcher, self).setUp()
+        self.dispatcher = driver_dispatcher.DriverOperationDispatcher(
+            4, provider_limits={'slow': '1'})
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def _operation(self, name, event=None, done=None):
+        if event:
+            event.wait(5)
+        with self.lock:
+            self.calls.append(name)
+        if done:
+            done.set()
+
+    def _wait(self, provider):
+        self.dispatcher._ready[provider].join()
+
+    def test_operations_of_a_loadbalancer_run_in_order(self):
+        release = threading.Event()
+        self.dispatcher.submit('fast', 'lb1', self._operation, 'create',
+                               event=release)
+        self.dispatcher.submit('fast', 'lb1', self._operation, 'update')
+        self.dispatcher.submit('fast', 'lb1', self._operation, 'delete')
+        release.set()
+        self._wait('fast')
+        self.assertEqual(['create', 'update', 'delete'], self.calls)
+        self.assertEqual(0, self.dispatcher.pending_count())
+
+    def test_loadbalancers_run_concurrently(self):
+        release = threading.Event()
+        done = threading.Event()
+        self.dispatcher.submit('fast', 'lb1', self._operation, 'lb1',
+                               event=release)
+        self.dispatcher.submit('fast', 'lb2', self._operation, 'lb2')
+        self.dispatcher.submit('fast', 'lb2', self._operation, 'lb2',
+                               done=done)
+        done.wait(5)
+        self.assertEqual(['lb2', 'lb2'], self.calls)
+        release.set()
+        self._wait('fast')
+        self.assertEqual(['lb2', 'lb2', 'lb1'], self.calls)
+
+    def test_provider_concurrency_limit(self):
+        release = threading.Event()
+        self.dispatcher.submit('slow', 'lb1', self._operation, 'lb1',
+                               event=release)
+        self.dispatcher.submit('slow', 'lb2', self._operation, 'lb2')
+        self.dispatcher.submit('fast', 'lb3', self._operation, 'lb3')
+        self._wait('fast')
+        # the single slow worker is busy, other providers are not held
+        self.assertEqual(['lb3'], self.calls)
+        release.set()
+        self._wait('slow')
+        self.assertEqual(['lb3', 'lb1', 'lb2'], self.calls)
+
+    def test_failed_operation_does_not_stop_the_queue(self):
+        def fail():
+            raise Exception()
+        self.dispatcher.submit('fast', 'lb1', fail)
+        self.dispatcher.submit('fast', 'lb1', self._operation, 'update')
+        self._wait('fast')
+        self.assertEqual(['update'], self.calls)
+
+    def test_coalesce(self):
+        done = threading.Event()
+
+        def flush(batch):
+            self._operation(batch, done=done)
+        self.dispatcher.coalesce('fast', 'lb1', 'listener', flush, 0.1)
+        self.dispatcher.coalesce('fast', 'lb1', 'pool', flush, 0.1)
+        self.dispatcher.coalesce('fast', 'lb1', 'member', flush, 0.1)
+        done.wait(5)
+        self._wait('fast')
+        self.assertEqual([['listener', 'pool', 'member']], self.calls)
+        self.assertEqual({}, self.dispatcher._batches)
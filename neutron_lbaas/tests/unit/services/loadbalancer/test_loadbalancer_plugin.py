@@ -486,7 +486,9 @@ class LoadBalancerExtensionV2TestCase(base.ExtensionTestCase):
         res = self.api.post(_get_path('lbaas/loadbalancers', fmt=self.fmt),
                             self.serialize(data),
                             content_type='application/{0}'.format(self.fmt))
-        data['loadbalancer'].update({'provider': attr.ATTR_NOT_SPECIFIED})
+        data['loadbalancer'].update({'provider': attr.ATTR_NOT_SPECIFIED,
+                                     'tuning': {},
+                                     'listeners': []})
         instance.create_loadbalancer.assert_called_with(mock.ANY,
                                                         loadbalancer=data)
 
@@ -570,6 +572,7 @@ class LoadBalancerExtensionV2TestCase(base.ExtensionTestCase):
                              'sni_container_refs': [],
                              'connection_limit': 100,
                              'admin_state_up': True,
+                             'tuning': {},
                              'loadbalancer_id': _uuid()}}
         return_value = copy.copy(data['listener'])
         return_value.update({'id': listener_id})
@@ -603,6 +606,7 @@ class LoadBalancerExtensionV2TestCase(base.ExtensionTestCase):
                              'sni_container_refs': sni_refs,
                              'connection_limit': 100,
                              'admin_state_up': True,
+                             'tuning': {},
                              'loadbalancer_id': _uuid()}}
         return_value = copy.copy(data['listener'])
         return_value.update({'id': listener_id})
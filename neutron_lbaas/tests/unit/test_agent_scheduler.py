@@ -30,9 +30,11 @@ from neutron.tests.unit.api import test_extensions
 from neutron.tests.unit.db import test_agentschedulers_db
 import neutron.tests.unit.extensions
 from neutron.tests.unit.extensions import test_agent
+from oslo_config import cfg
 import six
 from webob import exc
 
+from neutron_lbaas import agent_scheduler
 from neutron_lbaas.drivers.haproxy import plugin_driver
 from neutron_lbaas.extensions import lbaas_agentschedulerv2
 from neutron_lbaas.services.loadbalancer import constants as lb_const
@@ -167,6 +169,8 @@ class LBaaSAgentSchedulerTestCase(test_agent.AgentDBTestMixIn,
             )
         agents = self._list_agents()
         self._disable_agent(agents['agents'][0]['id'])
+        # admin state changes are picked up with the agent index
+        self.lbaas_plugin.db.invalidate_lbaas_agent_index()
         subnet = self.core_plugin.get_subnets(self.adminContext)[0]
         lb = {
             'loadbalancer': {
@@ -252,3 +256,199 @@ class LBaaSAgentSchedulerTestCase(test_agent.AgentDBTestMixIn,
             self.lbaas_plugin.db.update_loadbalancer_provisioning_status(
                 self.adminContext, loadbalancer['loadbalancer']['id']
             )
+
+    def test_loadbalancer_count_on_lbaas_agents(self):
+        self._register_agent_states(lbaas_agents=True)
+        agent_ids = [agent.id for agent in
+                     self.lbaas_plugin.db.get_lbaas_agents(self.adminContext)]
+        with self.loadbalancer() as loadbalancer:
+            lb_id = loadbalancer['loadbalancer']['id']
+            lbaas_agent = self._get_lbaas_agent_hosting_loadbalancer(lb_id)
+            self.assertEqual(
+                {lbaas_agent['agent']['id']: 1},
+                self.lbaas_plugin.db.get_loadbalancer_count_on_lbaas_agents(
+                    self.adminContext, agent_ids))
+            self.lbaas_plugin.db.update_loadbalancer_provisioning_status(
+                self.adminContext, lb_id)
+
+    def test_lbaas_agent_index(self):
+        self._register_agent_states(lbaas_agents=True)
+        device_driver = plugin_driver.HaproxyOnHostPluginDriver.device_driver
+        db = self.lbaas_plugin.db
+        agent_ids = db.get_lbaas_agent_ids_for_device_driver(
+            self.adminContext, device_driver)
+        self.assertEqual(
+            set(agent.id for agent in db.get_lbaas_agents(self.adminContext)),
+            set(agent_ids))
+        self.assertEqual([], db.get_lbaas_agent_ids_for_device_driver(
+            self.adminContext, 'unknown'))
+
+        lbaas_hostc = {
+            'binary': 'neutron-loadbalancer-agent',
+            'host': 'hostc',
+            'topic': 'LOADBALANCER_AGENT',
+            'configurations': {'device_drivers': [device_driver],
+                               'loadbalancer_capacity': 4},
+            'agent_type': lb_const.AGENT_TYPE_LOADBALANCERV2}
+        # a new agent shows up once it asks for its devices
+        helpers._register_agent(lbaas_hostc)
+        self.assertEqual(
+            len(agent_ids),
+            len(db.get_lbaas_agent_ids_for_device_driver(
+                self.adminContext, device_driver)))
+        db.invalidate_lbaas_agent_index()
+        self.assertEqual(
+            len(agent_ids) + 1,
+            len(db.get_lbaas_agent_ids_for_device_driver(
+                self.adminContext, device_driver)))
+        self.assertEqual(
+            [4], list(db.get_lbaas_agent_capacities(
+                self.adminContext).values()))
+        # other configuration changes wait for the index to expire
+        lbaas_hostc['configurations']['loadbalancer_capacity'] = 8
+        helpers._register_agent(lbaas_hostc)
+        self.assertEqual(
+            [4], list(db.get_lbaas_agent_capacities(
+                self.adminContext).values()))
+        db._agent_index_expiry = 0
+        self.assertEqual(
+            [8], list(db.get_lbaas_agent_capacities(
+                self.adminContext).values()))
+
+    def test_active_lbaas_agents_for_device_driver(self):
+        self._register_agent_states(lbaas_agents=True)
+        device_driver = plugin_driver.HaproxyOnHostPluginDriver.device_driver
+        db = self.lbaas_plugin.db
+        agent_ids = set(agent.id for agent in
+                        db.get_lbaas_agents(self.adminContext))
+        self.assertEqual(
+            agent_ids,
+            set(agent['id'] for agent in
+                db.get_active_lbaas_agents_for_device_driver(
+                    self.adminContext, device_driver)))
+        # served from the index without a query
+        with mock.patch.object(self.adminContext.session, 'query') as query:
+            db.get_active_lbaas_agents_for_device_driver(
+                self.adminContext, device_driver)
+            self.assertFalse(query.called)
+        # eligibility is checked against the cached heartbeats
+        is_agent_down_str = 'neutron.db.agents_db.AgentDbMixin.is_agent_down'
+        with mock.patch(is_agent_down_str) as mock_is_agent_down:
+            mock_is_agent_down.return_value = True
+            self.assertEqual([], db.get_active_lbaas_agents_for_device_driver(
+                self.adminContext, device_driver))
+
+    def test_schedule_uses_agent_index(self):
+        self._register_agent_states(lbaas_agents=True)
+        device_driver = plugin_driver.HaproxyOnHostPluginDriver.device_driver
+        db = self.lbaas_plugin.db
+        db.get_lbaas_agent_ids_for_device_driver(self.adminContext,
+                                                 device_driver)
+        index = db._agent_index
+        with mock.patch.object(db, 'get_lbaas_agents') as get_agents:
+            with self.loadbalancer() as loadbalancer:
+                lb_id = loadbalancer['loadbalancer']['id']
+                self.assertIsNotNone(
+                    self._get_lbaas_agent_hosting_loadbalancer(lb_id))
+                db.update_loadbalancer_provisioning_status(
+                    self.adminContext, lb_id)
+        self.assertFalse(get_agents.called)
+        # the agents were not loaded again
+        self.assertIs(index, db._agent_index)
+
+    def test_rebind_loadbalancer(self):
+        self._register_agent_states(lbaas_agents=True)
+        db = self.lbaas_plugin.db
+        agent_ids = [agent.id for agent in
+                     db.get_lbaas_agents(self.adminContext)]
+        with self.loadbalancer() as loadbalancer:
+            lb_id = loadbalancer['loadbalancer']['id']
+            db.update_loadbalancer_provisioning_status(self.adminContext,
+                                                       lb_id)
+            old_agent_id = self._get_lbaas_agent_hosting_loadbalancer(
+                lb_id)['agent']['id']
+            new_agent_id = [agent_id for agent_id in agent_ids
+                            if agent_id != old_agent_id][0]
+            self.assertEqual(
+                [(lb_id, old_agent_id, plugin_const.ACTIVE, 1)],
+                db.get_loadbalancer_loads_on_lbaas_agents(
+                    self.adminContext, agent_ids,
+                    agent_scheduler.LOAD_LOADBALANCERS))
+            self.assertTrue(db.rebind_loadbalancer(
+                self.adminContext, lb_id, old_agent_id, new_agent_id))
+            # the binding moved already
+            self.assertFalse(db.rebind_loadbalancer(
+                self.adminContext, lb_id, old_agent_id, new_agent_id))
+            self.assertEqual(
+                new_agent_id,
+                self._get_lbaas_agent_hosting_loadbalancer(
+                    lb_id)['agent']['id'])
+
+
+class FakeSchedulerDb(object):
+
+    def __init__(self):
+        self.lb_counts = {}
+        self.connections = {}
+        self.capacities = {}
+
+    def get_loadbalancer_count_on_lbaas_agents(self, context, agent_ids):
+        return dict(self.lb_counts)
+
+    def get_stats_load_on_lbaas_agents(self, context, agent_ids, load):
+        return dict(self.connections)
+
+    def get_lbaas_agent_capacities(self, context):
+        return self.capacities
+
+
+class LeastLoadedSchedulerTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(LeastLoadedSchedulerTestCase, self).setUp()
+        self.scheduler = agent_scheduler.LeastLoadedScheduler()
+        self.db = FakeSchedulerDb()
+        self.plugin = mock.Mock(db=self.db)
+
+    def _agents(self, count):
+        return [{'id': 'agent%d' % i} for i in range(count)]
+
+    def _place(self, candidates, count):
+        for i in range(count):
+            agent = self.scheduler._schedule(candidates, self.plugin, None)
+            self.db.lb_counts[agent['id']] = (
+                self.db.lb_counts.get(agent['id'], 0) + 1)
+
+    def test_schedule_least_loaded(self):
+        candidates = self._agents(3)
+        self.db.lb_counts = {'agent0': 5, 'agent1': 2}
+        with mock.patch.object(
+                self.db, 'get_loadbalancer_count_on_lbaas_agents',
+                wraps=self.db.get_loadbalancer_count_on_lbaas_agents) as count:
+            self.assertEqual(
+                'agent2',
+                self.scheduler._schedule(candidates, self.plugin, None)['id'])
+        count.assert_called_once_with(None, ['agent0', 'agent1', 'agent2'])
+
+    def test_schedule_placement_skew(self):
+        candidates = self._agents(50)
+        self._place(candidates, 10000)
+        counts = [self.db.lb_counts[agent['id']] for agent in candidates]
+        self.assertEqual(200, max(counts))
+        self.assertEqual(200, min(counts))
+
+    def test_schedule_by_capacity(self):
+        candidates = self._agents(2)
+        self.db.capacities = {'agent0': 3, 'agent1': 1}
+        self._place(candidates, 400)
+        self.assertEqual({'agent0': 300, 'agent1': 100}, self.db.lb_counts)
+
+    def test_schedule_by_connections(self):
+        cfg.CONF.set_override('loadbalancer_scheduler_load', 'connections')
+        candidates = self._agents(3)
+        self.db.lb_counts = {'agent0': 1, 'agent1': 4, 'agent2': 2}
+        self.db.connections = {'agent0': 5000, 'agent1': 10, 'agent2': 10}
+        # agent1 and agent2 carry the same connections, agent2 hosts less
+        self.assertEqual(
+            'agent2',
+            self.scheduler._schedule(candidates, self.plugin, None)['id'])